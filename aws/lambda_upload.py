@@ -1,72 +1,174 @@
 import json
 import base64
 import boto3
+import hashlib
 import os
-from urllib.parse import parse_qs
 import uuid
 
+from multipart_stream import MultipartError, MultipartStreamParser, parse_options
+
 s3_client = boto3.client('s3')
 BUCKET_NAME = 'bucket-libreria'
 
+# Tamaño de las partes del multipart upload de S3 (mínimo 5 MB salvo la última)
+PART_SIZE = max(int(os.getenv('UPLOAD_PART_SIZE_MB', '8')), 5) * 1024 * 1024
+# Bytes del cuerpo decodificados de una vez
+BODY_CHUNK_SIZE = 1024 * 1024
+
+
+class S3MultipartWriter:
+    """
+    Escribe un archivo en S3 a medida que llega, en partes de PART_SIZE.
+    Solo se guarda en memoria la parte que se está llenando; un archivo
+    más pequeño que una parte se sube con un solo put_object.
+    """
+
+    def __init__(self, key, part_size=PART_SIZE, client=None, bucket=BUCKET_NAME):
+        self.key = key
+        self.bucket = bucket
+        self.part_size = part_size
+        self.client = client or s3_client
+        self.size = 0
+        self.sha256 = hashlib.sha256()
+        self._part = bytearray()
+        self._parts = []
+        self._upload_id = None
+
+    def write(self, data):
+        self.size += len(data)
+        self.sha256.update(data)
+        view = memoryview(data)
+        while len(view):
+            take = self.part_size - len(self._part)
+            self._part += view[:take]
+            view = view[take:]
+            if len(self._part) == self.part_size:
+                self._send_part()
+
+    def complete(self):
+        if self._upload_id is None:
+            self.client.put_object(Bucket=self.bucket, Key=self.key, Body=bytes(self._part))
+        else:
+            if self._part:
+                self._send_part()
+            self.client.complete_multipart_upload(
+                Bucket=self.bucket,
+                Key=self.key,
+                UploadId=self._upload_id,
+                MultipartUpload={'Parts': self._parts}
+            )
+        self._part = bytearray()
+
+    def abort(self):
+        if self._upload_id is not None:
+            self.client.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self._upload_id)
+
+    def _send_part(self):
+        if self._upload_id is None:
+            self._upload_id = self.client.create_multipart_upload(Bucket=self.bucket, Key=self.key)['UploadId']
+        part_number = len(self._parts) + 1
+        response = self.client.upload_part(
+            Bucket=self.bucket,
+            Key=self.key,
+            UploadId=self._upload_id,
+            PartNumber=part_number,
+            Body=self._part
+        )
+        self._parts.append({'PartNumber': part_number, 'ETag': response['ETag']})
+        # Una parte nueva en lugar de vaciar la anterior, que boto3 podría seguir leyendo
+        self._part = bytearray()
+
+
+def iter_body(event, chunk_size=BODY_CHUNK_SIZE):
+    """Devuelve el cuerpo del evento por trozos, decodificando el base64 de a poco"""
+    body = event.get('body') or ''
+    if event.get('isBase64Encoded', False):
+        # 4 caracteres de base64 son 3 bytes: cortar en múltiplos de 4
+        step = chunk_size // 3 * 4
+        for start in range(0, len(body), step):
+            yield base64.b64decode(body[start:start + step])
+    else:
+        step = chunk_size
+        for start in range(0, len(body), step):
+            chunk = body[start:start + step]
+            yield chunk.encode('utf-8') if isinstance(chunk, str) else chunk
+
+
+def upload_multipart_file(chunks, boundary, make_writer, field_name='file'):
+    """
+    Sube a S3 el primer archivo del campo field_name de un cuerpo multipart.
+    make_writer(file_name) crea el destino cuando se conoce el nombre del archivo.
+    Devuelve el writer, o None si el cuerpo no traía ese campo.
+    """
+    parser = MultipartStreamParser(boundary)
+    writer = None
+    in_file = False
+    try:
+        for chunk in chunks:
+            for event, value in parser.feed(chunk):
+                if event == 'headers':
+                    _, params = parse_options(value.get('content-disposition', ''))
+                    in_file = writer is None and params.get('name') == field_name
+                    if in_file:
+                        file_name = os.path.basename(params.get('filename', '').replace('\\', '/'))
+                        writer = make_writer(file_name or f"upload-{uuid.uuid4()}")
+                elif event == 'data' and in_file:
+                    writer.write(value)
+                elif event == 'part_end' and in_file:
+                    in_file = False
+                    writer.complete()
+            if parser.finished:
+                break
+        parser.close()
+    except Exception:
+        if writer is not None and in_file:
+            writer.abort()
+        raise
+    return writer
+
+
 def lambda_handler(event, context):
     try:
-        # Parse the multipart form data
-        if 'body' in event:
-            # Check if body is base64 encoded
-            if event.get('isBase64Encoded', False):
-                body = base64.b64decode(event['body'])
-            else:
-                body = event['body']
-                
-            # Extract content type to determine boundary
-            content_type = next((h for h in event['headers'].values() if 'multipart/form-data' in h.lower()), '')
-            boundary = content_type.split('boundary=')[1].strip()
-            
-            # Parse multipart form data
-            parts = body.split(f'--{boundary}'.encode())
-            file_part = None
-            file_name = None
-            
-            # Extract file part
-            for part in parts:
-                if b'Content-Disposition: form-data; name="file"' in part:
-                    file_headers_end = part.find(b'\r\n\r\n')
-                    file_content = part[file_headers_end + 4:]
-                    
-                    # Extract filename
-                    filename_start = part.find(b'filename="') + 10
-                    if filename_start > 10:
-                        filename_end = part.find(b'"', filename_start)
-                        file_name = part[filename_start:filename_end].decode('utf-8')
-                    else:
-                        file_name = f"upload-{uuid.uuid4()}"
-                    
-                    file_part = file_content.strip(b'\r\n')
-            
-            # Upload to S3
-            if file_part and file_name:
-                s3_client.put_object(
-                    Bucket=BUCKET_NAME,
-                    Key=file_name,
-                    Body=file_part
-                )
-                
-                return {
-                    'statusCode': 200,
-                    'body': json.dumps({
-                        'message': 'File uploaded successfully',
-                        'file_name': file_name,
-                        's3_path': f's3://{BUCKET_NAME}/{file_name}'
-                    })
-                }
-        
+        # Extract content type to determine boundary
+        headers = {name.lower(): value for name, value in (event.get('headers') or {}).items()}
+        content_type, params = parse_options(headers.get('content-type', ''))
+        if content_type != 'multipart/form-data' or not params.get('boundary'):
+            return {
+                'statusCode': 400,
+                'body': json.dumps({'message': 'Expected a multipart/form-data body'})
+            }
+
+        # Parse the multipart form data while uploading the file part to S3
+        writer = upload_multipart_file(
+            iter_body(event),
+            params['boundary'].encode('latin-1'),
+            lambda file_name: S3MultipartWriter(file_name)
+        )
+
+        if writer is not None:
+            return {
+                'statusCode': 200,
+                'body': json.dumps({
+                    'message': 'File uploaded successfully',
+                    'file_name': writer.key,
+                    's3_path': f's3://{BUCKET_NAME}/{writer.key}',
+                    'size': writer.size,
+                    'sha256': writer.sha256.hexdigest()
+                })
+            }
+
         return {
             'statusCode': 400,
             'body': json.dumps({
                 'message': 'No file was found in the request'
             })
         }
-    
+
+    except MultipartError as e:
+        return {
+            'statusCode': 400,
+            'body': json.dumps({'message': 'Malformed multipart body', 'error': str(e)})
+        }
     except Exception as e:
         return {
             'statusCode': 500,
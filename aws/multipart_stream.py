@@ -0,0 +1,174 @@
+"""
+Incremental multipart/form-data parser for the upload Lambda
+
+Only depends on the standard library, so it can be deployed next to lambda_upload.py.
+The body is fed in chunks of any size and comes back as events:
+
+    ("headers", {"content-disposition": ..., ...})  start of a part
+    ("data", memoryview)                            part content, in order
+    ("part_end", None)                              end of the part
+
+Part content is handed out as memoryview slices of the chunks that were fed, so it
+is not copied; the parser itself only keeps the few bytes at the end of a chunk that
+could be the start of a boundary, plus the headers of the part being read.
+Content is returned exactly as sent: nothing is stripped from it.
+"""
+import re
+from typing import Dict, Iterator, Tuple
+
+PREAMBLE, AFTER_BOUNDARY, HEADERS, BODY, EPILOGUE = range(5)
+
+# Transport padding allowed between a boundary and its CRLF
+MAX_BOUNDARY_PADDING = 64
+
+_PARAM_PATTERN = re.compile(r';\s*([^=;\s]+)\s*=\s*("(?:[^"\\]|\\.)*"|[^;]*)')
+
+
+class MultipartError(ValueError):
+    """The body is not valid multipart/form-data"""
+
+
+class MultipartStreamParser:
+
+    def __init__(self, boundary: bytes, max_header_size: int = 16 * 1024):
+        if not boundary or len(boundary) > 200:
+            raise MultipartError("Invalid multipart boundary")
+        # Every boundary but the first follows a CRLF; the first one is matched by
+        # starting out as if a CRLF had just been read
+        self.delimiter = b"\r\n--" + boundary
+        self.max_header_size = max_header_size
+        self.state = PREAMBLE
+        self._carry = b"\r\n"
+        self._pending = bytearray()
+
+    @property
+    def finished(self) -> bool:
+        return self.state == EPILOGUE
+
+    def feed(self, data: bytes) -> Iterator[Tuple[str, object]]:
+        """Parse the next chunk of the body, yielding the events it completes"""
+        view = memoryview(data)
+        pos = 0
+        while pos < len(data):
+            if self.state in (PREAMBLE, BODY):
+                pos = yield from self._read_body(data, view, pos)
+            elif self.state == AFTER_BOUNDARY:
+                pos = self._read_after_boundary(data, pos)
+            elif self.state == HEADERS:
+                pos = yield from self._read_headers(data, pos)
+            else:
+                # Anything after the closing boundary is ignored
+                return
+
+    def close(self) -> None:
+        """Check that the body ended with the closing boundary"""
+        if self.state != EPILOGUE:
+            raise MultipartError("The multipart body ended before its closing boundary")
+
+    def _read_body(self, data: bytes, view: memoryview, pos: int):
+        delimiter = self.delimiter
+        keep = len(delimiter) - 1
+        emit = self.state == BODY
+
+        if self._carry:
+            # A boundary may start in the bytes held back from the previous chunk
+            head = self._carry + bytes(view[pos:pos + keep])
+            index = head.find(delimiter)
+            if index != -1 and index < len(self._carry):
+                if emit and index:
+                    yield "data", memoryview(self._carry)[:index]
+                consumed = index + len(delimiter) - len(self._carry)
+                self._carry = b""
+                yield from self._boundary_found(emit)
+                return pos + consumed
+            if len(head) < len(self._carry) + keep:
+                # Not enough data yet to tell
+                self._carry = head
+                return len(data)
+            if emit:
+                yield "data", memoryview(self._carry)
+            self._carry = b""
+
+        index = data.find(delimiter, pos)
+        if index != -1:
+            if emit and index > pos:
+                yield "data", view[pos:index]
+            yield from self._boundary_found(emit)
+            return index + len(delimiter)
+
+        # Hold back what could be the start of a boundary
+        safe_end = max(len(data) - keep, pos)
+        if emit and safe_end > pos:
+            yield "data", view[pos:safe_end]
+        self._carry = bytes(view[safe_end:])
+        return len(data)
+
+    def _boundary_found(self, in_part: bool):
+        self.state = AFTER_BOUNDARY
+        self._pending = bytearray()
+        if in_part:
+            yield "part_end", None
+
+    def _read_after_boundary(self, data: bytes, pos: int) -> int:
+        # "--" closes the body and CRLF starts the next part; only a few bytes are looked at
+        while pos < len(data):
+            self._pending += data[pos:pos + 1]
+            pos += 1
+            if self._pending == b"--":
+                self.state = EPILOGUE
+                return len(data)
+            if self._pending.endswith(b"\r\n"):
+                if self._pending[:-2].strip(b" \t"):
+                    raise MultipartError("Unexpected data after a boundary")
+                self.state = HEADERS
+                self._pending = bytearray()
+                return pos
+            if len(self._pending) > MAX_BOUNDARY_PADDING:
+                raise MultipartError("Unexpected data after a boundary")
+        return pos
+
+    def _read_headers(self, data: bytes, pos: int):
+        previous = len(self._pending)
+        self._pending += data[pos:pos + self.max_header_size + 4 - previous]
+
+        if self._pending.startswith(b"\r\n"):
+            # A part without headers
+            header_block, end = b"", 2
+        else:
+            index = self._pending.find(b"\r\n\r\n", max(previous - 3, 0))
+            if index == -1:
+                if len(self._pending) > self.max_header_size:
+                    raise MultipartError("Part headers are too large")
+                return len(data)
+            header_block, end = bytes(self._pending[:index]), index + 4
+
+        self._pending = bytearray()
+        self.state = BODY
+        yield "headers", parse_headers(header_block)
+        return pos + end - previous
+
+
+def parse_headers(block: bytes) -> Dict[str, str]:
+    """Header lines of a part, with lowercase names"""
+    headers = {}
+    for line in block.split(b"\r\n"):
+        if not line:
+            continue
+        name, separator, value = line.partition(b":")
+        if not separator:
+            raise MultipartError("Malformed part header")
+        # Browsers send file names as raw UTF-8
+        headers[name.strip().decode("latin-1").lower()] = value.strip().decode("utf-8", errors="replace")
+    return headers
+
+
+def parse_options(value: str) -> Tuple[str, Dict[str, str]]:
+    """Split a header such as Content-Disposition into its main value and parameters"""
+    main, _, rest = value.partition(";")
+    params = {}
+    for name, raw in _PARAM_PATTERN.findall(";" + rest):
+        raw = raw.strip()
+        if raw.startswith('"'):
+            raw = re.sub(r"\\(.)", r"\1", raw[1:-1])
+        params[name.lower()] = raw
+    return main.strip().lower(), params
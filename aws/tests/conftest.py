@@ -0,0 +1,8 @@
+import os
+import sys
+
+# The Lambda modules are deployed flat and import each other as top-level modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# lambda_upload creates its S3 client at import time; the tests never let it reach AWS
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
@@ -0,0 +1,335 @@
+import base64
+import hashlib
+import json
+import random
+import tracemalloc
+
+import pytest
+
+import lambda_upload
+from lambda_upload import S3MultipartWriter, iter_body, lambda_handler, upload_multipart_file
+from multipart_stream import MultipartError, MultipartStreamParser, parse_options
+
+
+BOUNDARY = b"----WebKitFormBoundary7MA4YWxkTrZu0gW"
+FILE_HEADERS = (
+    b'Content-Disposition: form-data; name="file"; filename="book.pdf"\r\n'
+    b"Content-Type: application/pdf\r\n"
+)
+FIELD_HEADERS = b'Content-Disposition: form-data; name="title"\r\n'
+
+
+class FakeS3Client:
+    """Keeps uploaded objects in memory, checking the calls S3MultipartWriter makes"""
+
+    def __init__(self):
+        self.objects = {}
+        self.uploads = {}
+        self.aborted = []
+
+    def put_object(self, Bucket, Key, Body):
+        self.objects[Key] = bytes(Body)
+
+    def create_multipart_upload(self, Bucket, Key):
+        upload_id = f"upload-{len(self.uploads) + len(self.objects) + 1}"
+        self.uploads[upload_id] = {}
+        return {"UploadId": upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        self.uploads[UploadId][PartNumber] = bytes(Body)
+        return {"ETag": f'"etag-{PartNumber}"'}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        parts = self.uploads.pop(UploadId)
+        numbers = [part["PartNumber"] for part in MultipartUpload["Parts"]]
+        assert numbers == sorted(parts)
+        assert [part["ETag"] for part in MultipartUpload["Parts"]] == [f'"etag-{n}"' for n in numbers]
+        self.objects[Key] = b"".join(parts[number] for number in numbers)
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.uploads.pop(UploadId)
+        self.aborted.append(Key)
+
+
+class HashingS3Client(FakeS3Client):
+    """Only keeps the size and SHA-256 of multipart uploads, for bodies too large to hold"""
+
+    def create_multipart_upload(self, Bucket, Key):
+        response = super().create_multipart_upload(Bucket, Key)
+        self.uploads[response["UploadId"]] = {"next": 1, "size": 0, "sha256": hashlib.sha256()}
+        return response
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        upload = self.uploads[UploadId]
+        assert PartNumber == upload["next"]
+        upload["next"] += 1
+        upload["size"] += len(Body)
+        upload["sha256"].update(Body)
+        return {"ETag": f'"etag-{PartNumber}"'}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        upload = self.uploads.pop(UploadId)
+        assert [part["PartNumber"] for part in MultipartUpload["Parts"]] == list(range(1, upload["next"]))
+        self.objects[Key] = (upload["size"], upload["sha256"].hexdigest())
+
+
+def build_body(parts, boundary=BOUNDARY, preamble=b"", epilogue=b"", padding=b""):
+    """A multipart body from (header block, content) pairs"""
+    body = bytearray()
+    if preamble:
+        body += preamble + b"\r\n"
+    for headers, content in parts:
+        body += b"--" + boundary + padding + b"\r\n" + headers + b"\r\n" + content + b"\r\n"
+    body += b"--" + boundary + b"--" + padding + b"\r\n" + epilogue
+    return bytes(body)
+
+
+def split_randomly(data, rng, max_size):
+    """data cut into chunks of 1 to max_size bytes"""
+    pos = 0
+    while pos < len(data):
+        size = rng.randint(1, max_size)
+        yield data[pos:pos + size]
+        pos += size
+
+
+def parse_all(chunks, boundary=BOUNDARY):
+    """The (headers, content) of every part, from the events of the parser"""
+    parser = MultipartStreamParser(boundary)
+    parts = []
+    open_part = False
+    for chunk in chunks:
+        for event, value in parser.feed(chunk):
+            if event == "headers":
+                assert not open_part
+                parts.append((value, bytearray()))
+                open_part = True
+            elif event == "data":
+                assert open_part
+                parts[-1][1].extend(value)
+            else:
+                assert event == "part_end" and open_part
+                open_part = False
+    parser.close()
+    assert not open_part
+    return [(headers, bytes(content)) for headers, content in parts]
+
+
+def random_content(rng, boundary):
+    """Bytes that are mostly pieces of the delimiter, to land them on chunk edges"""
+    delimiter = b"\r\n--" + boundary
+    pieces = [
+        b"\r", b"\n", b"\r\n", b"-", b"--", b"\r\n--", b"\r\n\r\n",
+        delimiter[:-1], delimiter[:len(delimiter) // 2], boundary[1:],
+    ]
+    while True:
+        content = bytearray()
+        for _ in range(rng.randint(0, 40)):
+            if rng.random() < 0.5:
+                content += rng.choice(pieces)
+            else:
+                content += rng.randbytes(rng.randint(1, 64))
+        # RFC 2046: the boundary never appears in the content it delimits
+        if boundary not in content:
+            return bytes(content)
+
+
+@pytest.mark.parametrize("seed", range(150))
+def test_fuzzed_bodies_parse_the_same_in_any_chunking(seed):
+    rng = random.Random(seed)
+    boundary = rng.choice([BOUNDARY, b"x", b"AaB03x", rng.randbytes(16).hex().encode()])
+    delimiter_size = len(boundary) + 4
+
+    parts = []
+    expected = []
+    for index in range(rng.randint(1, 4)):
+        content = random_content(rng, boundary)
+        kind = rng.choice(["file", "field", "none"])
+        if kind == "file":
+            parts.append((FILE_HEADERS, content))
+            expected.append(({"content-disposition": 'form-data; name="file"; filename="book.pdf"',
+                              "content-type": "application/pdf"}, content))
+        elif kind == "field":
+            parts.append((FIELD_HEADERS, content))
+            expected.append(({"content-disposition": 'form-data; name="title"'}, content))
+        else:
+            parts.append((b"", content))
+            expected.append(({}, content))
+
+    body = build_body(
+        parts,
+        boundary,
+        preamble=rng.choice([b"", b"This is the preamble", b"--" + boundary[:-1]]),
+        epilogue=rng.choice([b"", b"epilogue", b"\r\n--" + boundary + b"\r\nignored"]),
+        padding=rng.choice([b"", b" ", b" \t "]),
+    )
+
+    assert parse_all([body], boundary) == expected
+    for max_size in (1, 2, delimiter_size - 1, delimiter_size, delimiter_size + 1, 97):
+        assert parse_all(split_randomly(body, rng, max_size), boundary) == expected
+
+
+def test_data_events_do_not_copy_large_chunks():
+    content = bytes(range(256)) * 64
+    body = build_body([(FILE_HEADERS, content)])
+    parser = MultipartStreamParser(BOUNDARY)
+    data_events = [value for event, value in parser.feed(body) if event == "data"]
+    assert len(data_events) == 1
+    assert isinstance(data_events[0], memoryview) and data_events[0].obj is body
+    assert data_events[0] == content
+
+
+@pytest.mark.parametrize("body, message", [
+    (build_body([(FILE_HEADERS, b"data")])[:-8], "ended before its closing boundary"),
+    (b"--" + BOUNDARY + b"garbage\r\n", "Unexpected data after a boundary"),
+    (b"--" + BOUNDARY + b" " * 100 + b"\r\n", "Unexpected data after a boundary"),
+    (b"--" + BOUNDARY + b"\r\nNo colon here\r\n\r\n", "Malformed part header"),
+    (b"--" + BOUNDARY + b"\r\nX-Big: " + b"a" * 20000, "Part headers are too large"),
+    (b"no boundary anywhere", "ended before its closing boundary"),
+])
+def test_malformed_bodies_are_rejected(body, message):
+    with pytest.raises(MultipartError, match=message):
+        parse_all(split_randomly(body, random.Random(0), 7))
+
+
+def test_boundary_is_validated():
+    with pytest.raises(MultipartError):
+        MultipartStreamParser(b"")
+    with pytest.raises(MultipartError):
+        MultipartStreamParser(b"x" * 201)
+
+
+def test_parse_options():
+    assert parse_options('form-data; name="file"; filename="a \\"b\\".pdf"') == (
+        "form-data", {"name": "file", "filename": 'a "b".pdf'}
+    )
+    assert parse_options("multipart/form-data; boundary=AaB03x") == (
+        "multipart/form-data", {"boundary": "AaB03x"}
+    )
+
+
+PART_SIZE = 64
+
+
+@pytest.mark.parametrize("size", [0, 1, PART_SIZE - 1, PART_SIZE, PART_SIZE + 1, 3 * PART_SIZE + 5, 1000])
+@pytest.mark.parametrize("seed", range(3))
+def test_upload_round_trip_is_byte_exact(size, seed):
+    rng = random.Random(seed * 1000 + size)
+    content = rng.randbytes(size)
+    body = build_body([
+        (FIELD_HEADERS, b"A title"),
+        (FILE_HEADERS, content),
+        (b'Content-Disposition: form-data; name="file"; filename="second.pdf"\r\n', b"ignored"),
+    ])
+    client = FakeS3Client()
+
+    writer = upload_multipart_file(
+        split_randomly(body, rng, rng.choice([1, 5, 50, 4096])),
+        BOUNDARY,
+        lambda file_name: S3MultipartWriter(file_name, part_size=PART_SIZE, client=client, bucket="test"),
+    )
+
+    assert writer.key == "book.pdf"
+    assert client.objects == {"book.pdf": content}
+    assert writer.size == size
+    assert writer.sha256.hexdigest() == hashlib.sha256(content).hexdigest()
+    assert client.uploads == {}
+
+
+def test_upload_without_the_file_field_returns_none():
+    body = build_body([(FIELD_HEADERS, b"A title")])
+    client = FakeS3Client()
+    writer = upload_multipart_file([body], BOUNDARY, lambda name: S3MultipartWriter(name, client=client))
+    assert writer is None
+    assert client.objects == {}
+
+
+def test_truncated_upload_is_aborted():
+    body = build_body([(FILE_HEADERS, bytes(10 * PART_SIZE))])[:-100]
+    client = FakeS3Client()
+    with pytest.raises(MultipartError):
+        upload_multipart_file(
+            split_randomly(body, random.Random(1), 50),
+            BOUNDARY,
+            lambda name: S3MultipartWriter(name, part_size=PART_SIZE, client=client),
+        )
+    assert client.aborted == ["book.pdf"]
+    assert client.objects == {} and client.uploads == {}
+
+
+@pytest.mark.parametrize("chunk_size", [3, 10, 1024 * 1024])
+def test_iter_body_decodes_base64_in_chunks(chunk_size):
+    data = random.Random(chunk_size).randbytes(5000)
+    event = {"body": base64.b64encode(data).decode("ascii"), "isBase64Encoded": True}
+    assert b"".join(iter_body(event, chunk_size)) == data
+    assert b"".join(iter_body({"body": "plain text"}, chunk_size)) == b"plain text"
+
+
+def test_lambda_handler_uploads_base64_event(monkeypatch):
+    client = FakeS3Client()
+    monkeypatch.setattr(lambda_upload, "s3_client", client)
+    content = random.Random(7).randbytes(20000)
+    headers = b'Content-Disposition: form-data; name="file"; filename="C:\\\\books\\\\dune.epub"\r\n'
+    body = build_body([(FIELD_HEADERS, b"Dune"), (headers, content)])
+    event = {
+        "headers": {"Content-Type": f"multipart/form-data; boundary={BOUNDARY.decode()}"},
+        "body": base64.b64encode(body).decode("ascii"),
+        "isBase64Encoded": True,
+    }
+
+    response = lambda_handler(event, None)
+
+    assert response["statusCode"] == 200
+    result = json.loads(response["body"])
+    assert result["file_name"] == "dune.epub"
+    assert result["size"] == len(content)
+    assert result["sha256"] == hashlib.sha256(content).hexdigest()
+    assert client.objects == {"dune.epub": content}
+
+
+def test_lambda_handler_rejects_bad_requests(monkeypatch):
+    monkeypatch.setattr(lambda_upload, "s3_client", FakeS3Client())
+    content_type = {"content-type": f"multipart/form-data; boundary={BOUNDARY.decode()}"}
+
+    assert lambda_handler({"headers": {"content-type": "application/json"}, "body": "{}"}, None)["statusCode"] == 400
+    no_file = {"headers": content_type, "body": build_body([(FIELD_HEADERS, b"x")]).decode()}
+    assert lambda_handler(no_file, None)["statusCode"] == 400
+    truncated = {"headers": content_type, "body": build_body([(FILE_HEADERS, b"x")])[:-10].decode()}
+    response = lambda_handler(truncated, None)
+    assert response["statusCode"] == 400
+    assert json.loads(response["body"])["message"] == "Malformed multipart body"
+
+
+def test_one_gib_upload_runs_in_bounded_memory():
+    block_size = 1024 * 1024
+    block_count = 1024
+    block = random.Random(1024).randbytes(block_size)
+    assert BOUNDARY not in block
+    part_size = 8 * 1024 * 1024
+    expected = hashlib.sha256()
+
+    def chunks():
+        yield b"--" + BOUNDARY + b"\r\n" + FILE_HEADERS + b"\r\n"
+        for _ in range(block_count):
+            expected.update(block)
+            yield block
+        yield b"\r\n--" + BOUNDARY + b"--\r\n"
+
+    client = HashingS3Client()
+    tracemalloc.start()
+    try:
+        writer = upload_multipart_file(
+            chunks(),
+            BOUNDARY,
+            lambda name: S3MultipartWriter(name, part_size=part_size, client=client),
+        )
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    size = block_size * block_count
+    assert writer.size == size
+    assert writer.sha256.hexdigest() == expected.hexdigest()
+    assert client.objects == {"book.pdf": (size, expected.hexdigest())}
+    # The part being filled plus a little: nothing proportional to the body
+    assert peak < part_size + 4 * block_size
@@ -0,0 +1,42 @@
+"""Add stored files
+
+Revision ID: 081719c6e044
+Revises: ab26717dd758
+Create Date: 2026-10-18 09:08:51.662699
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '081719c6e044'
+down_revision: Union[str, None] = 'ab26717dd758'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('stored_files',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('sha256', sa.String(length=64), nullable=False),
+    sa.Column('key', sa.Text(), nullable=False),
+    sa.Column('size', sa.BigInteger(), nullable=False),
+    sa.Column('content_type', sa.Text(), nullable=True),
+    sa.Column('ref_count', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('last_used_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('key'),
+    sa.UniqueConstraint('sha256')
+    )
+    op.create_index('ix_stored_files_orphans', 'stored_files', ['last_used_at'], unique=False, postgresql_where=sa.text('ref_count = 0'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_stored_files_orphans', table_name='stored_files', postgresql_where=sa.text('ref_count = 0'))
+    op.drop_table('stored_files')
@@ -0,0 +1,43 @@
+"""Add books keyset pagination indexes
+
+Revision ID: 119b3987751d
+Revises: a47c170d0759
+Create Date: 2026-10-18 08:29:19.699136
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '119b3987751d'
+down_revision: Union[str, None] = 'a47c170d0759'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Keyset pagination orders by (created_at, id), so created_at can no longer be NULL
+    op.execute("UPDATE books SET created_at = now() WHERE created_at IS NULL")
+    op.alter_column('books', 'created_at', existing_type=sa.DateTime(), nullable=False)
+
+    op.create_index('ix_books_created_at_id', 'books', ['created_at', 'id'])
+    op.create_index('ix_books_category_id', 'books', ['category_id'])
+    op.create_index('ix_books_lower_author', 'books', [sa.text('lower(author)')])
+    op.create_index(
+        'ix_books_lower_title_prefix',
+        'books',
+        [sa.text('lower(title) text_pattern_ops')]
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_books_lower_title_prefix', table_name='books')
+    op.drop_index('ix_books_lower_author', table_name='books')
+    op.drop_index('ix_books_category_id', table_name='books')
+    op.drop_index('ix_books_created_at_id', table_name='books')
+    op.alter_column('books', 'created_at', existing_type=sa.DateTime(), nullable=True)
@@ -0,0 +1,28 @@
+"""Add cover variants to books
+
+Revision ID: 28905c3f935e
+Revises: 081719c6e044
+Create Date: 2026-10-18 09:16:28.781247
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '28905c3f935e'
+down_revision: Union[str, None] = '081719c6e044'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('books', sa.Column('cover_variants', postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('books', 'cover_variants')
@@ -0,0 +1,32 @@
+"""Scrub card data from finished payment jobs
+
+Revision ID: 6154851bb176
+Revises: 28905c3f935e
+Create Date: 2026-10-18 09:42:16.841066
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6154851bb176'
+down_revision: Union[str, None] = '28905c3f935e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Remove the card token and customer details kept in finished payment jobs."""
+    op.execute(
+        "UPDATE jobs SET payload = payload - ARRAY['token_card', 'card_fingerprint', 'identification', "
+        "'phone', 'city', 'address', 'client_ip'] "
+        "WHERE queue = 'payments' AND status IN ('done', 'failed')"
+    )
+
+
+def downgrade() -> None:
+    """The removed fields cannot be restored."""
+    pass
@@ -0,0 +1,37 @@
+"""Add ePayco customers
+
+Revision ID: 8af3d0abb92a
+Revises: 8b7d69672878
+Create Date: 2026-10-18 08:44:44.443474
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8af3d0abb92a'
+down_revision: Union[str, None] = '8b7d69672878'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('epayco_customers',
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('customer_id', sa.Text(), nullable=False),
+    sa.Column('token_card', sa.Text(), nullable=False),
+    sa.Column('card_fingerprint', sa.String(length=64), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('epayco_customers')
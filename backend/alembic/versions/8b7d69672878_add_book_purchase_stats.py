@@ -0,0 +1,51 @@
+"""Add book purchase stats
+
+Revision ID: 8b7d69672878
+Revises: 9d352923ac02
+Create Date: 2026-10-18 08:35:48.403901
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b7d69672878'
+down_revision: Union[str, None] = '9d352923ac02'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('book_purchase_stats',
+    sa.Column('book_id', sa.UUID(), nullable=False),
+    sa.Column('purchase_count', sa.Integer(), nullable=False),
+    sa.Column('quantity_sold', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['book_id'], ['books.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('book_id')
+    )
+    op.create_index(
+        'ix_book_purchase_stats_ranking',
+        'book_purchase_stats',
+        [sa.text('purchase_count DESC'), 'book_id']
+    )
+
+    # Backfill from the orders completed so far
+    op.execute("""
+        INSERT INTO book_purchase_stats (book_id, purchase_count, quantity_sold, updated_at)
+        SELECT order_items.book_id, count(order_items.id), coalesce(sum(order_items.quantity), 0), now()
+        FROM order_items
+        JOIN orders ON orders.id = order_items.order_id
+        WHERE orders.status = 'completed' AND order_items.book_id IS NOT NULL
+        GROUP BY order_items.book_id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_book_purchase_stats_ranking', table_name='book_purchase_stats')
+    op.drop_table('book_purchase_stats')
@@ -0,0 +1,38 @@
+"""Add books trigram indexes
+
+Revision ID: 9d352923ac02
+Revises: 9e251dc62366
+Create Date: 2026-10-18 08:33:51.088535
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d352923ac02'
+down_revision: Union[str, None] = '9e251dc62366'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # GiST (not GIN) so top-k suggestions can be read in distance order straight from the index
+    op.create_index(
+        'ix_books_title_trgm', 'books', ['title'],
+        postgresql_using='gist', postgresql_ops={'title': 'gist_trgm_ops'}
+    )
+    op.create_index(
+        'ix_books_author_trgm', 'books', ['author'],
+        postgresql_using='gist', postgresql_ops={'author': 'gist_trgm_ops'}
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_books_author_trgm', table_name='books', postgresql_using='gist')
+    op.drop_index('ix_books_title_trgm', table_name='books', postgresql_using='gist')
@@ -0,0 +1,43 @@
+"""Add books full text search
+
+Revision ID: 9e251dc62366
+Revises: 119b3987751d
+Create Date: 2026-10-18 08:30:14.769458
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9e251dc62366'
+down_revision: Union[str, None] = '119b3987751d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+SEARCH_VECTOR_EXPRESSION = (
+    "setweight(to_tsvector('english'::regconfig, coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english'::regconfig, coalesce(author, '')), 'B') || "
+    "setweight(to_tsvector('english'::regconfig, coalesce(description, '')), 'C')"
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('books', sa.Column(
+        'search_vector',
+        postgresql.TSVECTOR(),
+        sa.Computed(SEARCH_VECTOR_EXPRESSION, persisted=True),
+        nullable=True
+    ))
+    op.create_index('ix_books_search_vector', 'books', ['search_vector'], postgresql_using='gin')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_books_search_vector', table_name='books', postgresql_using='gin')
+    op.drop_column('books', 'search_vector')
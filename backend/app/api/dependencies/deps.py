@@ -9,6 +9,8 @@ from app.models.user import User
 from app.config.environment import JWT_SECRET
 from app.schemas.user import TokenPayload
 from app.api.dependencies.session import SessionDep
+from app.utils.session_cache import cache_validated_token, get_cached_auth, load_cached_user, user_changes
+from app.services.session_activity import activity_tracker
 
 
 # OAuth2 scheme for token authentication
@@ -59,7 +61,15 @@ def get_current_user(
         token_data = TokenPayload(sub=email)
     except JWTError:
         raise credentials_exception
+    
+    # Tokens validated recently are served from the in-process cache without
+    # touching the database; revocations evict them immediately
+    cached_auth = get_cached_auth(token)
+    if cached_auth is not None:
+        activity_tracker.touch(cached_auth.session_id)
+        return load_cached_user(session, cached_auth)
         
+    changes = user_changes()
     user = get_user_by_email(session, email=token_data.sub)
     if user is None:
         raise credentials_exception
@@ -73,9 +83,10 @@ def get_current_user(
     if not user_session.is_valid:
         raise session_invalid_exception
     
-    # Update last activity for valid sessions
-    user_session.update_activity()
-    session.commit()
+    cache_validated_token(token, user, user_session, changes)
+    
+    # Last activity is written in bulk by the background flusher
+    activity_tracker.touch(user_session.id)
         
     return user
 
@@ -112,7 +123,13 @@ def get_current_user_optional(
         token_data = TokenPayload(sub=email)
     except JWTError:
         return None
+    
+    cached_auth = get_cached_auth(token)
+    if cached_auth is not None:
+        activity_tracker.touch(cached_auth.session_id)
+        return load_cached_user(session, cached_auth)
         
+    changes = user_changes()
     user = get_user_by_email(session, email=token_data.sub)
     if user is None:
         return None
@@ -126,9 +143,10 @@ def get_current_user_optional(
     if not user_session.is_valid:
         return None
     
-    # Update last activity for valid sessions
-    user_session.update_activity()
-    session.commit()
+    cache_validated_token(token, user, user_session, changes)
+    
+    # Last activity is written in bulk by the background flusher
+    activity_tracker.touch(user_session.id)
         
     return user
 
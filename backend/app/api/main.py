@@ -5,7 +5,9 @@ from app.api.routes import users
 from app.api.routes import categories
 from app.api.routes import cart
 from app.api.routes import orders
+from app.api.routes import payments
 from app.api.routes import files
+from app.api.routes import covers
 from app.api.routes import user_hidden_books
 from app.api.routes import admin
 from app.api.routes import auth
@@ -19,6 +21,8 @@ api_router.include_router(books.router, prefix="/books", tags=["books"])
 api_router.include_router(categories.router, prefix="/categories", tags=["categories"])
 api_router.include_router(cart.router, prefix="/cart", tags=["cart"])
 api_router.include_router(orders.router, prefix="/orders", tags=["orders"])
+api_router.include_router(payments.router, prefix="/payments", tags=["payments"])
 api_router.include_router(files.router, prefix="/files", tags=["files"])
+api_router.include_router(covers.router, prefix="/covers", tags=["covers"])
 api_router.include_router(user_hidden_books.router, prefix="/user-books", tags=["user-books"])
 api_router.include_router(admin.router, prefix="/admin", tags=["admin"])
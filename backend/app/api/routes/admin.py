@@ -6,7 +6,14 @@ from decimal import Decimal
 
 from app.api.dependencies.session import SessionDep
 from app.api.dependencies.deps import UserIsAdminDep
+from app.crud.email_dead_letters import get_email_dead_letters
+from app.crud.purchase_stats import get_top_selling_books_db
+from app.db.pool_metrics import TimedAsyncAdaptedQueuePool, TimedQueuePool
+from app.db.session import async_engine, engine
 from app.models.order import Order
+from app.services.epayco import epayco_client
+from app.services.http_clients import http_clients
+from app.services.smtp_pool import smtp_pool
 from app.models.payment import Payment
 from app.schemas.order import OrderOut
 from pydantic import BaseModel
@@ -157,29 +164,7 @@ def get_top_selling_books(
     """
     Get top selling books based on completed orders
     """
-    from app.models.book import Book
-    from app.models.order_item import OrderItem
-    
-    # Query to get books with their sales count
-    top_books = session.query(
-        Book.id,
-        Book.title,
-        Book.author,
-        Book.price,
-        Book.cover_url,
-        func.count(OrderItem.id).label('sales_count'),
-        func.sum(OrderItem.quantity).label('total_quantity_sold')
-    ).join(
-        OrderItem, Book.id == OrderItem.book_id
-    ).join(
-        Order, OrderItem.order_id == Order.id
-    ).filter(
-        Order.status == "completed"
-    ).group_by(
-        Book.id, Book.title, Book.author, Book.price, Book.cover_url
-    ).order_by(
-        desc('sales_count')
-    ).limit(limit).all()
+    top_books = get_top_selling_books_db(session, limit=limit)
     
     return {
         "top_selling_books": [
@@ -224,4 +209,64 @@ def get_payment_methods_summary(
             }
             for method in payment_methods
         ]
-    } 
\ No newline at end of file
+    } 
+
+
+@router.get("/db-pool")
+def get_db_pool_stats(
+    current_user: UserIsAdminDep
+):
+    """
+    Get connection pool occupancy and wait-time histograms for both database engines
+    """
+    return {
+        "sync": TimedQueuePool.metrics.snapshot(engine.pool),
+        "async": TimedAsyncAdaptedQueuePool.metrics.snapshot(async_engine.sync_engine.pool)
+    }
+
+
+@router.get("/payment-gateway")
+def get_payment_gateway_stats(
+    current_user: UserIsAdminDep
+):
+    """
+    Get ePayco call counts, latency histograms and saved customer reuse counters
+    """
+    return epayco_client.metrics.snapshot()
+
+
+@router.get("/http-clients")
+def get_http_client_stats(
+    current_user: UserIsAdminDep
+):
+    """
+    Get call counts and latency histograms of the shared outbound HTTP clients, per upstream
+    """
+    return http_clients.snapshot()
+
+
+@router.get("/emails")
+def get_email_delivery_stats(
+    session: SessionDep,
+    current_user: UserIsAdminDep,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=200)
+):
+    """
+    Get SMTP connection reuse counters and the emails that could not be delivered
+    """
+    dead_letters = get_email_dead_letters(session, skip=skip, limit=limit)
+    return {
+        "smtp": smtp_pool.snapshot(),
+        "dead_letters": [
+            {
+                "id": str(dead_letter.id),
+                "job_id": str(dead_letter.job_id),
+                "recipients": dead_letter.recipients,
+                "subject": dead_letter.subject,
+                "attempts": dead_letter.attempts,
+                "last_error": dead_letter.last_error,
+                "created_at": dead_letter.created_at
+            } for dead_letter in dead_letters
+        ]
+    }
@@ -1,20 +1,32 @@
-from fastapi import APIRouter, HTTPException, Query
-from typing import List
+import os
+import uuid
+from datetime import timezone
+from email.utils import format_datetime
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import RedirectResponse, StreamingResponse
+from typing import List, Optional
 from fastapi import status
 
-from app.api.dependencies.session import SessionDep
-from app.schemas.book import BookCreate, BookOut, PurchasedBookOut
+from app.api.dependencies.session import AsyncSessionDep, SessionDep
+from app.config.environment import S3_DOWNLOAD_URL_EXPIRES_SECONDS
+from app.schemas.book import BookCreate, BookOut, BookSearchResponse, BookSuggestion, PurchasedBookOut
 from app.crud.books import (
     create_book_db, 
-    get_all_books, 
-    get_visible_books_for_user,
+    get_books_page,
     get_book_by_id,
     update_book_db,
     delete_book_db,
     get_most_purchased_books,
-    get_latest_books
+    get_latest_books,
+    search_books,
+    suggest_books
 )
 from app.api.dependencies.deps import CurrentUserDep, UserIsAdminDep, OptionalCurrentUserDep
+from app.crud.orders import has_purchased_book_async
+from app.services.job_worker import job_worker
+from app.services.storage import content_disposition, head_object, iter_object, key_from_file_url, signed_download_url, signed_file_urls
+from app.utils.http_range import RangeNotSatisfiable, if_range_matches, parse_range_header
+from app.utils.response_cache import response_cache
 from app.models.book import Book
 from app.models.order import Order
 from app.models.order_item import OrderItem
@@ -24,20 +36,48 @@ router = APIRouter()
 
 @router.get("/", response_model=List[BookOut])
 def get_books(
+    response: Response,
     session: SessionDep,
     current_user: OptionalCurrentUserDep,
-    include_hidden: bool = Query(False, description="Include books hidden by the user")
+    include_hidden: bool = Query(False, description="Include books hidden by the user"),
+    limit: Optional[int] = Query(None, ge=1, le=100, description="Page size; omit to get every book"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value of the previous page"),
+    category_id: Optional[uuid.UUID] = Query(None, description="Filter by category"),
+    author: Optional[str] = Query(None, description="Filter by author (case-insensitive)"),
+    min_price: Optional[float] = Query(None, ge=0, description="Minimum price"),
+    max_price: Optional[float] = Query(None, ge=0, description="Maximum price"),
+    title_prefix: Optional[str] = Query(None, min_length=1, description="Filter by title prefix (case-insensitive)")
 ):
-    """Get all books, optionally filtering out hidden books for the current user"""
-    if current_user and not include_hidden:
-        books = get_visible_books_for_user(session, current_user.id)
-    else:
-        books = get_all_books(session)
+    """
+    Get books newest first, optionally filtering out hidden books for the current user.
+    When a limit is given the cursor of the next page is returned in the X-Next-Cursor header.
+    """
+    user_id = current_user.id if current_user and not include_hidden else None
+    try:
+        books, next_cursor = get_books_page(
+            session,
+            user_id=user_id,
+            limit=limit,
+            cursor=cursor,
+            category_id=category_id,
+            author=author,
+            min_price=min_price,
+            max_price=max_price,
+            title_prefix=title_prefix
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return books
 
 @router.post("/", response_model=BookOut, status_code=status.HTTP_201_CREATED)
 def create_book(book: BookCreate, session: SessionDep, current_user: UserIsAdminDep):
     db_book = create_book_db(session, book)
+    if db_book.cover_url:
+        # Render the cover variants now rather than at the next poll
+        job_worker.notify()
     return db_book
 
 @router.get("/purchased", response_model=List[PurchasedBookOut])
@@ -68,6 +108,9 @@ def get_user_purchased_books(session: SessionDep, current_user: CurrentUserDep):
         UserHiddenBook.id.is_(None)  # Exclude hidden books
     ).all()
 
+    # Stored file URLs expire; hand out freshly signed ones (signed locally and cached)
+    file_urls = signed_file_urls(book_data.file_url for book_data in purchased_books_data)
+
     # Convert to list of dictionaries for the response model
     purchased_books = []
     for book_data in purchased_books_data:
@@ -77,7 +120,7 @@ def get_user_purchased_books(session: SessionDep, current_user: CurrentUserDep):
             "author": book_data.author,
             "description": book_data.description,
             "cover_url": book_data.cover_url,
-            "file_url": book_data.file_url,
+            "file_url": file_urls.get(book_data.file_url),
             "order_id": book_data.order_id,
             "purchased_at": book_data.purchased_at
         })
@@ -86,6 +129,7 @@ def get_user_purchased_books(session: SessionDep, current_user: CurrentUserDep):
 
 @router.get("/most-purchased", response_model=List[BookOut])
 def get_most_purchased_books_route(
+    request: Request,
     session: SessionDep,
     current_user: OptionalCurrentUserDep
 ):
@@ -93,11 +137,18 @@ def get_most_purchased_books_route(
     Get the 3 most purchased books, excluding hidden books for the current user
     """
     user_id = current_user.id if current_user else None
-    books = get_most_purchased_books(session, user_id)
-    return books
+    return response_cache.respond(
+        request,
+        f"books:most-purchased:{user_id or 'anonymous'}",
+        List[BookOut],
+        lambda: get_most_purchased_books(session, user_id),
+        namespaces=("catalog", "rankings", f"user:{user_id}") if user_id else ("catalog", "rankings"),
+        private=user_id is not None
+    )
 
 @router.get("/latest", response_model=List[BookOut])
 def get_latest_books_route(
+    request: Request,
     session: SessionDep,
     current_user: OptionalCurrentUserDep
 ):
@@ -105,15 +156,118 @@ def get_latest_books_route(
     Get the 3 most recently created books, excluding hidden books for the current user
     """
     user_id = current_user.id if current_user else None
-    books = get_latest_books(session, user_id)
-    return books
+    return response_cache.respond(
+        request,
+        f"books:latest:{user_id or 'anonymous'}",
+        List[BookOut],
+        lambda: get_latest_books(session, user_id),
+        namespaces=("catalog", f"user:{user_id}") if user_id else ("catalog",),
+        private=user_id is not None
+    )
+
+@router.get("/search", response_model=BookSearchResponse)
+def search_books_route(
+    session: SessionDep,
+    current_user: OptionalCurrentUserDep,
+    q: str = Query(..., min_length=1, max_length=200, description="Search text"),
+    skip: int = Query(0, ge=0, description="Number of results to skip"),
+    limit: int = Query(20, ge=1, le=100, description="Maximum number of results to return")
+) -> BookSearchResponse:
+    """
+    Full-text search over title, author and description, best match first,
+    excluding hidden books for the current user
+    """
+    user_id = current_user.id if current_user else None
+    results, total = search_books(session, q, user_id=user_id, skip=skip, limit=limit)
+    return BookSearchResponse(
+        results=results,
+        total=total
+    )
+
+@router.get("/suggest", response_model=List[BookSuggestion])
+def suggest_books_route(
+    session: SessionDep,
+    q: str = Query(..., min_length=2, max_length=100, description="Prefix typed so far"),
+    limit: int = Query(8, ge=1, le=20, description="Maximum number of suggestions")
+):
+    """
+    Type-ahead suggestions matching titles and authors, tolerant to typos
+    """
+    return suggest_books(session, q, limit=limit)
 
 @router.get("/{book_id}", response_model=BookOut)
-def get_book(book_id: str, session: SessionDep):
-    book = get_book_by_id(session, book_id)
+def get_book(book_id: str, request: Request, session: SessionDep):
+    def load_book():
+        book = get_book_by_id(session, book_id)
+        if not book:
+            raise HTTPException(status_code=404, detail="Book not found")
+        return book
+    
+    return response_cache.respond(request, f"books:{book_id}", BookOut, load_book)
+
+@router.get("/{book_id}/download")
+async def download_book(
+    book_id: uuid.UUID,
+    request: Request,
+    session: AsyncSessionDep,
+    current_user: CurrentUserDep,
+    redirect: bool = Query(False, description="Redirect to a short-lived S3 URL instead of streaming the file")
+):
+    """
+    Download the file of a purchased book.
+    The file is streamed with Range and If-Range support, or with redirect=true
+    the client is sent to a presigned S3 URL valid for a few minutes.
+    """
+    book = await session.get(Book, book_id)
     if not book:
         raise HTTPException(status_code=404, detail="Book not found")
-    return book
+
+    if current_user.role != "admin" and not await has_purchased_book_async(session, current_user.id, book.id):
+        raise HTTPException(status_code=403, detail="Book not purchased")
+
+    key = key_from_file_url(book.file_url)
+    if key is None:
+        raise HTTPException(status_code=404, detail="Book file not available")
+    # Stored files are named after their hash; offer the title instead
+    filename = f"{book.title}{os.path.splitext(key)[1]}" if book.title else key.rsplit("/", 1)[-1]
+
+    if redirect:
+        url = signed_download_url(key, S3_DOWNLOAD_URL_EXPIRES_SECONDS, filename=filename)
+        return RedirectResponse(url, status_code=307, headers={"Cache-Control": "no-store"})
+
+    head = await head_object(key)
+    if head is None:
+        raise HTTPException(status_code=404, detail="Book file not available")
+
+    size = head["ContentLength"]
+    etag = head.get("ETag")
+    last_modified = head.get("LastModified")
+    headers = {
+        "Accept-Ranges": "bytes",
+        "Content-Disposition": content_disposition(filename),
+        "Cache-Control": "private, no-transform",
+    }
+    if etag:
+        headers["ETag"] = etag
+    if last_modified:
+        headers["Last-Modified"] = format_datetime(last_modified.astimezone(timezone.utc), usegmt=True)
+
+    byte_range = None
+    if if_range_matches(request.headers.get("if-range"), etag, last_modified):
+        try:
+            byte_range = parse_range_header(request.headers.get("range"), size)
+        except RangeNotSatisfiable:
+            raise HTTPException(status_code=416, detail="Range not satisfiable", headers={"Content-Range": f"bytes */{size}"})
+
+    media_type = head.get("ContentType") or "application/octet-stream"
+    if byte_range is None:
+        headers["Content-Length"] = str(size)
+        return StreamingResponse(iter_object(key), media_type=media_type, headers=headers)
+
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(iter_object(key, start, end), status_code=206, media_type=media_type, headers=headers)
 
 @router.put("/{book_id}", response_model=BookOut)
 def update_book(
@@ -128,6 +282,8 @@ def update_book(
     updated_book = update_book_db(session, book_id, book_data.dict(exclude_unset=True))
     if not updated_book:
         raise HTTPException(status_code=404, detail="Book not found")
+    if updated_book.cover_url and updated_book.cover_variants is None:
+        job_worker.notify()
     return updated_book
 
 @router.delete("/{book_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -3,8 +3,8 @@ from fastapi import APIRouter, HTTPException
 
 from app.api.dependencies.session import SessionDep
 from app.api.dependencies.deps import CurrentUserDep
-from app.crud.cart import create_cart_item, delete_cart_item_db, get_all_cart_items
-from app.schemas.cart_item import CartItemCreate, CartItemOut
+from app.crud.cart import create_cart_item, delete_cart_item_db, get_all_cart_items, replace_cart_items_db, upsert_cart_items_db
+from app.schemas.cart_item import CartBulkUpdate, CartItemCreate, CartItemOut
 
 
 router = APIRouter()
@@ -39,6 +39,36 @@ def add_cart_item(
         raise HTTPException(status_code=400, detail="Book not found")
     return cart_item_db
 
+@router.post("/bulk", response_model=List[CartItemOut])
+def add_cart_items_bulk(
+    session: SessionDep,
+    current_user: CurrentUserDep,
+    cart_items: CartBulkUpdate,
+):
+    """
+    Add or update many books in the cart at once; a quantity of 0 removes the book.
+    Returns the resulting cart.
+    """
+    try:
+        return upsert_cart_items_db(session, current_user.id, cart_items.items)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.put("/", response_model=List[CartItemOut])
+def replace_cart_items(
+    session: SessionDep,
+    current_user: CurrentUserDep,
+    cart_items: CartBulkUpdate,
+):
+    """
+    Replace the whole cart with the given books.
+    Returns the resulting cart.
+    """
+    try:
+        return replace_cart_items_db(session, current_user.id, cart_items.items)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.delete("/{cart_item_id}", response_model=bool)
 def delete_cart_item(
     session: SessionDep,
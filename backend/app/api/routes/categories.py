@@ -1,21 +1,26 @@
 from typing import List
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, Request, status
 
 from app.api.dependencies.session import SessionDep
 from app.crud.categories import create_category_db, get_all_categories, get_category_by_id
 from app.schemas.category import CategoryCreate, CategoryOut
 from app.api.dependencies.deps import UserIsAdminDep
+from app.utils.response_cache import response_cache
 
 
 router = APIRouter()
 
 @router.get("/", response_model=List[CategoryOut])
-def get_categories(session: SessionDep):
+def get_categories(request: Request, session: SessionDep):
     """
     Get all categories.
     """
-    categories = get_all_categories(session)
-    return categories
+    return response_cache.respond(
+        request,
+        "categories:all",
+        List[CategoryOut],
+        lambda: get_all_categories(session)
+    )
 
 @router.post("/", response_model=CategoryOut, status_code=status.HTTP_201_CREATED)
 def create_category(category: CategoryCreate, session: SessionDep, current_user: UserIsAdminDep):
@@ -0,0 +1,39 @@
+import re
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+
+from app.services.cover_images import COVER_FORMATS, IMMUTABLE_CACHE_CONTROL, variant_key
+from app.services.file_store import SHA256_PATTERN
+from app.services.storage import head_object, iter_object
+
+router = APIRouter()
+
+_VARIANT_NAME_PATTERN = re.compile(r"([1-9][0-9]{0,4})\.(webp|jpg)")
+_FORMATS_BY_EXTENSION = {extension: fmt for fmt, (extension, _) in COVER_FORMATS.items()}
+
+@router.get("/{digest}/{name}")
+async def get_cover_variant(digest: str, name: str, request: Request):
+    """
+    Serve a resized book cover listed in BookOut.cover_variants.
+    Names are derived from the content of the original cover, so they never
+    change and can be cached by browsers and CDNs for a year.
+    """
+    match = _VARIANT_NAME_PATTERN.fullmatch(name)
+    if not SHA256_PATTERN.fullmatch(digest) or not match:
+        raise HTTPException(status_code=404, detail="Cover not found")
+    key = variant_key(digest, int(match.group(1)), _FORMATS_BY_EXTENSION[match.group(2)])
+
+    head = await head_object(key)
+    if head is None:
+        raise HTTPException(status_code=404, detail="Cover not found")
+
+    headers = {"Cache-Control": IMMUTABLE_CACHE_CONTROL}
+    etag = head.get("ETag")
+    if etag:
+        headers["ETag"] = etag
+        if request.headers.get("if-none-match") in (etag, f"W/{etag}"):
+            return Response(status_code=304, headers=headers)
+
+    headers["Content-Length"] = str(head["ContentLength"])
+    media_type = COVER_FORMATS[_FORMATS_BY_EXTENSION[match.group(2)]][1]
+    return StreamingResponse(iter_object(key), media_type=media_type, headers=headers)
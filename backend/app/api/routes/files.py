@@ -1,57 +1,137 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
-import httpx
+from fastapi import APIRouter, Header, HTTPException, Request
 from fastapi.responses import JSONResponse
-import json
-from urllib.parse import quote
+from typing import Optional
 
 from app.api.dependencies.deps import UserIsAdminDep
+from app.api.dependencies.session import AsyncSessionDep
+from app.config.environment import S3_BUCKET_NAME, S3_PREVIEW_URL_EXPIRES_SECONDS
+from app.models.stored_file import StoredFile
+from app.services.file_store import SHA256_PATTERN, find_stored_file, save_upload, staging_key
+from app.services.storage import StreamingUpload, delete_objects, signed_download_url
+from app.utils.multipart import MultipartFileReader
 
 router = APIRouter()
 
-@router.post("/upload")
-async def upload_file(current_user: UserIsAdminDep, file: UploadFile = File(...)):
+@router.post("/upload", openapi_extra={
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["file"],
+                    "properties": {"file": {"type": "string", "format": "binary"}}
+                }
+            }
+        }
+    }
+})
+async def upload_file(
+    request: Request,
+    session: AsyncSessionDep,
+    current_user: UserIsAdminDep,
+    x_content_sha256: Optional[str] = Header(None, description="SHA-256 of the file; if it is already stored the body is not read")
+):
+    """
+    Upload a book file straight to S3 while it is being received.
+    The body is parsed incrementally and sent in multipart upload parts,
+    so memory use does not depend on the file size.
+    Files are stored once per content: uploading a file that is already
+    stored returns the existing copy, right away when its hash is sent.
+    """
+    expected_sha256 = _parse_sha256(x_content_sha256) if x_content_sha256 is not None else None
+    if expected_sha256:
+        stored_file = await find_stored_file(session, expected_sha256)
+        if stored_file is not None:
+            return _stored_file_response(stored_file, deduplicated=True)
+
     try:
-        # Leer el contenido del archivo
-        file_content = await file.read()
-        
-        # Crear el cliente HTTP
-        async with httpx.AsyncClient() as client:
-            # 1. Subir el archivo a la primera Lambda
-            upload_response = await client.post(
-                "https://dgmlwgbfj2.execute-api.us-east-1.amazonaws.com/default/Lambda-el-mancho",
-                files={"file": (file.filename, file_content)}
-            )
-            
-            # Verificar si la respuesta fue exitosa
-            upload_response.raise_for_status()
-            
-            # Parsear la respuesta del upload
-            upload_data = json.loads(upload_response.text)
-            file_name = upload_data["file_name"]
-            
-            # 2. Obtener el enlace de visualización
-            preview_url = f"https://s6cq63bt8c.execute-api.us-east-1.amazonaws.com/default/Lambda-el-mancho-2?file_name={quote(file_name)}"
-            preview_response = await client.get(preview_url)
-            
-            # Verificar si la respuesta fue exitosa
-            preview_response.raise_for_status()
-            
-            # Devolver la respuesta combinada
-            return JSONResponse(content={
-                "status": "success",
-                "file_name": file_name,
-                "s3_path": upload_data["s3_path"],
-                "preview_url": preview_response.json()
-            })
-            
-    except httpx.HTTPError as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error en la comunicación con los servicios: {str(e)}"
+        reader = MultipartFileReader(request.headers.get("content-type", ""))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    upload = None
+    try:
+        # 1. Subir el archivo a S3 a medida que llega
+        async for chunk in request.stream():
+            for data in reader.feed(chunk):
+                if upload is None:
+                    upload = _new_upload(reader)
+                await upload.write(data)
+        reader.close()
+
+        if not reader.found:
+            raise HTTPException(status_code=400, detail="No file was found in the request")
+        if upload is None:
+            # Empty file
+            upload = _new_upload(reader)
+        stored = await upload.complete()
+        upload = None  # Stored; nothing left to abort
+
+        if expected_sha256 and stored["sha256"] != expected_sha256:
+            await delete_objects([stored["key"]])
+            raise HTTPException(status_code=400, detail="The file does not match X-Content-SHA256")
+
+        # 2. Guardarlo bajo su hash, o quedarse con la copia existente
+        stored_file, deduplicated = await save_upload(
+            session,
+            stored["key"],
+            stored["sha256"],
+            stored["size"],
+            reader.filename,
+            reader.content_type
         )
+
+        # 3. Obtener el enlace de visualización (firmado localmente, sin llamadas de red)
+        return _stored_file_response(stored_file, deduplicated)
+
+    except HTTPException:
+        if upload is not None:
+            await upload.abort()
+        raise
     except Exception as e:
+        if upload is not None:
+            await upload.abort()
         raise HTTPException(
             status_code=500,
             detail=f"Error al procesar el archivo: {str(e)}"
         )
 
+
+@router.get("/{sha256}")
+async def get_stored_file(sha256: str, session: AsyncSessionDep, current_user: UserIsAdminDep):
+    """
+    Check whether a file is already stored, by its SHA-256, before uploading it.
+    Answers like a finished upload, or 404 if the content is not stored yet.
+    """
+    stored_file = await find_stored_file(session, _parse_sha256(sha256))
+    if stored_file is None:
+        raise HTTPException(status_code=404, detail="File not found")
+    return _stored_file_response(stored_file, deduplicated=True)
+
+
+def _parse_sha256(value: str) -> str:
+    sha256 = value.strip().lower()
+    if not SHA256_PATTERN.fullmatch(sha256):
+        raise HTTPException(status_code=400, detail="Expected a hex SHA-256 digest")
+    return sha256
+
+
+def _new_upload(reader: MultipartFileReader) -> StreamingUpload:
+    # The client's file name only contributes its extension, so uploads never overwrite each other
+    return StreamingUpload(staging_key(reader.filename), content_type=reader.content_type)
+
+
+def _stored_file_response(stored_file: StoredFile, deduplicated: bool) -> JSONResponse:
+    return JSONResponse(content={
+        "status": "success",
+        "file_name": stored_file.key,
+        "s3_path": f"s3://{S3_BUCKET_NAME}/{stored_file.key}",
+        "size": stored_file.size,
+        "sha256": stored_file.sha256,
+        "deduplicated": deduplicated,
+        "preview_url": {
+            "message": "URL generada correctamente",
+            "download_url": signed_download_url(stored_file.key, S3_PREVIEW_URL_EXPIRES_SECONDS)
+        }
+    })
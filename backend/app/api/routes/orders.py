@@ -1,9 +1,10 @@
-from typing import List, Optional
-from datetime import datetime
-from fastapi import APIRouter, HTTPException, Request, Query
+from typing import List, Literal, Optional
+from fastapi import APIRouter, HTTPException, Request, Response, Query
+from sqlalchemy import select
+from sqlalchemy.orm import contains_eager, selectinload
 
 from app.api.dependencies.deps import CurrentUserDep
-from app.api.dependencies.session import SessionDep
+from app.api.dependencies.session import AsyncSessionDep, SessionDep
 from app.models.order import Order
 from app.models.payment import Payment
 from app.schemas.order import OrderDetails, OrderOut
@@ -12,9 +13,15 @@ from app.models.cart_item import CartItem
 from app.models.order_item import OrderItem
 from app.models.book import Book
 from app.models.user import User
-from app.services.epayco import EpaycoService
-from app.services.notificaciones import noificaciones
-from app.crud.payments import create_payment, get_payments_by_user_id, count_payments_by_user_id, get_all_payments_with_order_info, count_all_payments
+from app.services.epayco import card_fingerprint, epayco_client
+from app.services.invoices import INVOICE_FORMATS, get_invoice
+from app.services.job_worker import job_worker
+from app.services.payment_processing import PAYMENTS_QUEUE, PENDING_STATUSES
+from app.services.storage import signed_file_urls
+from app.crud.epayco_customers import get_epayco_customer_async
+from app.crud.jobs import enqueue_job_async
+from app.crud.orders import create_order_from_cart_db
+from app.crud.payments import get_payments_by_user_id, count_payments_by_user_id, get_all_payments_with_order_info, count_all_payments
 
 router = APIRouter()
 
@@ -76,9 +83,13 @@ def get_order_details(
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     
-    items = session.query(OrderItem).filter(OrderItem.order_id == order.id).join(Book).where(OrderItem.book_id == Book.id).all()
+    items = session.query(OrderItem).filter(OrderItem.order_id == order.id).join(Book).where(OrderItem.book_id == Book.id).options(
+        contains_eager(OrderItem.book)
+    ).all()
+
+    # A paid order links to freshly signed copies of its files
+    file_urls = signed_file_urls(item.book.file_url for item in items) if order.status == "completed" else {}
 
-    
     return {
         "id": order.id,
         "user_id": order.user_id,
@@ -92,7 +103,7 @@ def get_order_details(
                 "book_author": item.book.author,
                 "book_description": item.book.description,
                 "book_image": item.book.cover_url,
-                "book_file": item.book.file_url,
+                "book_file": file_urls.get(item.book.file_url, item.book.file_url),
                 "quantity": item.quantity,
                 "price": item.price
             } for item in items
@@ -100,6 +111,45 @@ def get_order_details(
     }
 
 
+@router.get("/{order_id}/invoice")
+async def get_order_invoice(
+    order_id: str,
+    session: AsyncSessionDep,
+    current_user: CurrentUserDep,
+    request: Request,
+    format: Literal["html", "pdf"] = Query("html")
+):
+    """
+    Get the invoice of a paid order as HTML or PDF.
+    Rendered invoices are cached per order and payment.
+    """
+    result = await session.execute(
+        select(Order, Payment)
+        .join(Payment, Payment.order_id == Order.id)
+        .where(
+            Order.id == order_id,
+            Order.user_id == current_user.id,
+            Payment.status == "completed"
+        )
+        .order_by(Payment.processed_at.desc())
+        .limit(1)
+    )
+    row = result.first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Invoice not found")
+    order, payment = row
+
+    # A completed payment never changes, so its id identifies the invoice
+    etag = f'"{payment.id}-{format}"'
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=3600"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    content = await get_invoice(session, order, payment, current_user, format)
+    if format == "pdf":
+        headers["Content-Disposition"] = f'inline; filename="invoice-{str(order.id)[:8].upper()}.pdf"'
+    return Response(content=content, media_type=INVOICE_FORMATS[format], headers=headers)
+
 @router.post("/", response_model=OrderOut)
 def create_order(
     session: SessionDep,
@@ -108,119 +158,77 @@ def create_order(
     """
     Create a new order from the user's shopping cart.
     """
-    # Get user's shopping cart
-    cart_items = session.query(CartItem).filter(
-        CartItem.user_id == current_user.id
-    ).all()
+    order = create_order_from_cart_db(session, current_user.id)
     
-    if not cart_items:
+    if not order:
         raise HTTPException(
             status_code=400,
             detail="Shopping cart is empty"
         )
     
-    # Calculate order total
-    total_amount = sum(item.quantity * item.book.price for item in cart_items)
-    
-    # Create the order
-    order = Order(
-        user_id=current_user.id,
-        total_amount=total_amount,
-        status="created"
-    )
-    session.add(order)
-    session.flush()  # To get the order ID
-    
-    # Create order items
-    for cart_item in cart_items:
-        order_item = OrderItem(
-            order_id=order.id,
-            book_id=cart_item.book_id,
-            quantity=cart_item.quantity,
-            price=cart_item.book.price
-        )
-        session.add(order_item)
-        
-        # Remove item from cart
-        session.delete(cart_item)
-    
-    session.commit()
-    session.refresh(order)
-    
     return order
 
-@router.post("/{order_id}/pay", response_model=OrderDetails)
+@router.post("/{order_id}/pay", response_model=OrderDetails, status_code=202)
 async def pay_order(
     order_id: str,
     request: Request,
-    session: SessionDep,
+    session: AsyncSessionDep,
     current_user: CurrentUserDep,
 ):
     """
-    Process payment for an order using simplified payment data.
+    Queue the payment of an order using simplified payment data.
     User information is taken from the authenticated user.
+
+    The card is tokenized here so card data never reaches the job table; the
+    customer and charge steps run in the payment worker, and the final status
+    arrives through the worker or the ePayco confirmation webhook.
     """
-    order = session.query(Order).filter(
-        Order.id == order_id,
-        Order.user_id == current_user.id
-    ).first()
-    
-    if not order:
-        raise HTTPException(status_code=404, detail="Order not found")
+    def select_order():
+        return select(Order).where(Order.id == order_id, Order.user_id == current_user.id)
+
+    def check_payable(order: Optional[Order]) -> None:
+        if not order:
+            raise HTTPException(status_code=404, detail="Order not found")
+        # A pending charge may still go through, so paying again could charge twice
+        if order.status in ("processing", "completed", *PENDING_STATUSES):
+            raise HTTPException(status_code=409, detail=f"Order is already {order.status}")
+
+    check_payable((await session.execute(select_order())).scalars().first())
     
     data = await request.json()
-
-    print(data)
     
     client_ip = request.client.host
 
-    epayco = EpaycoService()
-
-    token = epayco.get_token({
-        "card[number]": data["card[number]"],
-        "card[exp_year]": data["card[exp_year]"],
-        "card[exp_month]": data["card[exp_month]"],
-        "card[cvc]": data["card[cvc]"],
-        "hasCvv": True
-    })
+    # Reuse the customer and card token of earlier payments while the card stays the same
+    fingerprint = card_fingerprint(data["card[number]"], data["card[exp_month]"], data["card[exp_year]"])
+    saved_customer = await get_epayco_customer_async(session, current_user.id)
+    # Tokenizing can take several seconds: release the connection until the order is locked
+    await session.commit()
 
-    if not token["status"]:
-        raise HTTPException(status_code=422, detail="Invalid credit info")
-    
-    # Split user name into first and last name
-    user_name_parts = current_user.name.split(' ', 1)
-    first_name = user_name_parts[0]
-    last_name = user_name_parts[1] if len(user_name_parts) > 1 else ""
-    
-    client_epayco = epayco.create_client({
-        "token_card": token.get("id"),
-        "name": first_name,
-        "last_name": last_name,
-        "email": current_user.email,  # Use authenticated user's email
-        "phone": data["phone"],
-        "default": True,
-        "city": data.get("city", "Unknown"),  # Make city optional with default
-        "address": data.get("address", "N/A"),  # Make address optional with default
-        "cell_phone": data["phone"]  # Use same phone for both fields
-    })
+    if saved_customer and saved_customer.card_fingerprint == fingerprint:
+        epayco_client.metrics.increment("saved_card_reused")
+        token_id = saved_customer.token_card
+        client_id = saved_customer.customer_id
+    else:
+        token = await epayco_client.get_token({
+            "card[number]": data["card[number]"],
+            "card[exp_year]": data["card[exp_year]"],
+            "card[exp_month]": data["card[exp_month]"],
+            "card[cvc]": data["card[cvc]"],
+            "hasCvv": True
+        })
 
-    if not client_epayco["status"]:
-        raise HTTPException(status_code=422, detail="Failed to create ePayco client")
+        if not token.get("status"):
+            raise HTTPException(status_code=422, detail="Invalid credit info")
 
-    client_id = client_epayco["data"]["customerId"]
+        token_id = token.get("id")
+        client_id = None
 
-    payment_epayco = epayco.charge(
-        token_card=token.get("id"),
-        customer_id=client_id,
-        client={
-            "identification": data["identification"],
-            "full_name": current_user.name,  # Use full name from user model
-            "email": current_user.email,  # Use authenticated user's email
-        },
-        amount=data["amount"],
-        bill=order.id,
-        client_ip=client_ip
-    )
+    # Another request may have paid the order while the card was being tokenized
+    order = (await session.execute(
+        select_order().with_for_update().execution_options(populate_existing=True)
+    )).scalars().first()
+    check_payable(order)
 
     # Extract card information for storage (last 4 digits only for security)
     card_number = data.get("card[number]", "")
@@ -236,141 +244,71 @@ async def pay_order(
             card_brand = "Mastercard"
         elif first_digit == "3":
             card_brand = "American Express"
-    
-    if payment_epayco["status"] and payment_epayco["success"]:
-        # Determine payment status based on ePayco response
-        epayco_response_code = payment_epayco["data"]["cod_respuesta"]
-        payment_status = "pending"  # default
-        
-        if epayco_response_code == 1:
-            payment_status = "completed"
-            order.status = "completed"
-        elif epayco_response_code == 2:
-            payment_status = "rejected"
-            order.status = "rejected"
-        elif epayco_response_code == 3:
-            payment_status = "pending"
-            order.status = "pending"
-        elif epayco_response_code == 4:
-            payment_status = "failed"
-            order.status = "failed"
-        elif epayco_response_code == 6:
-            payment_status = "reversed"
-            order.status = "reversed"
-        elif epayco_response_code == 7:
-            payment_status = "retained"
-            order.status = "retained"
-        elif epayco_response_code == 8:
-            payment_status = "started"
-            order.status = "started"
-        elif epayco_response_code == 9:
-            payment_status = "expired"
-            order.status = "expired"
-        elif epayco_response_code == 10:
-            payment_status = "abandoned"
-            order.status = "abandoned"
-        elif epayco_response_code == 11:
-            payment_status = "canceled"
-            order.status = "canceled"
 
-        # Create payment record using user information
-        payment_data = PaymentCreate(
-            order_id=order.id,
-            amount=order.total_amount,
-            status=payment_status,
-            payment_method="credit_card",
-            
-            # ePayco information - convert to strings to handle integer responses
-            epayco_transaction_id=str(payment_epayco["data"].get("ref_payco")) if payment_epayco["data"].get("ref_payco") is not None else None,
-            epayco_response_code=epayco_response_code,
-            epayco_response_message=str(payment_epayco["data"].get("respuesta")) if payment_epayco["data"].get("respuesta") is not None else None,
-            epayco_approval_code=str(payment_epayco["data"].get("cod_autorizacion")) if payment_epayco["data"].get("cod_autorizacion") is not None else None,
-            epayco_receipt=str(payment_epayco["data"].get("recibo")) if payment_epayco["data"].get("recibo") is not None else None,
-            
-            # Card information (secure)
-            card_last_four=card_last_four,
-            card_brand=card_brand,
-            
-            # Client information from authenticated user
-            client_name=current_user.name,
-            client_email=current_user.email,
-            client_phone=data.get("phone"),
-            client_ip=client_ip,
-            
-            processed_at=datetime.utcnow()
-        )
-        
-        # Save payment record
-        payment_record = create_payment(session, payment_data)
+    payment_data = PaymentCreate(
+        order_id=order.id,
+        amount=order.total_amount,
+        status="queued",
+        payment_method="credit_card",
         
-        print(f"Payment created with ID: {payment_record.id} for order {order_id} from IP {client_ip}")
+        # Card information (secure)
+        card_last_four=card_last_four,
+        card_brand=card_brand,
         
-        # Update order status
-        session.commit()
+        # Client information from authenticated user
+        client_name=current_user.name,
+        client_email=current_user.email,
+        client_phone=data.get("phone"),
+        client_ip=client_ip
+    )
+    payment_record = Payment(**payment_data.model_dump())
+    session.add(payment_record)
+    await session.flush()
 
-        # Get order details
-        items = session.query(OrderItem).filter(OrderItem.order_id == order.id).join(Book).where(OrderItem.book_id == Book.id).all()
+    await enqueue_job_async(session, PAYMENTS_QUEUE, {
+        "payment_id": str(payment_record.id),
+        "token_card": token_id,
+        "customer_id": client_id,
+        "saved_customer_id": saved_customer.customer_id if saved_customer else None,
+        "card_fingerprint": fingerprint,
+        "identification": data["identification"],
+        "phone": data["phone"],
+        "city": data.get("city", "Unknown"),  # Make city optional with default
+        "address": data.get("address", "N/A"),  # Make address optional with default
+        "client_ip": client_ip
+    })
 
-        # Send invoice notification if payment was successful
-        try:
-            notification_service = noificaciones()
-            await notification_service.send_invoice_html_notification(
-                order=order,
-                payment=payment_record,
-                user=current_user,
-                order_items=items
-            )
-        except Exception as e:
-            print(f"Error sending invoice email: {e}")
-            # Don't interrupt the flow if email sending fails
+    order.status = "processing"
+    await session.commit()
+    job_worker.notify()
+    print(f"Payment queued with ID: {payment_record.id} for order {order_id} from IP {client_ip}")
 
-        return {
-            "id": order.id,
-            "user_id": order.user_id,
-            "total_amount": order.total_amount,
-            "status": order.status,
-            "created_at": order.created_at,
-            "payment_id": str(payment_record.id),  # Include payment ID for frontend navigation
-            "items": [
-                {
-                    "book_id": item.book_id,
-                    "book_title": item.book.title,
-                    "book_author": item.book.author,
-                    "book_description": item.book.description,
-                    "book_image": item.book.cover_url,
-                    "book_file": item.book.file_url,
-                    "quantity": item.quantity,
-                    "price": item.price
-                } for item in items
-            ]
-        }
-    
-    else:
-        # Payment failed - still record the attempt
-        payment_data = PaymentCreate(
-            order_id=order.id,
-            amount=order.total_amount,
-            status="failed",
-            payment_method="credit_card",
-            
-            # ePayco information (if available) - convert to string
-            epayco_response_message=str(payment_epayco.get("data", {}).get("respuesta", "Payment failed")),
-            
-            # Card information (secure)
-            card_last_four=card_last_four,
-            card_brand=card_brand,
-            
-            # Client information from authenticated user
-            client_name=current_user.name,
-            client_email=current_user.email,
-            client_phone=data.get("phone"),
-            client_ip=client_ip,
-            
-            processed_at=datetime.utcnow()
-        )
-        
-        # Save failed payment record
-        payment_record = create_payment(session, payment_data)
-        print(f"Failed payment recorded with ID: {payment_record.id} for order {order_id}")
-        
-        raise HTTPException(status_code=422, detail="Payment failed")
+    # Get order details
+    items_result = await session.execute(
+        select(OrderItem)
+        .join(Book, OrderItem.book_id == Book.id)
+        .options(selectinload(OrderItem.book))
+        .where(OrderItem.order_id == order.id)
+    )
+    items = items_result.scalars().all()
+
+    return {
+        "id": order.id,
+        "user_id": order.user_id,
+        "total_amount": order.total_amount,
+        "status": order.status,
+        "created_at": order.created_at,
+        "payment_id": str(payment_record.id),  # Include payment ID for frontend navigation
+        "items": [
+            {
+                "book_id": item.book_id,
+                "book_title": item.book.title,
+                "book_author": item.book.author,
+                "book_description": item.book.description,
+                "book_image": item.book.cover_url,
+                "book_file": item.book.file_url,
+                "quantity": item.quantity,
+                "price": item.price
+            } for item in items
+        ]
+    }
@@ -0,0 +1,70 @@
+from decimal import Decimal, InvalidOperation
+import uuid
+
+from fastapi import APIRouter, HTTPException, Request
+from sqlalchemy import select
+
+from app.api.dependencies.session import AsyncSessionDep
+from app.models.payment import Payment
+from app.services.epayco import EPAYCO_STATUS_BY_CODE, verify_confirmation_signature
+from app.services.payment_processing import settle_payment
+
+router = APIRouter()
+
+
+@router.api_route("/epayco/confirmation", methods=["GET", "POST"])
+async def epayco_confirmation(request: Request, session: AsyncSessionDep):
+    """
+    ePayco confirmation webhook (url_confirmation).
+    Applies the final transaction status to the payment and its order.
+    """
+    params = dict(request.query_params)
+    if request.method == "POST":
+        params.update(await request.form())
+
+    if not verify_confirmation_signature(params):
+        raise HTTPException(status_code=400, detail="Invalid signature")
+
+    ref_payco = str(params.get("x_ref_payco", ""))
+    result = await session.execute(
+        select(Payment).where(Payment.epayco_transaction_id == ref_payco).with_for_update()
+    )
+    payment = result.scalars().first()
+
+    if not payment:
+        # The confirmation can arrive before the worker has stored the charge answer
+        try:
+            order_id = uuid.UUID(str(params.get("x_id_invoice")))
+        except ValueError:
+            raise HTTPException(status_code=404, detail="Payment not found")
+        result = await session.execute(
+            select(Payment)
+            .where(Payment.order_id == order_id)
+            .order_by(Payment.created_at.desc())
+            .limit(1)
+            .with_for_update()
+        )
+        payment = result.scalars().first()
+        if not payment:
+            raise HTTPException(status_code=404, detail="Payment not found")
+
+    try:
+        amount_matches = Decimal(str(params.get("x_amount"))) == payment.amount
+    except InvalidOperation:
+        amount_matches = False
+    if not amount_matches:
+        raise HTTPException(status_code=400, detail="Amount does not match the payment")
+
+    try:
+        response_code = int(params.get("x_cod_response"))
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid response code")
+
+    status = EPAYCO_STATUS_BY_CODE.get(response_code, "pending")
+    await settle_payment(session, payment.id, status, {
+        "transaction_id": ref_payco,
+        "response_code": response_code,
+        "response_message": params.get("x_response_reason_text") or params.get("x_response"),
+        "approval_code": params.get("x_approval_code"),
+    })
+    return {"status": status}
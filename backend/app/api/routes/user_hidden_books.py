@@ -10,10 +10,10 @@ from app.schemas.user_hidden_book import (
 from app.schemas.book import BookOut, PurchasedBookOut
 from app.crud.user_hidden_books import (
     toggle_book_visibility_for_user,
-    get_hidden_books_for_user,
-    count_hidden_books_for_user
+    get_hidden_books_for_user
 )
 from app.crud.books import get_hidden_books_for_user as get_hidden_book_objects
+from app.services.storage import signed_file_urls
 
 router = APIRouter()
 
@@ -57,11 +57,10 @@ def get_user_hidden_books(
     Get list of hidden book IDs for the current user
     """
     hidden_book_ids = get_hidden_books_for_user(session, current_user.id)
-    total = count_hidden_books_for_user(session, current_user.id)
     
     return HiddenBooksResponse(
         hidden_books=hidden_book_ids,
-        total=total
+        total=len(hidden_book_ids)
     )
 
 
@@ -97,6 +96,8 @@ def get_user_hidden_books_details(
         Order.status == "completed"
     ).all()
 
+    file_urls = signed_file_urls(book_data.file_url for book_data in hidden_purchased_books_data)
+
     # Convert to list of dictionaries for the response model
     hidden_books = []
     for book_data in hidden_purchased_books_data:
@@ -106,7 +107,7 @@ def get_user_hidden_books_details(
             "author": book_data.author,
             "description": book_data.description,
             "cover_url": book_data.cover_url,
-            "file_url": book_data.file_url,
+            "file_url": file_urls.get(book_data.file_url),
             "order_id": book_data.order_id,
             "purchased_at": book_data.purchased_at
         })
@@ -18,6 +18,7 @@ from app.crud.user_sessions import (
 from app.config.security import create_access_token, verify_password
 from app.config.environment import JWT_EXPIRATION
 from app.utils.security_validations import contains_blacklisted, is_valid_email, is_valid_role
+from app.services.session_activity import activity_tracker
 
 router = APIRouter()
 
@@ -265,6 +266,9 @@ def revoke_all_sessions(
     current_session_id = None
     
     if keep_current:
+        # Write pending activity first so last_activity reflects this request
+        activity_tracker.flush()
+        
         # Try to find the current session by token
         # Note: This is a simplified approach. In a real implementation,
         # you might want to pass the current token through the dependency
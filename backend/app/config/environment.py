@@ -7,3 +7,115 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 
 JWT_SECRET=os.getenv("JWT_SECRET")
 JWT_EXPIRATION=int(os.getenv("JWT_EXPIRATION"))
+
+# In-process cache of validated access tokens (see app/utils/session_cache.py)
+TOKEN_CACHE_TTL_SECONDS=int(os.getenv("TOKEN_CACHE_TTL_SECONDS", "60"))
+TOKEN_CACHE_MAX_SIZE=int(os.getenv("TOKEN_CACHE_MAX_SIZE", "10000"))
+
+# Write-behind flushing of UserSession.last_activity (see app/services/session_activity.py)
+SESSION_ACTIVITY_FLUSH_SECONDS=float(os.getenv("SESSION_ACTIVITY_FLUSH_SECONDS", "10"))
+SESSION_ACTIVITY_MAX_PENDING=int(os.getenv("SESSION_ACTIVITY_MAX_PENDING", "5000"))
+
+# Database connection pool (applies to both the sync and the async engine)
+DB_POOL_SIZE=int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW=int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT=float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE=int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING=os.getenv("DB_POOL_PRE_PING", "True").lower() in ("true", "1", "yes")
+
+# In-process cache of /books/suggest results, keyed by lowercase prefix
+BOOK_SUGGESTION_CACHE_TTL_SECONDS=int(os.getenv("BOOK_SUGGESTION_CACHE_TTL_SECONDS", "300"))
+BOOK_SUGGESTION_CACHE_MAX_SIZE=int(os.getenv("BOOK_SUGGESTION_CACHE_MAX_SIZE", "5000"))
+
+# Response cache for public catalog endpoints; set a redis:// URL to share it between workers
+RESPONSE_CACHE_TTL_SECONDS=int(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "300"))
+RESPONSE_CACHE_MAX_SIZE=int(os.getenv("RESPONSE_CACHE_MAX_SIZE", "2000"))
+RESPONSE_CACHE_REDIS_URL=os.getenv("RESPONSE_CACHE_REDIS_URL", "")
+
+# Per-user cache of hidden book IDs used to filter catalog listings
+HIDDEN_BOOKS_CACHE_TTL_SECONDS=int(os.getenv("HIDDEN_BOOKS_CACHE_TTL_SECONDS", "300"))
+HIDDEN_BOOKS_CACHE_MAX_SIZE=int(os.getenv("HIDDEN_BOOKS_CACHE_MAX_SIZE", "10000"))
+
+# Shared outbound HTTP clients (see app/services/http_clients.py); limits and timeouts apply per upstream,
+# RETRIES only covers failed connection attempts
+HTTP_CLIENT_HTTP2=os.getenv("HTTP_CLIENT_HTTP2", "True").lower() in ("true", "1", "yes")
+HTTP_CLIENT_TIMEOUT_SECONDS=float(os.getenv("HTTP_CLIENT_TIMEOUT_SECONDS", "10"))
+HTTP_CLIENT_CONNECT_TIMEOUT_SECONDS=float(os.getenv("HTTP_CLIENT_CONNECT_TIMEOUT_SECONDS", "5"))
+HTTP_CLIENT_POOL_TIMEOUT_SECONDS=float(os.getenv("HTTP_CLIENT_POOL_TIMEOUT_SECONDS", "5"))
+HTTP_CLIENT_MAX_CONNECTIONS=int(os.getenv("HTTP_CLIENT_MAX_CONNECTIONS", "20"))
+HTTP_CLIENT_MAX_KEEPALIVE=int(os.getenv("HTTP_CLIENT_MAX_KEEPALIVE", "10"))
+HTTP_CLIENT_KEEPALIVE_EXPIRY_SECONDS=float(os.getenv("HTTP_CLIENT_KEEPALIVE_EXPIRY_SECONDS", "30"))
+HTTP_CLIENT_RETRIES=int(os.getenv("HTTP_CLIENT_RETRIES", "2"))
+
+# Async ePayco client (see app/services/epayco.py)
+EPAYCO_API_URL=os.getenv("EPAYCO_API_URL", os.getenv("BASE_URL_SDK", "https://api.secure.payco.co"))
+EPAYCO_TIMEOUT_SECONDS=float(os.getenv("EPAYCO_TIMEOUT_SECONDS", "20"))
+EPAYCO_CONNECT_TIMEOUT_SECONDS=float(os.getenv("EPAYCO_CONNECT_TIMEOUT_SECONDS", "5"))
+EPAYCO_MAX_CONCURRENCY=int(os.getenv("EPAYCO_MAX_CONCURRENCY", "20"))
+EPAYCO_MAX_RETRIES=int(os.getenv("EPAYCO_MAX_RETRIES", "2"))
+EPAYCO_RETRY_BACKOFF_SECONDS=float(os.getenv("EPAYCO_RETRY_BACKOFF_SECONDS", "0.5"))
+EPAYCO_SECURE_URL=os.getenv("EPAYCO_SECURE_URL", os.getenv("SECURE_URL_SDK", "https://secure.payco.co"))
+# Confirmation webhook: public URL of /api/payments/epayco/confirmation and the keys used to verify it
+EPAYCO_CONFIRMATION_URL=os.getenv("EPAYCO_CONFIRMATION_URL", "")
+EPAYCO_CUSTOMER_ID=os.getenv("EPAYCO_CUSTOMER_ID", "")
+EPAYCO_P_KEY=os.getenv("EPAYCO_P_KEY", "")
+
+# Background job queue (see app/services/job_worker.py); disable to run the workers in another process
+JOB_WORKER_ENABLED=os.getenv("JOB_WORKER_ENABLED", "True").lower() in ("true", "1", "yes")
+JOB_POLL_INTERVAL_SECONDS=float(os.getenv("JOB_POLL_INTERVAL_SECONDS", "2"))
+JOB_BATCH_SIZE=int(os.getenv("JOB_BATCH_SIZE", "10"))
+JOB_LOCK_TIMEOUT_SECONDS=int(os.getenv("JOB_LOCK_TIMEOUT_SECONDS", "300"))
+PAYMENT_RECONCILE_INTERVAL_SECONDS=float(os.getenv("PAYMENT_RECONCILE_INTERVAL_SECONDS", "60"))
+PAYMENT_RECONCILE_MIN_AGE_SECONDS=int(os.getenv("PAYMENT_RECONCILE_MIN_AGE_SECONDS", "120"))
+# Payments with no ePayco reference that are still unconfirmed after this long are failed
+PAYMENT_UNCONFIRMED_DEADLINE_SECONDS=int(os.getenv("PAYMENT_UNCONFIRMED_DEADLINE_SECONDS", "1800"))
+
+# Outbound email (see app/services/smtp_pool.py and app/services/email_queue.py)
+MAIL_SERVER=os.getenv("MAIL_SERVER", "localhost")
+MAIL_PORT=int(os.getenv("MAIL_PORT", "587"))
+MAIL_USERNAME=os.getenv("MAIL_USERNAME", "")
+MAIL_PASSWORD=os.getenv("MAIL_PASSWORD", "")
+MAIL_FROM=os.getenv("MAIL_FROM", "")
+MAIL_STARTTLS=os.getenv("MAIL_STARTTLS", "True").lower() in ("true", "1", "yes")
+MAIL_SSL_TLS=os.getenv("MAIL_SSL_TLS", "False").lower() in ("true", "1", "yes")
+MAIL_TIMEOUT_SECONDS=float(os.getenv("MAIL_TIMEOUT_SECONDS", "30"))
+MAIL_POOL_SIZE=int(os.getenv("MAIL_POOL_SIZE", "2"))
+MAIL_CONNECTION_MAX_IDLE_SECONDS=float(os.getenv("MAIL_CONNECTION_MAX_IDLE_SECONDS", "60"))
+EMAIL_MAX_ATTEMPTS=int(os.getenv("EMAIL_MAX_ATTEMPTS", "8"))
+EMAIL_RETRY_BACKOFF_SECONDS=float(os.getenv("EMAIL_RETRY_BACKOFF_SECONDS", "30"))
+
+# Invoice rendering (see app/services/invoices.py); 0 workers renders in a thread instead of a process pool
+TEMPLATE_BYTECODE_CACHE_DIR=os.getenv("TEMPLATE_BYTECODE_CACHE_DIR", "")
+INVOICE_RENDER_WORKERS=int(os.getenv("INVOICE_RENDER_WORKERS", "2"))
+INVOICE_CACHE_TTL_SECONDS=int(os.getenv("INVOICE_CACHE_TTL_SECONDS", "3600"))
+INVOICE_CACHE_MAX_SIZE=int(os.getenv("INVOICE_CACHE_MAX_SIZE", "500"))
+
+# Object storage for book files (see app/services/storage.py); set S3_ENDPOINT_URL to use MinIO or a moto server
+S3_BUCKET_NAME=os.getenv("S3_BUCKET_NAME", "bucket-libreria")
+AWS_REGION=os.getenv("AWS_REGION", "us-east-1")
+S3_ENDPOINT_URL=os.getenv("S3_ENDPOINT_URL", "")
+S3_MULTIPART_PART_SIZE_MB=int(os.getenv("S3_MULTIPART_PART_SIZE_MB", "8"))
+S3_MULTIPART_CONCURRENCY=int(os.getenv("S3_MULTIPART_CONCURRENCY", "2"))
+# Lifetime of the presigned URLs handed out by GET /api/books/{id}/download?redirect=true
+S3_DOWNLOAD_URL_EXPIRES_SECONDS=int(os.getenv("S3_DOWNLOAD_URL_EXPIRES_SECONDS", "300"))
+S3_DOWNLOAD_CHUNK_SIZE_KB=int(os.getenv("S3_DOWNLOAD_CHUNK_SIZE_KB", "256"))
+# Presigned URLs are signed in-process and reused until REFRESH_MARGIN seconds before they expire
+S3_PREVIEW_URL_EXPIRES_SECONDS=int(os.getenv("S3_PREVIEW_URL_EXPIRES_SECONDS", "604800"))
+S3_LIBRARY_URL_EXPIRES_SECONDS=int(os.getenv("S3_LIBRARY_URL_EXPIRES_SECONDS", "3600"))
+S3_SIGNED_URL_REFRESH_MARGIN_SECONDS=int(os.getenv("S3_SIGNED_URL_REFRESH_MARGIN_SECONDS", "60"))
+S3_SIGNED_URL_CACHE_MAX_SIZE=int(os.getenv("S3_SIGNED_URL_CACHE_MAX_SIZE", "10000"))
+# Uploads are stored once per SHA-256 (stored_files); files no book references, and abandoned
+# uploads, are deleted once unused for this long
+STORED_FILE_ORPHAN_TTL_HOURS=int(os.getenv("STORED_FILE_ORPHAN_TTL_HOURS", "24"))
+STORED_FILE_SWEEP_INTERVAL_SECONDS=float(os.getenv("STORED_FILE_SWEEP_INTERVAL_SECONDS", "3600"))
+
+# Resized WebP/JPEG copies of book covers (see app/services/cover_images.py), rendered in a process pool;
+# 0 workers renders in a thread. Covers wider than a variant are scaled down to it, never up
+COVER_VARIANT_WIDTHS=[int(width) for width in os.getenv("COVER_VARIANT_WIDTHS", "160,320,640").split(",") if width.strip()]
+COVER_RENDER_WORKERS=int(os.getenv("COVER_RENDER_WORKERS", "2"))
+COVER_WEBP_QUALITY=int(os.getenv("COVER_WEBP_QUALITY", "80"))
+COVER_JPEG_QUALITY=int(os.getenv("COVER_JPEG_QUALITY", "82"))
+COVER_MAX_SOURCE_MB=int(os.getenv("COVER_MAX_SOURCE_MB", "20"))
+COVER_MAX_PIXELS=int(os.getenv("COVER_MAX_PIXELS", "40000000"))
+# Prepended to the variant URLs in cover_variants, e.g. a CDN in front of /api/covers; empty for paths on this API
+COVER_VARIANT_BASE_URL=os.getenv("COVER_VARIANT_BASE_URL", "").rstrip("/")
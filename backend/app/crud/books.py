@@ -1,13 +1,36 @@
-from typing import List, Optional
+from typing import List, Optional, Tuple
 import uuid
 from app.api.dependencies.session import SessionDep
 from app.models.book import Book
 from app.schemas.book import BookCreate
-from sqlalchemy import func, desc, and_, not_
+from sqlalchemy import func, desc, and_, not_, select, tuple_, literal, union_all, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.order import Order
 from app.models.order_item import OrderItem
 from app.models.user_hidden_book import UserHiddenBook
+from app.crud.jobs import enqueue_job
+from app.crud.stored_files import change_file_references
+from app.crud.user_hidden_books import get_hidden_book_ids
+from app.models.book_purchase_stat import BookPurchaseStat
+from app.services.storage import key_from_file_url
+from app.utils.pagination import decode_cursor, encode_cursor
+from app.utils.cache import TTLCache
+from app.utils.response_cache import response_cache
+from app.config.environment import BOOK_SUGGESTION_CACHE_MAX_SIZE, BOOK_SUGGESTION_CACHE_TTL_SECONDS
+
+
+# Suggestions keyed by (lowercase prefix, limit); cleared on every catalog write
+suggestion_cache = TTLCache(maxsize=BOOK_SUGGESTION_CACHE_MAX_SIZE, ttl=BOOK_SUGGESTION_CACHE_TTL_SECONDS)
+
+# Maximum trigram word distance (1 - word_similarity) for a suggestion to be returned
+SUGGESTION_MAX_DISTANCE = 0.6
+
+# Up to this many hidden books, limited listings over-fetch and drop them in memory
+HIDDEN_OVERFETCH_MAX = 50
+
+# Jobs that render the resized variants of a book's cover (app/services/cover_images.py)
+COVER_VARIANTS_QUEUE = "cover_variants"
 
 
 def get_all_books(session: SessionDep) -> List[Book]:
@@ -17,17 +40,209 @@ def get_all_books(session: SessionDep) -> List[Book]:
 
 def get_visible_books_for_user(session: SessionDep, user_id: Optional[uuid.UUID] = None) -> List[Book]:
     """Get all books that are not hidden by the user"""
-    query = session.query(Book)
+    books = session.query(Book).all()
     
     if user_id:
-        # Exclude books that are hidden by this user
-        hidden_book_ids = session.query(UserHiddenBook.book_id).filter(
-            UserHiddenBook.user_id == user_id
-        ).subquery()
+        hidden_book_ids = get_hidden_book_ids(session, user_id)
+        if hidden_book_ids:
+            books = [book for book in books if book.id not in hidden_book_ids]
+    
+    return books
+
+
+def _limit_visible(query, hidden_book_ids: frozenset, limit: int) -> List[Book]:
+    """
+    Run an ordered query for the first limit books that are not hidden
+    
+    A small hidden set is skipped in memory by fetching that many extra rows, so
+    the statement is the same for every user; larger sets fall back to NOT IN.
+    """
+    if not hidden_book_ids:
+        return query.limit(limit).all()
+    
+    if len(hidden_book_ids) > HIDDEN_OVERFETCH_MAX:
+        return query.filter(Book.id.not_in(hidden_book_ids)).limit(limit).all()
+    
+    books = query.limit(limit + len(hidden_book_ids)).all()
+    return [book for book in books if book.id not in hidden_book_ids][:limit]
+
+
+def get_books_page(
+    session: SessionDep,
+    user_id: Optional[uuid.UUID] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    category_id: Optional[uuid.UUID] = None,
+    author: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    title_prefix: Optional[str] = None,
+) -> Tuple[List[Book], Optional[str]]:
+    """
+    Get one page of books, newest first, using keyset pagination on (created_at, id)
+    
+    Args:
+        session: Database session
+        user_id: If given, books hidden by this user are excluded
+        limit: Page size; None returns every matching book
+        cursor: Opaque position returned as next_cursor by the previous page
+        category_id: Only books in this category
+        author: Only books by this author (case-insensitive exact match)
+        min_price: Only books costing at least this much
+        max_price: Only books costing at most this much
+        title_prefix: Only books whose title starts with this (case-insensitive)
+        
+    Returns:
+        The books of the page and the cursor of the next page, or None on the last page
         
-        query = query.filter(not_(Book.id.in_(hidden_book_ids)))
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    query = session.query(Book)
+    hidden_book_ids = get_hidden_book_ids(session, user_id) if user_id else frozenset()
+    
+    if category_id:
+        query = query.filter(Book.category_id == category_id)
+    if author:
+        query = query.filter(func.lower(Book.author) == author.lower())
+    if min_price is not None:
+        query = query.filter(Book.price >= min_price)
+    if max_price is not None:
+        query = query.filter(Book.price <= max_price)
+    if title_prefix:
+        query = query.filter(
+            func.lower(Book.title).startswith(title_prefix.lower(), autoescape=True)
+        )
     
-    return query.all()
+    if cursor:
+        created_at, book_id = decode_cursor(cursor)
+        query = query.filter(tuple_(Book.created_at, Book.id) < tuple_(created_at, book_id))
+    
+    query = query.order_by(desc(Book.created_at), desc(Book.id))
+    
+    if limit is None:
+        return [book for book in query.all() if book.id not in hidden_book_ids], None
+    
+    # Fetch one extra row to know whether there is a next page
+    books = _limit_visible(query, hidden_book_ids, limit + 1)
+    if len(books) <= limit:
+        return books, None
+    
+    books = books[:limit]
+    return books, encode_cursor(books[-1].created_at, books[-1].id)
+
+
+def search_books(
+    session: SessionDep,
+    text: str,
+    user_id: Optional[uuid.UUID] = None,
+    skip: int = 0,
+    limit: int = 20
+) -> Tuple[List[dict], int]:
+    """
+    Full-text search over title, author and description using the books.search_vector GIN index
+    
+    Args:
+        session: Database session
+        text: Search text in web-search syntax ("quoted phrases", or, -exclusions)
+        user_id: If given, books hidden by this user are excluded
+        skip: Number of results to skip
+        limit: Maximum number of results to return
+        
+    Returns:
+        The page of results, best match first, and the total number of matches
+    """
+    ts_query = func.websearch_to_tsquery('english', text)
+    
+    query = session.query(Book).filter(Book.search_vector.op('@@')(ts_query))
+    
+    if user_id:
+        hidden_book_ids = get_hidden_book_ids(session, user_id)
+        if hidden_book_ids:
+            query = query.filter(Book.id.not_in(hidden_book_ids))
+    
+    total = query.order_by(None).count()
+    if total == 0:
+        return [], 0
+    
+    rank = func.ts_rank_cd(Book.search_vector, ts_query).label('rank')
+    headline_options = 'StartSel=<mark>, StopSel=</mark>, HighlightAll=true'
+    title_highlight = func.ts_headline('english', Book.title, ts_query, headline_options)
+    description_highlight = func.ts_headline(
+        'english',
+        Book.description,
+        ts_query,
+        'StartSel=<mark>, StopSel=</mark>, MaxFragments=2, MaxWords=30, MinWords=10'
+    )
+    
+    rows = query.add_columns(
+        rank,
+        title_highlight.label('title_highlight'),
+        description_highlight.label('description_highlight')
+    ).order_by(
+        desc('rank'), desc(Book.created_at), desc(Book.id)
+    ).offset(skip).limit(limit).all()
+    
+    results = []
+    for book, book_rank, book_title_highlight, book_description_highlight in rows:
+        results.append({
+            "id": book.id,
+            "title": book.title,
+            "author": book.author,
+            "description": book.description,
+            "cover_url": book.cover_url,
+            "cover_variants": book.cover_variants,
+            "price": book.price,
+            "category_id": book.category_id,
+            "file_url": book.file_url,
+            "rank": book_rank,
+            "title_highlight": book_title_highlight,
+            "description_highlight": book_description_highlight
+        })
+    
+    return results, total
+
+
+def suggest_books(session: SessionDep, text: str, limit: int = 8) -> List[dict]:
+    """
+    Typo-tolerant type-ahead matches on title and author using pg_trgm
+    
+    Each column is searched with a k-nearest-neighbour scan of its trigram GiST
+    index, so only the best candidates are read; results are cached per prefix.
+    
+    Returns:
+        Up to limit dicts with id, title and author, best match first
+    """
+    key = (text.strip().lower(), limit)
+    cached = suggestion_cache.get(key)
+    if cached is not None:
+        return cached
+    
+    text = key[0]
+    
+    def nearest(column):
+        distance = literal(text).op('<<->')(column)
+        return select(
+            Book.id, Book.title, Book.author, distance.label('distance')
+        ).order_by(distance).limit(limit)
+    
+    candidates = union_all(nearest(Book.title), nearest(Book.author)).subquery()
+    rows = session.execute(
+        select(candidates).order_by(candidates.c.distance)
+    ).all()
+    
+    suggestions = []
+    seen = set()
+    for row in rows:
+        if row.id in seen or row.distance > SUGGESTION_MAX_DISTANCE:
+            continue
+        seen.add(row.id)
+        suggestions.append({"id": row.id, "title": row.title, "author": row.author})
+        if len(suggestions) == limit:
+            break
+    
+    suggestion_cache.set(key, suggestions)
+    return suggestions
 
 
 def get_hidden_books_for_user(session: SessionDep, user_id: uuid.UUID) -> List[Book]:
@@ -37,12 +252,21 @@ def get_hidden_books_for_user(session: SessionDep, user_id: uuid.UUID) -> List[B
     ).all()
 
 
+def _enqueue_cover_variants(session: SessionDep, book: Book) -> None:
+    """Queue the rendering of the book's cover variants; does not commit"""
+    enqueue_job(session, COVER_VARIANTS_QUEUE, {"book_id": str(book.id), "cover_url": book.cover_url}, max_attempts=3)
+
 def create_book_db(session: SessionDep, book: BookCreate) -> Book:
     book.sanitize()  # Desinfección de entradas
-    db_book = Book(**book.dict())
+    db_book = Book(id=uuid.uuid4(), **book.dict())
     session.add(db_book)
+    change_file_references(session, key_from_file_url(db_book.file_url), 1)
+    if db_book.cover_url:
+        _enqueue_cover_variants(session, db_book)
     session.commit()
     session.refresh(db_book)
+    suggestion_cache.clear()
+    response_cache.invalidate("catalog")
     return db_book
 
 def get_book_by_id(session: SessionDep, book_id: str) -> Book | None:
@@ -59,11 +283,25 @@ def update_book_db(session: SessionDep, book_id: str, book_data: dict) -> Book |
     if not book:
         return None
     
+    if "file_url" in book_data:
+        old_key, new_key = key_from_file_url(book.file_url), key_from_file_url(book_data["file_url"])
+        if old_key != new_key:
+            change_file_references(session, old_key, -1)
+            change_file_references(session, new_key, 1)
+
+    cover_changed = "cover_url" in book_data and book_data["cover_url"] != book.cover_url
     for key, value in book_data.items():
         setattr(book, key, value)
+    if cover_changed:
+        # The old variants no longer match; the new ones are filled in by the queued job
+        book.cover_variants = None
+        if book.cover_url:
+            _enqueue_cover_variants(session, book)
     
     session.commit()
     session.refresh(book)
+    suggestion_cache.clear()
+    response_cache.invalidate("catalog")
     return book
 
 def delete_book_db(session: SessionDep, book_id: str) -> bool:
@@ -71,57 +309,55 @@ def delete_book_db(session: SessionDep, book_id: str) -> bool:
     if not book:
         return False
     
+    change_file_references(session, key_from_file_url(book.file_url), -1)
     session.delete(book)
     session.commit()
+    suggestion_cache.clear()
+    response_cache.invalidate("catalog")
     return True
 
 def get_most_purchased_books(session: SessionDep, user_id: Optional[uuid.UUID] = None, limit: int = 5) -> List[Book]:
     """
-    Get the most purchased books based on order items count, excluding hidden books for the user
+    Get the most purchased books from the precomputed purchase stats, excluding hidden books for the user
     """
-    query = session.query(
-        Book,
-        func.count(OrderItem.id).label('purchase_count')
-    ).join(
-        OrderItem,
-        Book.id == OrderItem.book_id
-    ).join(
-        Order,
-        OrderItem.order_id == Order.id
-    ).filter(
-        Order.status == "completed"
+    query = session.query(Book).join(
+        BookPurchaseStat,
+        Book.id == BookPurchaseStat.book_id
+    ).order_by(
+        BookPurchaseStat.purchase_count.desc(),
+        BookPurchaseStat.book_id
     )
     
     # Exclude hidden books for the user
-    if user_id:
-        hidden_book_ids = session.query(UserHiddenBook.book_id).filter(
-            UserHiddenBook.user_id == user_id
-        ).subquery()
-        query = query.filter(not_(Book.id.in_(hidden_book_ids)))
-    
-    books = query.group_by(
-        Book.id
-    ).order_by(
-        desc('purchase_count')
-    ).limit(limit).all()
-    
-    return [book[0] for book in books]
+    hidden_book_ids = get_hidden_book_ids(session, user_id) if user_id else frozenset()
+    return _limit_visible(query, hidden_book_ids, limit)
 
 def get_latest_books(session: SessionDep, user_id: Optional[uuid.UUID] = None, limit: int = 5) -> List[Book]:
     """
     Get the most recently created books, excluding hidden books for the user
     """
-    query = session.query(Book)
+    query = session.query(Book).order_by(desc(Book.created_at))
     
     # Exclude hidden books for the user
-    if user_id:
-        hidden_book_ids = session.query(UserHiddenBook.book_id).filter(
-            UserHiddenBook.user_id == user_id
-        ).subquery()
-        query = query.filter(not_(Book.id.in_(hidden_book_ids)))
-    
-    books = query.order_by(
-        desc(Book.created_at)
-    ).limit(limit).all()
-    
-    return books
+    hidden_book_ids = get_hidden_book_ids(session, user_id) if user_id else frozenset()
+    return _limit_visible(query, hidden_book_ids, limit)
+
+
+async def get_book_by_id_async(session: AsyncSession, book_id: str) -> Book | None:
+    """Async version of get_book_by_id"""
+    result = await session.execute(select(Book).where(Book.id == book_id))
+    return result.scalars().first()
+
+
+async def set_cover_variants_async(session: AsyncSession, book_id: str, cover_url: str, variants: List[dict]) -> bool:
+    """
+    Store the rendered variants of a cover, unless the book's cover changed since they were
+    queued. Returns whether the book was updated.
+    """
+    result = await session.execute(
+        update(Book)
+        .where(Book.id == book_id, Book.cover_url == cover_url)
+        .values(cover_variants=variants)
+    )
+    await session.commit()
+    return result.rowcount > 0
@@ -1,23 +1,28 @@
+import uuid
+
+from sqlalchemy import delete
+from sqlalchemy.dialects.postgresql import insert
+
 from app.models.cart_item import CartItem
 from app.models.book import Book
 
 
 def get_all_cart_items(session, user_id):
     """
-    Get all cart items for the current user.
+    Get all cart items for the current user, loading items and books in one query.
     """
-    cart_items = []
-    cart_items_db = session.query(CartItem).filter(CartItem.user_id == user_id).all()
-    
-    for cart_item in cart_items_db:
-        book = session.query(Book).filter(Book.id == cart_item.book_id).first()
-        if book:
-            cart_items.append({
-                "id": cart_item.id,
-                "book": book
-            })
+    rows = session.query(CartItem, Book).join(
+        Book, Book.id == CartItem.book_id
+    ).filter(CartItem.user_id == user_id).all()
 
-    return cart_items
+    return [
+        {
+            "id": cart_item.id,
+            "book": book,
+            "quantity": cart_item.quantity
+        }
+        for cart_item, book in rows
+    ]
 
 def create_cart_item(session, user_id, cart_item_create):
     """
@@ -53,3 +58,78 @@ def delete_cart_item_db(session, user_id, cart_item_id):
         session.commit()
         return True
     return False
+
+
+def _merge_bulk_items(items):
+    """
+    Collapse the requested items into {book_id: quantity}, the last entry for a book winning.
+    """
+    return {item.book_id: item.quantity for item in items}
+
+def _validate_book_ids(session, book_ids):
+    """
+    Check with one query that every book exists; raises ValueError listing the missing ones.
+    """
+    if not book_ids:
+        return
+    existing = {
+        row.id for row in session.query(Book.id).filter(Book.id.in_(book_ids)).all()
+    }
+    missing = [str(book_id) for book_id in book_ids if book_id not in existing]
+    if missing:
+        raise ValueError(f"Books not found: {', '.join(missing)}")
+
+def _upsert_cart_items(session, user_id, quantities):
+    """
+    Insert or update the given quantities with a single INSERT ... ON CONFLICT.
+    """
+    if not quantities:
+        return
+    stmt = insert(CartItem).values([
+        {"id": uuid.uuid4(), "user_id": user_id, "book_id": book_id, "quantity": quantity}
+        for book_id, quantity in quantities.items()
+    ])
+    session.execute(stmt.on_conflict_do_update(
+        index_elements=[CartItem.user_id, CartItem.book_id],
+        set_={"quantity": stmt.excluded.quantity}
+    ))
+
+def upsert_cart_items_db(session, user_id, items):
+    """
+    Add or update many cart items at once; a quantity of 0 removes the book from the cart.
+    Raises ValueError listing the book IDs that do not exist, without changing the cart.
+    """
+    quantities = _merge_bulk_items(items)
+    _validate_book_ids(session, list(quantities))
+
+    removed = [book_id for book_id, quantity in quantities.items() if quantity == 0]
+    if removed:
+        session.execute(delete(CartItem).where(
+            CartItem.user_id == user_id,
+            CartItem.book_id.in_(removed)
+        ))
+    _upsert_cart_items(session, user_id, {
+        book_id: quantity for book_id, quantity in quantities.items() if quantity > 0
+    })
+    session.commit()
+
+    return get_all_cart_items(session, user_id)
+
+def replace_cart_items_db(session, user_id, items):
+    """
+    Replace the whole cart with the given items.
+    Raises ValueError listing the book IDs that do not exist, without changing the cart.
+    """
+    quantities = {
+        book_id: quantity for book_id, quantity in _merge_bulk_items(items).items() if quantity > 0
+    }
+    _validate_book_ids(session, list(quantities))
+
+    stmt = delete(CartItem).where(CartItem.user_id == user_id)
+    if quantities:
+        stmt = stmt.where(CartItem.book_id.not_in(list(quantities)))
+    session.execute(stmt)
+    _upsert_cart_items(session, user_id, quantities)
+    session.commit()
+
+    return get_all_cart_items(session, user_id)
@@ -1,6 +1,7 @@
 from app.api.dependencies.session import SessionDep
 from app.models.category import Category
 from app.schemas.category import CategoryCreate
+from app.utils.response_cache import response_cache
 
 def create_category_db(db: SessionDep, category: CategoryCreate) -> Category:
     category.sanitize()  # Desinfección de entradas
@@ -8,6 +9,7 @@ def create_category_db(db: SessionDep, category: CategoryCreate) -> Category:
     db.add(db_category)
     db.commit()
     db.refresh(db_category)
+    response_cache.invalidate("catalog")
     return db_category
 
 def get_all_categories(db: SessionDep) -> list[Category]:
@@ -0,0 +1,32 @@
+from typing import List
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models.email_dead_letter import EmailDeadLetter
+from app.models.job import Job
+
+
+async def create_email_dead_letter_async(session: AsyncSession, job: Job) -> EmailDeadLetter:
+    """Keep an email job that ran out of attempts"""
+    dead_letter = EmailDeadLetter(
+        job_id=job.id,
+        recipients=", ".join(job.payload.get("recipients", [])),
+        subject=job.payload.get("subject", ""),
+        message=job.payload,
+        attempts=job.attempts,
+        last_error=job.last_error
+    )
+    session.add(dead_letter)
+    await session.commit()
+    return dead_letter
+
+
+def get_email_dead_letters(session: Session, skip: int = 0, limit: int = 100) -> List[EmailDeadLetter]:
+    """Get undelivered emails, newest first"""
+    return (
+        session.query(EmailDeadLetter)
+        .order_by(EmailDeadLetter.created_at.desc())
+        .offset(skip)
+        .limit(limit)
+        .all()
+    )
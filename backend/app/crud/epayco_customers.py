@@ -0,0 +1,50 @@
+from datetime import datetime
+from typing import Optional
+import uuid
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.epayco_customer import EpaycoCustomer
+
+
+async def get_epayco_customer_async(session: AsyncSession, user_id: uuid.UUID) -> Optional[EpaycoCustomer]:
+    """Get the saved ePayco customer of a user"""
+    result = await session.execute(select(EpaycoCustomer).where(EpaycoCustomer.user_id == user_id))
+    return result.scalars().first()
+
+
+async def save_epayco_customer_async(
+    session: AsyncSession,
+    user_id: uuid.UUID,
+    customer_id: str,
+    token_card: str,
+    card_fingerprint: str
+) -> None:
+    """
+    Insert or replace the saved ePayco customer of a user.
+    Does not commit; it is committed together with the payment.
+    """
+    now = datetime.utcnow()
+    stmt = insert(EpaycoCustomer).values(
+        user_id=user_id,
+        customer_id=customer_id,
+        token_card=token_card,
+        card_fingerprint=card_fingerprint,
+        created_at=now,
+        updated_at=now
+    )
+    await session.execute(stmt.on_conflict_do_update(
+        index_elements=[EpaycoCustomer.user_id],
+        set_={
+            "customer_id": stmt.excluded.customer_id,
+            "token_card": stmt.excluded.token_card,
+            "card_fingerprint": stmt.excluded.card_fingerprint,
+            "updated_at": stmt.excluded.updated_at
+        }
+    ))
+
+
+async def delete_epayco_customer_async(session: AsyncSession, user_id: uuid.UUID) -> None:
+    """Forget the saved ePayco customer of a user; does not commit"""
+    await session.execute(delete(EpaycoCustomer).where(EpaycoCustomer.user_id == user_id))
@@ -0,0 +1,108 @@
+from datetime import datetime, timedelta
+from typing import List, Optional
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models.job import Job
+
+
+def _new_job(queue: str, payload: dict, run_after: Optional[datetime], max_attempts: int) -> Job:
+    return Job(
+        queue=queue,
+        payload=payload,
+        status="queued",
+        attempts=0,
+        max_attempts=max_attempts,
+        run_after=run_after or datetime.utcnow()
+    )
+
+
+def enqueue_job(
+    session: Session,
+    queue: str,
+    payload: dict,
+    run_after: Optional[datetime] = None,
+    max_attempts: int = 5
+) -> Job:
+    """Add a job to a queue; does not commit, so it is enqueued together with the caller's changes"""
+    job = _new_job(queue, payload, run_after, max_attempts)
+    session.add(job)
+    return job
+
+
+async def enqueue_job_async(
+    session: AsyncSession,
+    queue: str,
+    payload: dict,
+    run_after: Optional[datetime] = None,
+    max_attempts: int = 5
+) -> Job:
+    """Async version of enqueue_job"""
+    job = _new_job(queue, payload, run_after, max_attempts)
+    session.add(job)
+    return job
+
+
+async def claim_jobs_async(session: AsyncSession, queue: str, limit: int, lock_timeout: int) -> List[Job]:
+    """
+    Mark up to limit ready jobs of a queue as running and return them, committing the claim.
+    Rows locked by another worker are skipped, and jobs left running by a worker that
+    died more than lock_timeout seconds ago are claimed again.
+    """
+    now = datetime.utcnow()
+    ready = select(Job.id).where(
+        Job.queue == queue,
+        or_(
+            and_(Job.status == "queued", Job.run_after <= now),
+            and_(Job.status == "running", Job.locked_at < now - timedelta(seconds=lock_timeout))
+        )
+    ).order_by(Job.run_after).limit(limit).with_for_update(skip_locked=True)
+
+    result = await session.execute(
+        update(Job)
+        .where(Job.id.in_(ready.scalar_subquery()))
+        .values(status="running", locked_at=now, attempts=Job.attempts + 1, updated_at=now)
+        .returning(Job)
+        .execution_options(synchronize_session=False)
+    )
+    jobs = list(result.scalars().all())
+    await session.commit()
+    return jobs
+
+
+async def complete_job_async(session: AsyncSession, job_id, payload: Optional[dict] = None) -> None:
+    """Mark a job as done, replacing its payload when one is given"""
+    values = {"status": "done", "locked_at": None, "last_error": None, "updated_at": datetime.utcnow()}
+    if payload is not None:
+        values["payload"] = payload
+    await session.execute(update(Job).where(Job.id == job_id).values(**values))
+    await session.commit()
+
+
+async def retry_or_fail_job_async(
+    session: AsyncSession,
+    job: Job,
+    error: str,
+    backoff: float = 5.0,
+    final_payload: Optional[dict] = None
+) -> bool:
+    """
+    Requeue a failed job with exponential backoff, or mark it failed once it is out of attempts,
+    replacing its payload with final_payload when one is given.
+    Returns True if the job was marked failed.
+    """
+    now = datetime.utcnow()
+    failed = job.attempts >= job.max_attempts
+    values = {"last_error": error, "locked_at": None, "updated_at": now}
+    if failed:
+        values["status"] = "failed"
+        if final_payload is not None:
+            values["payload"] = final_payload
+    else:
+        values["status"] = "queued"
+        values["run_after"] = now + timedelta(seconds=backoff * (2 ** (job.attempts - 1)))
+
+    await session.execute(update(Job).where(Job.id == job.id).values(**values))
+    await session.commit()
+    return failed
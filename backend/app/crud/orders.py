@@ -0,0 +1,82 @@
+from typing import Optional
+import uuid
+from sqlalchemy import delete, func, insert, literal, select, update
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models.book import Book
+from app.models.cart_item import CartItem
+from app.models.order import Order
+from app.models.order_item import OrderItem
+
+
+def create_order_from_cart_db(session: Session, user_id: uuid.UUID) -> Optional[Order]:
+    """
+    Turn the user's whole cart into a new order in one transaction.
+
+    The cart is emptied with DELETE ... RETURNING, which feeds the INSERT of
+    the order items and the total of the order in the same statement. The
+    DELETE holds a lock on every cart row, so a concurrent double submit waits
+    for the first one and then finds the cart empty instead of creating a
+    second order.
+
+    Returns:
+        The created order, or None if the cart is empty
+    """
+    order = Order(user_id=user_id, total_amount=0, status="created")
+    session.add(order)
+    session.flush()  # To get the order ID
+
+    removed = delete(CartItem).where(
+        CartItem.user_id == user_id
+    ).returning(CartItem.book_id, CartItem.quantity).cte("removed")
+
+    inserted = insert(OrderItem).from_select(
+        ["id", "order_id", "book_id", "quantity", "price"],
+        select(
+            func.gen_random_uuid(),
+            literal(order.id, UUID(as_uuid=True)),
+            removed.c.book_id,
+            removed.c.quantity,
+            Book.price
+        ).select_from(removed).join(Book, Book.id == removed.c.book_id)
+    ).returning(OrderItem.quantity, OrderItem.price).cte("inserted")
+
+    total_amount = select(
+        func.coalesce(func.sum(inserted.c.quantity * inserted.c.price), 0)
+    ).scalar_subquery()
+    item_count = select(func.count()).select_from(inserted).scalar_subquery()
+
+    result = session.execute(
+        update(Order)
+        .where(Order.id == order.id)
+        .values(total_amount=total_amount)
+        .returning(item_count)
+        .execution_options(synchronize_session=False)
+    )
+
+    if not result.scalar_one():
+        session.rollback()
+        return None
+
+    session.commit()
+    session.refresh(order)
+    return order
+
+
+async def has_purchased_book_async(session: AsyncSession, user_id: uuid.UUID, book_id: uuid.UUID) -> bool:
+    """Whether the user has a completed order containing the book"""
+    result = await session.execute(
+        select(
+            select(OrderItem.id)
+            .join(Order, OrderItem.order_id == Order.id)
+            .where(
+                Order.user_id == user_id,
+                Order.status == "completed",
+                OrderItem.book_id == book_id
+            )
+            .exists()
+        )
+    )
+    return bool(result.scalar())
@@ -1,7 +1,8 @@
 from datetime import datetime
 from typing import List, Optional
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, select
 
 from app.models.payment import Payment
 from app.models.order import Order
@@ -89,29 +90,32 @@ def update_payment_status(
     """Update payment status and ePayco information"""
     payment = session.query(Payment).filter(Payment.id == payment_id).first()
     if payment:
-        payment.status = status
-        payment.updated_at = datetime.utcnow()
-        
-        if status in ["completed", "failed", "rejected"]:
-            payment.processed_at = datetime.utcnow()
-        
-        # Update ePayco data if provided
-        if epayco_data:
-            if "transaction_id" in epayco_data:
-                payment.epayco_transaction_id = epayco_data["transaction_id"]
-            if "response_code" in epayco_data:
-                payment.epayco_response_code = epayco_data["response_code"]
-            if "response_message" in epayco_data:
-                payment.epayco_response_message = epayco_data["response_message"]
-            if "approval_code" in epayco_data:
-                payment.epayco_approval_code = epayco_data["approval_code"]
-            if "receipt" in epayco_data:
-                payment.epayco_receipt = epayco_data["receipt"]
-        
+        _apply_payment_status(payment, status, epayco_data)
         session.commit()
         session.refresh(payment)
     return payment
 
+def _apply_payment_status(payment: Payment, status: str, epayco_data: dict = None) -> None:
+    """Set the new status and any ePayco fields on a payment"""
+    payment.status = status
+    payment.updated_at = datetime.utcnow()
+    
+    if status in ["completed", "failed", "rejected"]:
+        payment.processed_at = datetime.utcnow()
+    
+    # Update ePayco data if provided
+    if epayco_data:
+        if "transaction_id" in epayco_data:
+            payment.epayco_transaction_id = epayco_data["transaction_id"]
+        if "response_code" in epayco_data:
+            payment.epayco_response_code = epayco_data["response_code"]
+        if "response_message" in epayco_data:
+            payment.epayco_response_message = epayco_data["response_message"]
+        if "approval_code" in epayco_data:
+            payment.epayco_approval_code = epayco_data["approval_code"]
+        if "receipt" in epayco_data:
+            payment.epayco_receipt = epayco_data["receipt"]
+
 def get_all_payments_with_order_info(
     session: Session, 
     skip: int = 0, 
@@ -161,4 +165,23 @@ def get_all_payments_with_order_info(
 
 def count_all_payments(session: Session) -> int:
     """Count total payments in the system (for admin use)"""
-    return session.query(Payment).filter(Payment.status == "completed").count() 
\ No newline at end of file
+    return session.query(Payment).filter(Payment.status == "completed").count() 
+
+async def get_payment_by_id_async(session: AsyncSession, payment_id: str) -> Optional[Payment]:
+    """Async version of get_payment_by_id"""
+    result = await session.execute(select(Payment).where(Payment.id == payment_id))
+    return result.scalars().first()
+
+async def update_payment_status_async(
+    session: AsyncSession, 
+    payment_id: str, 
+    status: str,
+    epayco_data: dict = None
+) -> Optional[Payment]:
+    """Async version of update_payment_status"""
+    payment = await get_payment_by_id_async(session, payment_id)
+    if payment:
+        _apply_payment_status(payment, status, epayco_data)
+        await session.commit()
+        await session.refresh(payment)
+    return payment
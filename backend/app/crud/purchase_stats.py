@@ -0,0 +1,67 @@
+from typing import List
+import uuid
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models.book import Book
+from app.models.book_purchase_stat import BookPurchaseStat
+from app.models.order_item import OrderItem
+
+
+def _completed_order_upsert(order_id: uuid.UUID):
+    """Build the statement that adds one completed order's items to the purchase stats"""
+    order_totals = select(
+        OrderItem.book_id,
+        func.count(OrderItem.id),
+        func.coalesce(func.sum(OrderItem.quantity), 0),
+        func.now()
+    ).where(
+        OrderItem.order_id == order_id,
+        OrderItem.book_id.is_not(None)
+    ).group_by(OrderItem.book_id)
+
+    stmt = insert(BookPurchaseStat).from_select(
+        ["book_id", "purchase_count", "quantity_sold", "updated_at"],
+        order_totals
+    )
+    return stmt.on_conflict_do_update(
+        index_elements=[BookPurchaseStat.book_id],
+        set_={
+            "purchase_count": BookPurchaseStat.purchase_count + stmt.excluded.purchase_count,
+            "quantity_sold": BookPurchaseStat.quantity_sold + stmt.excluded.quantity_sold,
+            "updated_at": stmt.excluded.updated_at
+        }
+    )
+
+
+def record_completed_order(session: Session, order_id: uuid.UUID) -> None:
+    """
+    Add the items of a newly completed order to the purchase stats.
+    Runs in the caller's transaction so it commits together with the order status.
+    """
+    session.execute(_completed_order_upsert(order_id))
+
+
+async def record_completed_order_async(session: AsyncSession, order_id: uuid.UUID) -> None:
+    """Async version of record_completed_order"""
+    await session.execute(_completed_order_upsert(order_id))
+
+
+def get_top_selling_books_db(session: Session, limit: int = 10) -> List[tuple]:
+    """Get the best selling books with their sales count and quantity sold"""
+    return session.query(
+        Book.id,
+        Book.title,
+        Book.author,
+        Book.price,
+        Book.cover_url,
+        BookPurchaseStat.purchase_count.label('sales_count'),
+        BookPurchaseStat.quantity_sold.label('total_quantity_sold')
+    ).join(
+        BookPurchaseStat, Book.id == BookPurchaseStat.book_id
+    ).order_by(
+        BookPurchaseStat.purchase_count.desc(),
+        BookPurchaseStat.book_id
+    ).limit(limit).all()
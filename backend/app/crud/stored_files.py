@@ -0,0 +1,86 @@
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models.stored_file import StoredFile
+
+
+async def touch_stored_file_async(session: AsyncSession, sha256: str) -> Optional[StoredFile]:
+    """
+    Get the stored file with this content hash and mark it as just used,
+    so the orphan sweep does not remove it while it is being handed out
+    """
+    result = await session.execute(
+        update(StoredFile)
+        .where(StoredFile.sha256 == sha256)
+        .values(last_used_at=datetime.utcnow())
+        .returning(StoredFile)
+    )
+    stored_file = result.scalars().first()
+    await session.commit()
+    return stored_file
+
+
+async def claim_stored_file_async(
+    session: AsyncSession,
+    sha256: str,
+    key: str,
+    size: int,
+    content_type: Optional[str]
+) -> Tuple[StoredFile, bool]:
+    """
+    Record a file under its content hash. Returns the stored file and whether this call
+    created it; when the content was already stored, the existing row wins.
+    """
+    while True:
+        result = await session.execute(
+            insert(StoredFile).values(
+                sha256=sha256,
+                key=key,
+                size=size,
+                content_type=content_type,
+                ref_count=0,
+                created_at=datetime.utcnow(),
+                last_used_at=datetime.utcnow()
+            ).on_conflict_do_nothing(index_elements=[StoredFile.sha256]).returning(StoredFile)
+        )
+        stored_file = result.scalars().first()
+        await session.commit()
+        if stored_file is not None:
+            return stored_file, True
+        stored_file = await touch_stored_file_async(session, sha256)
+        if stored_file is not None:
+            return stored_file, False
+        # Removed by the orphan sweep in the meantime; record it again
+
+
+def change_file_references(session: Session, key: Optional[str], delta: int) -> None:
+    """Add delta to the reference count of the stored file at key; the caller commits"""
+    if not key:
+        return
+    session.execute(
+        update(StoredFile)
+        .where(StoredFile.key == key)
+        .values(ref_count=func.greatest(StoredFile.ref_count + delta, 0), last_used_at=datetime.utcnow())
+    )
+
+
+async def delete_orphaned_stored_files_async(session: AsyncSession, unused_since: datetime, limit: int = 100) -> List[str]:
+    """
+    Delete files no book references and nobody uploaded since unused_since, returning their keys.
+    The rows stay locked until the caller commits, so remove the objects before committing.
+    """
+    orphans = (
+        select(StoredFile.id)
+        .where(StoredFile.ref_count == 0, StoredFile.last_used_at < unused_since)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    result = await session.execute(
+        delete(StoredFile).where(StoredFile.id.in_(orphans)).returning(StoredFile.key)
+    )
+    return list(result.scalars().all())
@@ -1,8 +1,52 @@
-from typing import List, Optional
+import threading
+from typing import Dict, FrozenSet, List, Optional
 import uuid
 from sqlalchemy.orm import Session
 from app.models.user_hidden_book import UserHiddenBook
 from app.schemas.user_hidden_book import UserHiddenBookCreate
+from app.utils.response_cache import response_cache
+from app.utils.cache import TTLCache
+from app.config.environment import HIDDEN_BOOKS_CACHE_MAX_SIZE, HIDDEN_BOOKS_CACHE_TTL_SECONDS
+
+
+# Frozen set of hidden book IDs per user, dropped whenever the user hides or unhides a book
+hidden_books_cache = TTLCache(maxsize=HIDDEN_BOOKS_CACHE_MAX_SIZE, ttl=HIDDEN_BOOKS_CACHE_TTL_SECONDS)
+
+# Bumped on every invalidation, so a fill whose query ran before it does not store the old set
+_generations: Dict[uuid.UUID, int] = {}
+_generations_lock = threading.Lock()
+
+
+def _cache_generation(user_id: uuid.UUID) -> int:
+    with _generations_lock:
+        return _generations.get(user_id, 0)
+
+
+def _fill_cache(user_id: uuid.UUID, generation: int, hidden_book_ids: FrozenSet[uuid.UUID]) -> None:
+    """Cache the set unless the user's hidden books changed since generation was read"""
+    with _generations_lock:
+        if _generations.get(user_id, 0) == generation:
+            hidden_books_cache.set(user_id, hidden_book_ids)
+
+
+def invalidate_hidden_book_ids(user_id: uuid.UUID) -> None:
+    """Drop the cached set of a user; call it after the change is committed"""
+    with _generations_lock:
+        _generations[user_id] = _generations.get(user_id, 0) + 1
+        hidden_books_cache.delete(user_id)
+
+
+def get_hidden_book_ids(session: Session, user_id: uuid.UUID) -> FrozenSet[uuid.UUID]:
+    """Get the set of book IDs hidden by a user, cached in-process"""
+    hidden_book_ids = hidden_books_cache.get(user_id)
+    if hidden_book_ids is None:
+        generation = _cache_generation(user_id)
+        rows = session.query(UserHiddenBook.book_id).filter(
+            UserHiddenBook.user_id == user_id
+        ).all()
+        hidden_book_ids = frozenset(row.book_id for row in rows)
+        _fill_cache(user_id, generation, hidden_book_ids)
+    return hidden_book_ids
 
 
 def hide_book_for_user(session: Session, user_id: uuid.UUID, book_id: uuid.UUID) -> Optional[UserHiddenBook]:
@@ -24,6 +68,7 @@ def hide_book_for_user(session: Session, user_id: uuid.UUID, book_id: uuid.UUID)
     session.add(hidden_book)
     session.commit()
     session.refresh(hidden_book)
+    invalidate_hidden_book_ids(user_id)
     return hidden_book
 
 
@@ -37,40 +82,33 @@ def unhide_book_for_user(session: Session, user_id: uuid.UUID, book_id: uuid.UUI
     if hidden_book:
         session.delete(hidden_book)
         session.commit()
+        invalidate_hidden_book_ids(user_id)
         return True
     return False
 
 
 def get_hidden_books_for_user(session: Session, user_id: uuid.UUID) -> List[uuid.UUID]:
     """Get list of hidden book IDs for a user"""
-    hidden_books = session.query(UserHiddenBook.book_id).filter(
-        UserHiddenBook.user_id == user_id
-    ).all()
-    
-    return [book.book_id for book in hidden_books]
+    return list(get_hidden_book_ids(session, user_id))
 
 
 def is_book_hidden_for_user(session: Session, user_id: uuid.UUID, book_id: uuid.UUID) -> bool:
     """Check if a book is hidden for a specific user"""
-    hidden_book = session.query(UserHiddenBook).filter(
-        UserHiddenBook.user_id == user_id,
-        UserHiddenBook.book_id == book_id
-    ).first()
-    
-    return hidden_book is not None
+    return book_id in get_hidden_book_ids(session, user_id)
 
 
 def count_hidden_books_for_user(session: Session, user_id: uuid.UUID) -> int:
     """Count hidden books for a user"""
-    return session.query(UserHiddenBook).filter(
-        UserHiddenBook.user_id == user_id
-    ).count()
+    return len(get_hidden_book_ids(session, user_id))
 
 
 def toggle_book_visibility_for_user(session: Session, user_id: uuid.UUID, book_id: uuid.UUID, hide: bool) -> bool:
     """Toggle book visibility for a user"""
     if hide:
-        result = hide_book_for_user(session, user_id, book_id)
-        return result is not None
+        result = hide_book_for_user(session, user_id, book_id) is not None
     else:
-        return unhide_book_for_user(session, user_id, book_id) 
\ No newline at end of file
+        result = unhide_book_for_user(session, user_id, book_id)
+    
+    # Cached catalog responses for this user were filtered with the old hidden set
+    response_cache.invalidate(f"user:{user_id}")
+    return result 
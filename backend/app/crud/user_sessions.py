@@ -6,6 +6,7 @@ from sqlalchemy import and_
 
 from app.models.user_session import UserSession
 from app.schemas.user_session import UserSessionCreate, UserSessionUpdate
+from app.utils.session_cache import invalidate_token
 
 
 def create_user_session(db: Session, session_data: UserSessionCreate) -> UserSession:
@@ -93,6 +94,7 @@ def revoke_user_session(db: Session, session_id: uuid.UUID) -> Optional[UserSess
     db_session.revoke()
     db.commit()
     db.refresh(db_session)
+    invalidate_token(db_session.session_token)
     return db_session
 
 
@@ -110,12 +112,15 @@ def revoke_all_user_sessions(db: Session, user_id: uuid.UUID, except_session_id:
         query = query.filter(UserSession.id != except_session_id)
     
     sessions = query.all()
+    revoked_tokens = [session.session_token for session in sessions]
     count = 0
     for session in sessions:
         session.revoke()
         count += 1
     
     db.commit()
+    for token in revoked_tokens:
+        invalidate_token(token)
     return count
 
 
@@ -128,10 +133,13 @@ def cleanup_expired_sessions(db: Session) -> int:
         )
     ).all()
     
+    expired_tokens = [session.session_token for session in expired_sessions]
     count = 0
     for session in expired_sessions:
         session.is_active = False
         count += 1
     
     db.commit()
+    for token in expired_tokens:
+        invalidate_token(token)
     return count 
\ No newline at end of file
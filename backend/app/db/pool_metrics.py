@@ -0,0 +1,111 @@
+import threading
+import time
+from typing import Dict, List
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+
+# Upper bounds (seconds) of the connection wait-time histogram buckets
+WAIT_TIME_BUCKETS = [0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0]
+
+
+class PoolMetrics:
+    """Counters and a wait-time histogram for one connection pool"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.bucket_counts: List[int] = [0] * (len(WAIT_TIME_BUCKETS) + 1)
+        self.wait_count = 0
+        self.wait_sum = 0.0
+        self.timeouts = 0
+        self.connect_errors = 0
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+
+    def observe_wait(self, seconds: float, timed_out: bool = False) -> None:
+        """Record how long a caller waited for a connection"""
+        with self._lock:
+            index = len(WAIT_TIME_BUCKETS)
+            for i, bound in enumerate(WAIT_TIME_BUCKETS):
+                if seconds <= bound:
+                    index = i
+                    break
+            self.bucket_counts[index] += 1
+            self.wait_count += 1
+            self.wait_sum += seconds
+            if timed_out:
+                self.timeouts += 1
+
+    def increment(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def snapshot(self, pool: Pool) -> Dict:
+        """Current pool occupancy plus the accumulated counters and histogram"""
+        with self._lock:
+            cumulative = 0
+            buckets = []
+            for bound, count in zip(WAIT_TIME_BUCKETS + ["+Inf"], self.bucket_counts):
+                cumulative += count
+                buckets.append({"le": bound, "count": cumulative})
+
+            return {
+                "pool_size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "idle": pool.checkedin(),
+                "overflow": max(pool.overflow(), 0),
+                "connects": self.connects,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "invalidations": self.invalidations,
+                "connect_errors": self.connect_errors,
+                "wait_time_seconds": {
+                    "count": self.wait_count,
+                    "sum": round(self.wait_sum, 6),
+                    "timeouts": self.timeouts,
+                    "buckets": buckets
+                }
+            }
+
+
+class _TimedPoolMixin:
+    """
+    Times how long each connection request waits on the pool. Only pool_timeout
+    running out counts as a timeout; a failure to open a new connection (database
+    down, bad credentials) is counted apart, since it says nothing about pool size.
+    """
+
+    metrics: PoolMetrics
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.metrics.observe_wait(time.perf_counter() - start, timed_out=True)
+            raise
+        except Exception:
+            self.metrics.increment("connect_errors")
+            raise
+        self.metrics.observe_wait(time.perf_counter() - start)
+        return connection
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    metrics = PoolMetrics()
+
+
+class TimedAsyncAdaptedQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    metrics = PoolMetrics()
+
+
+def instrument_pool(pool: Pool, metrics: PoolMetrics) -> None:
+    """Count connection lifecycle events on a pool"""
+    event.listen(pool, "connect", lambda *args: metrics.increment("connects"))
+    event.listen(pool, "checkout", lambda *args: metrics.increment("checkouts"))
+    event.listen(pool, "checkin", lambda *args: metrics.increment("checkins"))
+    event.listen(pool, "invalidate", lambda *args: metrics.increment("invalidations"))
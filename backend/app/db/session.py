@@ -1,9 +1,35 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker, declarative_base
 
-from app.config.environment import DATABASE_URL
+from app.config.environment import (
+    DATABASE_URL,
+    DB_MAX_OVERFLOW,
+    DB_POOL_PRE_PING,
+    DB_POOL_RECYCLE,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUT,
+)
+from app.db.pool_metrics import TimedAsyncAdaptedQueuePool, TimedQueuePool, instrument_pool
 
-engine = create_engine(DATABASE_URL)
+POOL_OPTIONS = {
+    "pool_size": DB_POOL_SIZE,
+    "max_overflow": DB_MAX_OVERFLOW,
+    "pool_timeout": DB_POOL_TIMEOUT,
+    "pool_recycle": DB_POOL_RECYCLE,
+    "pool_pre_ping": DB_POOL_PRE_PING,
+}
+
+engine = create_engine(DATABASE_URL, poolclass=TimedQueuePool, **POOL_OPTIONS)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine over the same database for routes that must not block the event loop
+ASYNC_DATABASE_URL = make_url(DATABASE_URL).set(drivername="postgresql+asyncpg")
+async_engine = create_async_engine(ASYNC_DATABASE_URL, poolclass=TimedAsyncAdaptedQueuePool, **POOL_OPTIONS)
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+instrument_pool(engine.pool, TimedQueuePool.metrics)
+instrument_pool(async_engine.sync_engine.pool, TimedAsyncAdaptedQueuePool.metrics)
+
 Base = declarative_base()
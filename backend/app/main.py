@@ -1,12 +1,44 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from app.db.session import Base, engine
 from app.api.main import api_router
+from app.services.session_activity import activity_tracker
+from app.config.environment import JOB_WORKER_ENABLED
+from app.services.epayco import epayco_client
+from app.services.http_clients import http_clients
+from app.services.job_worker import job_worker
+from app.services.payment_processing import check_payment_settings
+from app.services.smtp_pool import smtp_pool
+from app.services.invoices import shutdown_render_pool
+from app.services.cover_images import shutdown_cover_pool
+from app.utils.templates import preload_templates
 from fastapi.middleware.cors import CORSMiddleware
 
 # Inicializar tablas si no hay migraciones todavía
 # Base.metadata.create_all(bind=engine)
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    activity_tracker.start()
+    preload_templates()
+    await http_clients.start()
+    if JOB_WORKER_ENABLED:
+        check_payment_settings()
+        job_worker.start()
+    yield
+    await job_worker.stop()
+    # Final flush so no session activity is lost on shutdown
+    await asyncio.to_thread(activity_tracker.stop)
+    await epayco_client.aclose()
+    await http_clients.aclose()
+    await smtp_pool.aclose()
+    shutdown_render_pool()
+    shutdown_cover_pool()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -14,6 +46,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
 @app.get("/")
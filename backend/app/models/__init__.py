@@ -7,3 +7,8 @@ from .cart_item import CartItem
 from .payment import Payment
 from .user_session import UserSession
 from .user_hidden_book import UserHiddenBook
+from .book_purchase_stat import BookPurchaseStat
+from .epayco_customer import EpaycoCustomer
+from .job import Job
+from .email_dead_letter import EmailDeadLetter
+from .stored_file import StoredFile
@@ -1,7 +1,7 @@
 from pydantic import BaseModel
-from sqlalchemy import Column, Text, Numeric, Integer, ForeignKey, DateTime
-from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Text, Numeric, Integer, ForeignKey, DateTime, Index, Computed, func
+from sqlalchemy.dialects.postgresql import JSONB, UUID, TSVECTOR
+from sqlalchemy.orm import relationship, deferred
 from datetime import datetime
 import uuid
 from app.db.session import Base
@@ -17,7 +17,39 @@ class Book(Base):
     stock = Column(Integer, default=0, nullable=False)
     category_id = Column(UUID(as_uuid=True), ForeignKey("categories.id"), nullable=True)
     cover_url = Column(Text)
+    # Resized copies of the cover, filled in by app/services/cover_images.py
+    cover_variants = Column(JSONB)
     file_url = Column(Text)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    # Maintained by PostgreSQL; deferred so catalog queries don't load it
+    search_vector = deferred(Column(TSVECTOR, Computed(
+        "setweight(to_tsvector('english'::regconfig, coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('english'::regconfig, coalesce(author, '')), 'B') || "
+        "setweight(to_tsvector('english'::regconfig, coalesce(description, '')), 'C')",
+        persisted=True
+    )))
 
     category = relationship("Category")
+
+    __table_args__ = (
+        # Keyset pagination and catalog filters
+        Index("ix_books_created_at_id", "created_at", "id"),
+        Index("ix_books_category_id", "category_id"),
+        Index("ix_books_lower_author", func.lower(author)),
+        Index(
+            "ix_books_lower_title_prefix",
+            func.lower(title).label("lower_title"),
+            postgresql_ops={"lower_title": "text_pattern_ops"}
+        ),
+        Index("ix_books_search_vector", "search_vector", postgresql_using="gin"),
+        # Type-ahead suggestions (requires the pg_trgm extension)
+        Index(
+            "ix_books_title_trgm", "title",
+            postgresql_using="gist", postgresql_ops={"title": "gist_trgm_ops"}
+        ),
+        Index(
+            "ix_books_author_trgm", "author",
+            postgresql_using="gist", postgresql_ops={"author": "gist_trgm_ops"}
+        ),
+    )
@@ -0,0 +1,21 @@
+from datetime import datetime
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import relationship
+from app.db.session import Base
+
+
+class BookPurchaseStat(Base):
+    """Precomputed purchase counts per book, updated when an order is completed"""
+    __tablename__ = "book_purchase_stats"
+
+    book_id = Column(UUID(as_uuid=True), ForeignKey("books.id", ondelete="CASCADE"), primary_key=True)
+    purchase_count = Column(Integer, nullable=False, default=0)  # Number of completed order items
+    quantity_sold = Column(Integer, nullable=False, default=0)  # Sum of their quantities
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    book = relationship("Book")
+
+    __table_args__ = (
+        Index("ix_book_purchase_stats_ranking", purchase_count.desc(), "book_id"),
+    )
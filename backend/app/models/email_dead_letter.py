@@ -0,0 +1,19 @@
+from datetime import datetime
+import uuid
+from sqlalchemy import Column, DateTime, Integer, Text
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+from app.db.session import Base
+
+
+class EmailDeadLetter(Base):
+    """An email that could not be delivered after all its attempts, kept for inspection and resending"""
+    __tablename__ = "email_dead_letters"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    job_id = Column(UUID(as_uuid=True), nullable=False)
+    recipients = Column(Text, nullable=False)
+    subject = Column(Text, nullable=False)
+    message = Column(JSONB, nullable=False)  # The job payload, enough to queue the email again
+    attempts = Column(Integer, nullable=False)
+    last_error = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,19 @@
+from datetime import datetime
+from sqlalchemy import Column, DateTime, ForeignKey, String, Text
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import relationship
+from app.db.session import Base
+
+
+class EpaycoCustomer(Base):
+    """The ePayco customer and card token last used by a user, reused by later payments"""
+    __tablename__ = "epayco_customers"
+
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    customer_id = Column(Text, nullable=False)
+    token_card = Column(Text, nullable=False)
+    card_fingerprint = Column(String(64), nullable=False)  # HMAC of the card number and expiry date
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    user = relationship("User")
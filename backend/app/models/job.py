@@ -0,0 +1,31 @@
+from datetime import datetime
+import uuid
+from sqlalchemy import Column, DateTime, Index, Integer, String, Text, text
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+from app.db.session import Base
+
+
+class Job(Base):
+    """A unit of background work; workers claim ready jobs with SELECT ... FOR UPDATE SKIP LOCKED"""
+    __tablename__ = "jobs"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    queue = Column(String(50), nullable=False)  # 'payments', ...
+    payload = Column(JSONB, nullable=False, default=dict)
+    status = Column(String(20), nullable=False, default="queued")  # 'queued', 'running', 'done', 'failed'
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=5)
+    run_after = Column(DateTime, nullable=False, default=datetime.utcnow)
+    locked_at = Column(DateTime)
+    last_error = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        Index(
+            "ix_jobs_queue_ready",
+            "queue",
+            "run_after",
+            postgresql_where=text("status IN ('queued', 'running')")
+        ),
+    )
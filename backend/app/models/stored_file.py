@@ -0,0 +1,27 @@
+from datetime import datetime
+import uuid
+from sqlalchemy import BigInteger, Column, DateTime, Index, Integer, String, Text, text
+from sqlalchemy.dialects.postgresql import UUID
+from app.db.session import Base
+
+
+class StoredFile(Base):
+    """An uploaded file, stored once per content under a key derived from its SHA-256"""
+    __tablename__ = "stored_files"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    sha256 = Column(String(64), nullable=False, unique=True)
+    key = Column(Text, nullable=False, unique=True)
+    size = Column(BigInteger, nullable=False)
+    content_type = Column(Text)
+    ref_count = Column(Integer, nullable=False, default=0)  # Books whose file_url points to this file
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_used_at = Column(DateTime, nullable=False, default=datetime.utcnow)  # Last upload or reference change
+
+    __table_args__ = (
+        Index(
+            "ix_stored_files_orphans",
+            "last_used_at",
+            postgresql_where=text("ref_count = 0")
+        ),
+    )
@@ -1,11 +1,19 @@
 # Book out schema
 import uuid
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 from pydantic import BaseModel
 from app.utils.security_validations import sanitize_input
 
 
+class CoverVariant(BaseModel):
+    """A resized copy of a book cover"""
+
+    width: int
+    height: int
+    format: str
+    url: str
+
 class BookOut(BaseModel):
     
     id: uuid.UUID
@@ -13,6 +21,7 @@ class BookOut(BaseModel):
     author: str
     description: str
     cover_url: Optional[str] = None
+    cover_variants: Optional[List[CoverVariant]] = None
     price: float
     category_id: Optional[uuid.UUID] = None
     file_url: Optional[str] = None
@@ -53,3 +62,23 @@ class BookCreate(BaseModel):
         self.description = sanitize_input(self.description)
         if self.file_url:
             self.file_url = sanitize_input(self.file_url)
+
+class BookSearchHit(BookOut):
+    """Book matched by a full-text search, with its rank and highlighted fragments"""
+
+    rank: float
+    title_highlight: str
+    description_highlight: Optional[str] = None
+
+class BookSearchResponse(BaseModel):
+    """Schema for a page of full-text search results"""
+
+    results: List[BookSearchHit]
+    total: int
+
+class BookSuggestion(BaseModel):
+    """Schema for a type-ahead suggestion"""
+
+    id: uuid.UUID
+    title: str
+    author: str
@@ -1,5 +1,6 @@
+from typing import List
 import uuid
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 from app.schemas.book import BookOut
 
@@ -15,3 +16,11 @@ class CartItemOut(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class CartBulkItem(BaseModel):
+    book_id: uuid.UUID
+    quantity: int = Field(1, ge=0, description="New quantity; 0 removes the book from the cart")
+
+class CartBulkUpdate(BaseModel):
+    items: List[CartBulkItem] = Field(..., max_length=500)
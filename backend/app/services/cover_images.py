@@ -0,0 +1,200 @@
+import asyncio
+import hashlib
+import io
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import List, Optional, Sequence, Tuple
+
+import httpx
+from PIL import ExifTags, Image, ImageOps, UnidentifiedImageError
+
+from app.config.environment import (
+    COVER_JPEG_QUALITY,
+    COVER_MAX_PIXELS,
+    COVER_MAX_SOURCE_MB,
+    COVER_RENDER_WORKERS,
+    COVER_VARIANT_BASE_URL,
+    COVER_VARIANT_WIDTHS,
+    COVER_WEBP_QUALITY,
+)
+from app.crud.books import COVER_VARIANTS_QUEUE, get_book_by_id_async, set_cover_variants_async
+from app.db.session import AsyncSessionLocal
+from app.models.job import Job
+from app.services.http_clients import http_clients
+from app.services.job_worker import job_worker
+from app.services.storage import iter_object, key_from_file_url, put_object
+from app.utils.response_cache import response_cache
+
+
+# Variants are stored under the SHA-256 of the original cover, so each name always
+# has the same content and can be cached forever
+COVER_PREFIX = "covers/"
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Variant format -> (file extension, content type)
+COVER_FORMATS = {
+    "webp": ("webp", "image/webp"),
+    "jpeg": ("jpg", "image/jpeg"),
+}
+
+MAX_SOURCE_SIZE = COVER_MAX_SOURCE_MB * 1024 * 1024
+
+http_clients.register("covers")
+
+_executor: Optional[Executor] = None
+
+
+class CoverImageError(Exception):
+    """The cover cannot be turned into variants, and trying again will not help"""
+
+
+def variant_key(digest: str, width: int, fmt: str) -> str:
+    return f"{COVER_PREFIX}{digest}/{width}.{COVER_FORMATS[fmt][0]}"
+
+
+def variant_url(digest: str, width: int, fmt: str) -> str:
+    return f"{COVER_VARIANT_BASE_URL}/api/covers/{digest}/{width}.{COVER_FORMATS[fmt][0]}"
+
+
+def render_cover_variants(
+    data: bytes,
+    widths: Sequence[int],
+    webp_quality: int,
+    jpeg_quality: int,
+    max_pixels: int
+) -> List[Tuple[int, int, str, bytes]]:
+    """
+    Scale an image down to each of widths, keeping its aspect ratio, and encode every
+    size as WebP and JPEG. Widths the image does not reach are skipped; an image
+    narrower than all of them is re-encoded at its own size. Runs in the render pool.
+    """
+    try:
+        source = Image.open(io.BytesIO(data))
+    except (UnidentifiedImageError, Image.DecompressionBombError) as e:
+        raise CoverImageError(f"Not a usable image: {e}")
+
+    with source:
+        source_width, source_height = source.size
+        if source_width * source_height > max_pixels:
+            raise CoverImageError(f"Image too large ({source_width}x{source_height})")
+        rotated = source.getexif().get(ExifTags.Base.Orientation) in (5, 6, 7, 8)
+        if rotated:
+            source_width, source_height = source_height, source_width
+        targets = sorted({width for width in widths if width < source_width}) or [source_width]
+
+        # Let JPEG decode at a reduced scale that still covers the largest variant
+        source.draft("RGB", (1, targets[-1]) if rotated else (targets[-1], 1))
+        try:
+            image = ImageOps.exif_transpose(source)
+            image = image.convert("RGBA" if image.has_transparency_data else "RGB")
+        except OSError as e:
+            raise CoverImageError(f"Corrupt image: {e}")
+
+        variants = []
+        for width in targets:
+            height = max(1, round(image.height * width / image.width))
+            resized = image.resize((width, height), Image.Resampling.LANCZOS, reducing_gap=3.0)
+
+            webp = io.BytesIO()
+            resized.save(webp, "WEBP", quality=webp_quality, method=4)
+            variants.append((width, height, "webp", webp.getvalue()))
+
+            if resized.mode == "RGBA":
+                # JPEG has no transparency: flatten onto white
+                flat = Image.new("RGB", resized.size, (255, 255, 255))
+                flat.paste(resized, mask=resized.getchannel("A"))
+                resized = flat
+            jpeg = io.BytesIO()
+            resized.save(jpeg, "JPEG", quality=jpeg_quality, optimize=True, progressive=True)
+            variants.append((width, height, "jpeg", jpeg.getvalue()))
+        return variants
+
+
+def _get_executor() -> Optional[Executor]:
+    global _executor
+    if _executor is None and COVER_RENDER_WORKERS > 0:
+        _executor = ProcessPoolExecutor(max_workers=COVER_RENDER_WORKERS)
+    return _executor
+
+
+async def render_cover(data: bytes) -> List[Tuple[int, int, str, bytes]]:
+    """Render the variants of a cover in the render pool, off the event loop"""
+    args = (data, COVER_VARIANT_WIDTHS, COVER_WEBP_QUALITY, COVER_JPEG_QUALITY, COVER_MAX_PIXELS)
+    executor = _get_executor()
+    if executor is None:
+        return await asyncio.to_thread(render_cover_variants, *args)
+    return await asyncio.get_running_loop().run_in_executor(executor, render_cover_variants, *args)
+
+
+async def fetch_cover(cover_url: str) -> bytes:
+    """The original cover, read from the bucket when it is stored there, otherwise over HTTP"""
+    key = key_from_file_url(cover_url)
+    if key is not None:
+        data = bytearray()
+        async for chunk in iter_object(key):
+            data += chunk
+            if len(data) > MAX_SOURCE_SIZE:
+                raise CoverImageError(f"Cover larger than {COVER_MAX_SOURCE_MB} MB")
+        return bytes(data)
+
+    if not cover_url.startswith(("http://", "https://")):
+        raise CoverImageError("Unsupported cover URL")
+
+    async with http_clients.get("covers").stream("GET", cover_url, follow_redirects=True) as response:
+        if 400 <= response.status_code < 500:
+            raise CoverImageError(f"Cover not available (HTTP {response.status_code})")
+        response.raise_for_status()
+        if int(response.headers.get("content-length") or 0) > MAX_SOURCE_SIZE:
+            raise CoverImageError(f"Cover larger than {COVER_MAX_SOURCE_MB} MB")
+        data = bytearray()
+        async for chunk in response.aiter_bytes():
+            data += chunk
+            if len(data) > MAX_SOURCE_SIZE:
+                raise CoverImageError(f"Cover larger than {COVER_MAX_SOURCE_MB} MB")
+        return bytes(data)
+
+
+async def build_cover_variants(cover_url: str) -> List[dict]:
+    """Render and store the variants of a cover, returning the entries of Book.cover_variants"""
+    data = await fetch_cover(cover_url)
+    digest = hashlib.sha256(data).hexdigest()
+    rendered = await render_cover(data)
+
+    await asyncio.gather(*(
+        put_object(variant_key(digest, width, fmt), content, COVER_FORMATS[fmt][1], IMMUTABLE_CACHE_CONTROL)
+        for width, _, fmt, content in rendered
+    ))
+    return [
+        {"width": width, "height": height, "format": fmt, "url": variant_url(digest, width, fmt)}
+        for width, height, fmt, _ in rendered
+    ]
+
+
+async def render_cover_job(job: Job) -> None:
+    """Fill in the cover variants of a book; network and storage errors make the job retry"""
+    book_id, cover_url = job.payload["book_id"], job.payload["cover_url"]
+    async with AsyncSessionLocal() as session:
+        book = await get_book_by_id_async(session, book_id)
+    if book is None or book.cover_url != cover_url:
+        # Deleted, or the cover changed again and has a job of its own
+        return
+
+    try:
+        variants = await build_cover_variants(cover_url)
+    except (CoverImageError, httpx.InvalidURL) as e:
+        print(f"Cannot make cover variants of book {book_id} from {cover_url}: {e}")
+        return
+
+    async with AsyncSessionLocal() as session:
+        if await set_cover_variants_async(session, book_id, cover_url, variants):
+            response_cache.invalidate("catalog")
+
+
+def shutdown_cover_pool() -> None:
+    """Stop the render processes"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+job_worker.register(COVER_VARIANTS_QUEUE, render_cover_job)
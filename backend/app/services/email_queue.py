@@ -0,0 +1,87 @@
+from email.message import EmailMessage
+from typing import List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config.environment import EMAIL_MAX_ATTEMPTS, EMAIL_RETRY_BACKOFF_SECONDS, MAIL_FROM
+from app.crud.email_dead_letters import create_email_dead_letter_async
+from app.crud.jobs import enqueue_job_async
+from app.db.session import AsyncSessionLocal
+from app.models.job import Job
+from app.services.job_worker import job_worker
+from app.services.invoices import invoice_template_data, render_invoice
+from app.services.smtp_pool import smtp_pool
+from app.utils.templates import render_template
+
+
+EMAILS_QUEUE = "emails"
+
+
+async def enqueue_email_async(
+    session: AsyncSession,
+    recipients: List[str],
+    subject: str,
+    template: Optional[str] = None,
+    context: Optional[dict] = None,
+    body: Optional[str] = None,
+    invoice_pdf: Optional[str] = None
+) -> Job:
+    """
+    Queue an email, either a template of app/templates rendered with context or a
+    plain text body. With invoice_pdf, context is also rendered as a PDF invoice and
+    attached under that file name. Does not commit, so the email is only sent if the
+    caller's transaction commits.
+    """
+    return await enqueue_job_async(session, EMAILS_QUEUE, {
+        "recipients": recipients,
+        "subject": subject,
+        "template": template,
+        "context": context or {},
+        "body": body,
+        "invoice_pdf": invoice_pdf,
+    }, max_attempts=EMAIL_MAX_ATTEMPTS)
+
+
+async def enqueue_invoice_email_async(session: AsyncSession, order, payment, user, order_items) -> Job:
+    """Queue the HTML invoice of an order"""
+    context = invoice_template_data(order, payment, user, order_items)
+    return await enqueue_email_async(
+        session,
+        [user.email],
+        f"Invoice #{context['order_number']} - Virtual Library",
+        template="invoice.html",
+        context=context,
+        invoice_pdf=f"invoice-{context['order_number']}.pdf"
+    )
+
+
+def build_message(payload: dict) -> EmailMessage:
+    """Turn the payload of an email job into the message to send"""
+    message = EmailMessage()
+    message["From"] = MAIL_FROM
+    message["To"] = ", ".join(payload["recipients"])
+    message["Subject"] = payload["subject"]
+    if payload.get("template"):
+        message.set_content(render_template(payload["template"], payload.get("context") or {}), subtype="html")
+    else:
+        message.set_content(payload.get("body") or "")
+    return message
+
+
+async def send_email_job(job: Job) -> None:
+    """Deliver a queued email over the shared SMTP connections; errors make the job retry"""
+    message = build_message(job.payload)
+    if job.payload.get("invoice_pdf"):
+        pdf = await render_invoice(job.payload["context"], "pdf")
+        message.add_attachment(pdf, maintype="application", subtype="pdf", filename=job.payload["invoice_pdf"])
+    await smtp_pool.send(message)
+
+
+async def dead_letter_email_job(job: Job) -> None:
+    """Move an email that ran out of attempts to the dead-letter table"""
+    async with AsyncSessionLocal() as session:
+        await create_email_dead_letter_async(session, job)
+    print(f"Email '{job.payload.get('subject')}' to {job.payload.get('recipients')} moved to dead letters: {job.last_error}")
+
+
+job_worker.register(EMAILS_QUEUE, send_email_job, on_failure=dead_letter_email_job, backoff=EMAIL_RETRY_BACKOFF_SECONDS)
@@ -1,26 +1,205 @@
+import asyncio
+import hashlib
+import hmac
+import json
 import os
+import random
+import time
+from typing import Dict, Optional
 
-import epaycosdk.epayco as epayco
+import httpx
 
-class EpaycoService:
+from app.config.environment import (
+    EPAYCO_API_URL,
+    EPAYCO_CONFIRMATION_URL,
+    EPAYCO_CONNECT_TIMEOUT_SECONDS,
+    EPAYCO_CUSTOMER_ID,
+    EPAYCO_MAX_CONCURRENCY,
+    EPAYCO_MAX_RETRIES,
+    EPAYCO_P_KEY,
+    EPAYCO_RETRY_BACKOFF_SECONDS,
+    EPAYCO_SECURE_URL,
+    EPAYCO_TIMEOUT_SECONDS,
+    JWT_SECRET,
+)
+from app.services.http_clients import LatencyMetrics, http_clients
 
-    def __init__(self):
 
-        self.apiKey = os.getenv("EPAYCO_PUBLIC_KEY")
-        self.privateKey = os.getenv("EPAYCO_PRIVATE_KEY")
-        self.lenguage = "ES"
-        self.test = os.getenv("EPAYCO_TEST_MODE", "True").lower() in ("true", "1", "yes")
-        self.options = {
-            "apiKey": self.apiKey,
-            "privateKey": self.privateKey,
-            "test": self.test,
-            "lenguage": self.lenguage
-        }
-        self.objepayco = epayco.Epayco(self.options)
+def card_fingerprint(card_number: str, exp_month: str, exp_year: str) -> str:
+    """Keyed hash identifying a card without storing its number"""
+    message = f"{card_number}|{exp_month}|{exp_year}".encode("utf-8")
+    return hmac.new((JWT_SECRET or "").encode("utf-8"), message, hashlib.sha256).hexdigest()
+
+
+# cod_respuesta / x_cod_response -> payment and order status
+EPAYCO_STATUS_BY_CODE = {
+    1: "completed",
+    2: "rejected",
+    3: "pending",
+    4: "failed",
+    6: "reversed",
+    7: "retained",
+    8: "started",
+    9: "expired",
+    10: "abandoned",
+    11: "canceled",
+}
+
+
+def verify_confirmation_signature(params: dict) -> bool:
+    """Check the x_signature ePayco adds to confirmation requests"""
+    if not EPAYCO_CUSTOMER_ID or not EPAYCO_P_KEY or not params.get("x_signature"):
+        return False
+    message = "^".join([
+        EPAYCO_CUSTOMER_ID,
+        EPAYCO_P_KEY,
+        str(params.get("x_ref_payco", "")),
+        str(params.get("x_transaction_id", "")),
+        str(params.get("x_amount", "")),
+        str(params.get("x_currency_code", ""))
+    ])
+    expected = hashlib.sha256(message.encode("utf-8")).hexdigest()
+    return hmac.compare_digest(expected, str(params["x_signature"]))
+
+
+def build_charge_payload(
+    token_card: str,
+    customer_id: str,
+    client: dict,
+    amount: str,
+    bill: str,
+    client_ip: str,
+    use_default_card: bool = True
+) -> dict:
+    """Build the ePayco charge request for a tokenized card"""
+    payload = {
+        "token_card": token_card,
+        "customer_id": customer_id,
+        "doc_type": "CC",
+        "doc_number": client["identification"],
+        "name": client["full_name"],
+        "last_name": client["full_name"],
+        "email": client["email"],
+        "bill": str(bill),
+        "description": "Test Payment",
+        "country": "CO",
+        "city": "bogota",
+        "value": amount,
+        "tax": "0",
+        "tax_base": "0",
+        "currency": "USD",
+        "dues": "1",
+        "ip": client_ip,  #This is the client's IP, it is required
+        # "url_response": "https://tudominio.com/respuesta.php",
+        # "url_confirmation": "https://tudominio.com/confirmacion.php",
+        "method_confirmation": "GET",
+        "use_default_card_customer":use_default_card, # if the user wants to be charged with the card that the customer currently has as default = true
+    }
+    if EPAYCO_CONFIRMATION_URL:
+        payload["url_confirmation"] = EPAYCO_CONFIRMATION_URL
+    return payload
+
+
+class EpaycoGatewayError(Exception):
+    """The gateway could not be reached or did not give a usable answer"""
+
+    def __init__(self, message: str, not_processed: bool = False):
+        super().__init__(message)
+        # True when the gateway certainly did not act on the request, so it can always be resent
+        self.not_processed = not_processed
+
+
+class AsyncEpaycoClient:
+    """
+    Non-blocking ePayco client for use inside async routes
 
-    def get_token(self, credit_info: dict):
+    Talks to the same REST endpoints as the ePayco Python SDK, but through the pooled clients
+    of the shared registry (upstreams "epayco" and "epayco-secure"). The bearer
+    token is fetched once and reused, gateway calls are bounded by a semaphore and every call
+    has a timeout. Failures are retried with exponential backoff when it is
+    safe: always if the request never reached the gateway, and also on
+    timeouts and 5xx answers for idempotent steps such as card tokenization.
+    A step that still fails returns {}, which callers already treat as failed.
+    """
+
+    # The SDK logs in before every call; the token is valid much longer than this
+    BEARER_TOKEN_TTL_SECONDS = 600
+
+    def __init__(
+        self,
+        base_url: str = EPAYCO_API_URL,
+        secure_url: str = EPAYCO_SECURE_URL,
+        public_key: Optional[str] = None,
+        private_key: Optional[str] = None,
+        test: Optional[bool] = None,
+        timeout: float = EPAYCO_TIMEOUT_SECONDS,
+        connect_timeout: float = EPAYCO_CONNECT_TIMEOUT_SECONDS,
+        max_concurrency: int = EPAYCO_MAX_CONCURRENCY,
+        max_retries: int = EPAYCO_MAX_RETRIES,
+        retry_backoff: float = EPAYCO_RETRY_BACKOFF_SECONDS,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.secure_url = secure_url.rstrip("/")
+        self.public_key = public_key or os.getenv("EPAYCO_PUBLIC_KEY", "")
+        self.private_key = private_key or os.getenv("EPAYCO_PRIVATE_KEY", "")
+        if test is None:
+            test = os.getenv("EPAYCO_TEST_MODE", "True").lower() in ("true", "1", "yes")
+        self.test = "true" if test else "false"
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+
+        self.upstream = "epayco"
+        self.secure_upstream = "epayco-secure"
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._login_lock: Optional[asyncio.Lock] = None
+        self._bearer_token: Optional[str] = None
+        self._bearer_token_expires_at = 0.0
+        self.metrics = LatencyMetrics()
+
+        # Failed calls are retried here with backoff, so the transports do not retry
+        http_clients.register(
+            self.upstream,
+            base_url=self.base_url,
+            timeout=timeout,
+            connect_timeout=connect_timeout,
+            max_connections=max_concurrency,
+            max_keepalive=max_concurrency,
+            retries=0,
+            headers={
+                "Content-Type": "application/json",
+                "Accept": "application/json",
+                "type": "sdk-jwt",
+                "lang": "PYTHON"
+            }
+        )
+        http_clients.register(
+            self.secure_upstream,
+            base_url=self.secure_url,
+            timeout=timeout,
+            connect_timeout=connect_timeout,
+            max_connections=max_concurrency,
+            max_keepalive=max_concurrency,
+            retries=0,
+            headers={"Accept": "application/json"}
+        )
+
+    def _http(self) -> httpx.AsyncClient:
+        """The shared API client; the semaphore and lock are created inside the running event loop"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._login_lock = asyncio.Lock()
+        return http_clients.get(self.upstream)
+
+    async def aclose(self) -> None:
+        """Forget the bearer token and the loop-bound locks; the pools belong to http_clients"""
+        self._semaphore = None
+        self._login_lock = None
+        self._bearer_token = None
+
+    async def get_token(self, credit_info: dict) -> dict:
         """
-        Example of credit_info dict:
+        Tokenize a card. Example of credit_info dict:
         credit_info = {
             "card[number]": "4575623182290326",
             "card[exp_year]": "2025",
@@ -29,17 +208,12 @@ class EpaycoService:
             "hasCvv": True #// hasCvv: validar codigo de seguridad en la transacción
         }
         """
-        try:
-            token = self.objepayco.token.create(credit_info)
-            return token
-        except Exception as e:
-            print(f"ePayco initialization failed: {e}")
-            return False
-        
-    def create_client(self, client_info: dict):
+        return await self._call("v1/tokens", credit_info, idempotent=True)
+
+    async def create_client(self, client_info: dict) -> dict:
         """
-        Example of client_info dict:
-        customer_info = {
+        Create a customer for a card token. Example of client_info dict:
+        client_info = {
             "token_card": "eXj5Wdqgj7xzvC7AR",
             "name": "Joe",
             "last_name": "Doe", #This parameter is optional
@@ -48,54 +222,167 @@ class EpaycoService:
             "default": True,
             "city": "Bogota",
             "address": "Cr 4 # 55 36",
-            "phone": "3005234321",
             "cell_phone": "3010000001"
         }
         """
-        try:
-            client = self.objepayco.customer.create(client_info)
-            return client
-        except Exception as e:
-            print(f"Error creating client: {e}")
-            return {}
-        
-    def charge(self, token_card: str, customer_id: str, client: dict, amount: str, bill: str, client_ip: str):
+        return await self._call("payment/v1/customer/create", client_info, idempotent=False)
+
+    async def add_customer_token(self, customer_id: str, token_card: str) -> dict:
+        """Attach a new card token to an existing customer"""
+        return await self._call(
+            "v1/customer/add/token",
+            {"customer_id": customer_id, "token_card": token_card},
+            idempotent=True
+        )
+
+    async def charge(
+        self,
+        token_card: str,
+        customer_id: str,
+        client: dict,
+        amount: str,
+        bill: str,
+        client_ip: str,
+        use_default_card: bool = True
+    ) -> dict:
         """
-        Client information example:
+        Charge a tokenized card. Client information example:
         client = {
             "identification": "123456789",
             "full_name": "John Doe",
             "email": "example@email.com",
         }
+        Pass use_default_card=False to charge token_card when it is not the customer's default card.
         """
+        payment_info = build_charge_payload(token_card, customer_id, client, amount, bill, client_ip, use_default_card)
+        return await self._call("payment/v1/charge/create", payment_info, idempotent=False)
+
+    async def get_transaction(self, ref_payco: str) -> dict:
+        """Look up the current state of a transaction by its ePayco reference"""
+        async def fetch():
+            self._http()
+            async with self._semaphore:
+                response = await self._timed_request(
+                    "GET",
+                    "restpagos/transaction/response.json",
+                    upstream=self.secure_upstream,
+                    params={"ref_payco": ref_payco, "public_key": self.public_key}
+                )
+            return self._parse(response)
+
+        return await self._with_retries("restpagos/transaction/response.json", fetch, idempotent=True)
+
+    async def _call(self, endpoint: str, data: dict, idempotent: bool) -> dict:
+        """Send one gateway call, retrying with backoff where that is safe"""
+        return await self._with_retries(endpoint, lambda: self._post(endpoint, data), idempotent)
+
+    async def _with_retries(self, endpoint: str, send, idempotent: bool) -> dict:
+        attempt = 0
+        while True:
+            try:
+                return await send()
+            except (httpx.TransportError, EpaycoGatewayError) as e:
+                if attempt >= self.max_retries or not self._can_retry(e, idempotent):
+                    # Callers treat an empty answer as a failed step
+                    print(f"ePayco call to {endpoint} failed: {e!r}")
+                    return {}
+                delay = self.retry_backoff * (2 ** attempt) * random.uniform(0.5, 1.5)  # nosec B311 - retry jitter, not a secret
+                attempt += 1
+                self.metrics.increment("retries")
+                print(f"ePayco call to {endpoint} failed ({e!r}), retry {attempt} in {delay:.2f}s")
+                await asyncio.sleep(delay)
+
+    @staticmethod
+    def _can_retry(error: Exception, idempotent: bool) -> bool:
+        if isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)):
+            return True
+        if isinstance(error, EpaycoGatewayError) and error.not_processed:
+            return True
+        return idempotent
+
+    async def _post(self, endpoint: str, data: dict) -> dict:
+        self._http()
+        bearer_token = await self._get_bearer_token()
+
+        body = dict(data)
+        body["extras_epayco"] = json.dumps({"extra5": "P43"})
+        body["test"] = self.test
+
+        async with self._semaphore:
+            response = await self._timed_request(
+                "POST",
+                endpoint,
+                json=body,
+                headers={"Authorization": f"Bearer {bearer_token}"}
+            )
+        return self._parse(response)
+
+    def _parse(self, response: httpx.Response) -> dict:
+        if response.status_code == 401:
+            self._bearer_token = None
+            raise EpaycoGatewayError("ePayco rejected the bearer token", not_processed=True)
+        if response.status_code == 429 or response.status_code >= 500:
+            raise EpaycoGatewayError(f"ePayco answered {response.status_code}")
+        if response.status_code == 400:
+            # Validation errors; the SDK hands these back as the raw body
+            try:
+                payload = response.json()
+            except ValueError:
+                payload = None
+            return payload if isinstance(payload, dict) else {"status": False, "message": response.text}
+        if not 200 <= response.status_code <= 206:
+            raise EpaycoGatewayError(f"ePayco answered {response.status_code}")
+
         try:
-            payment_info = {
-                "token_card": token_card,
-                "customer_id": customer_id,
-                "doc_type": "CC",
-                "doc_number": client["identification"],
-                "name": client["full_name"],
-                "last_name": client["full_name"],
-                "email": client["email"],
-                "bill": str(bill),
-                "description": "Test Payment",
-                "country": "CO",
-                "city": "bogota",
-                "value": amount,
-                "tax": "0",
-                "tax_base": "0",
-                "currency": "USD",
-                "dues": "1",
-                "ip": client_ip,  #This is the client's IP, it is required
-                # "url_response": "https://tudominio.com/respuesta.php",
-                # "url_confirmation": "https://tudominio.com/confirmacion.php",
-                "method_confirmation": "GET",
-                "use_default_card_customer":True, # if the user wants to be charged with the card that the customer currently has as default = true
-            }
+            payload = response.json()
+        except ValueError:
+            payload = None
+        if not isinstance(payload, dict):
+            # The request may still have been acted on, so only idempotent calls are resent
+            raise EpaycoGatewayError(f"ePayco answered {response.status_code} without a JSON object")
+        return payload
+
+    async def _timed_request(self, method: str, endpoint: str, upstream: Optional[str] = None, **kwargs) -> httpx.Response:
+        """Send a request to the gateway, recording the call and its latency"""
+        client = http_clients.get(upstream or self.upstream)
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, f"/{endpoint}", **kwargs)
+        except httpx.TransportError:
+            self.metrics.observe_call(endpoint, time.perf_counter() - start, failed=True)
+            raise
+        failed = response.status_code == 429 or response.status_code >= 500
+        self.metrics.observe_call(endpoint, time.perf_counter() - start, failed=failed)
+        return response
+
+    async def _get_bearer_token(self) -> str:
+        """Log in once and share the bearer token until it expires or is rejected"""
+        if self._bearer_token and time.monotonic() < self._bearer_token_expires_at:
+            return self._bearer_token
+
+        async with self._login_lock:
+            if self._bearer_token and time.monotonic() < self._bearer_token_expires_at:
+                return self._bearer_token
+
+            async with self._semaphore:
+                response = await self._timed_request(
+                    "POST",
+                    "v1/auth/login",
+                    json={"public_key": self.public_key, "private_key": self.private_key}
+                )
+            if response.status_code != 200:
+                raise EpaycoGatewayError(f"ePayco login answered {response.status_code}", not_processed=True)
+
+            try:
+                bearer_token = response.json()["bearer_token"]
+            except (ValueError, KeyError, TypeError):
+                bearer_token = None
+            if not bearer_token or not isinstance(bearer_token, str):
+                raise EpaycoGatewayError("ePayco login answered without a bearer token", not_processed=True)
+
+            self._bearer_token = bearer_token
+            self._bearer_token_expires_at = time.monotonic() + self.BEARER_TOKEN_TTL_SECONDS
+            return self._bearer_token
+
 
-            pay = self.objepayco.charge.create(payment_info)
-            # print("Pay created with epayco", pay)
-            return pay
-        except Exception as e:
-            print(f"Error processing charge: {e}")
-            return {}
+epayco_client = AsyncEpaycoClient()
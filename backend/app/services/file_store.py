@@ -0,0 +1,104 @@
+import os
+import re
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config.environment import STORED_FILE_ORPHAN_TTL_HOURS, STORED_FILE_SWEEP_INTERVAL_SECONDS
+from app.crud.stored_files import claim_stored_file_async, delete_orphaned_stored_files_async, touch_stored_file_async
+from app.db.session import AsyncSessionLocal
+from app.models.stored_file import StoredFile
+from app.services.job_worker import job_worker
+from app.services.storage import copy_object, delete_objects, keys_modified_before
+
+
+# Stored files live under their content hash; uploads are written to a staging key first,
+# since the hash is only known once the last byte has arrived
+CONTENT_PREFIX = "files/"
+STAGING_PREFIX = "uploads/"
+
+ORPHAN_BATCH_SIZE = 100
+
+SHA256_PATTERN = re.compile(r"[0-9a-f]{64}")
+_EXTENSION_PATTERN = re.compile(r"\.[a-z0-9]{1,10}")
+
+
+def _extension(filename: Optional[str]) -> str:
+    extension = os.path.splitext(filename or "")[1].lower()
+    return extension if _EXTENSION_PATTERN.fullmatch(extension) else ""
+
+
+def content_key(sha256: str, filename: Optional[str] = None) -> str:
+    """The key of a file in the bucket: its SHA-256, keeping the extension of the uploaded name"""
+    return f"{CONTENT_PREFIX}{sha256}{_extension(filename)}"
+
+
+def staging_key(filename: Optional[str] = None) -> str:
+    return f"{STAGING_PREFIX}{uuid.uuid4()}{_extension(filename)}"
+
+
+async def find_stored_file(session: AsyncSession, sha256: str) -> Optional[StoredFile]:
+    """The stored file with this content, if any; finding it keeps it from being swept for a while"""
+    return await touch_stored_file_async(session, sha256)
+
+
+async def save_upload(
+    session: AsyncSession,
+    staged_key: str,
+    sha256: str,
+    size: int,
+    filename: Optional[str],
+    content_type: Optional[str]
+) -> Tuple[StoredFile, bool]:
+    """
+    Move a finished upload from its staging key to its content key and record it.
+    Returns the stored file and whether the content was already stored, in which
+    case the upload is dropped and the existing copy is used.
+    """
+    try:
+        stored_file = await touch_stored_file_async(session, sha256)
+        if stored_file is not None:
+            return stored_file, True
+
+        key = content_key(sha256, filename)
+        await copy_object(staged_key, key)
+        stored_file, created = await claim_stored_file_async(session, sha256, key, size, content_type)
+        if not created and stored_file.key != key:
+            # The same content was stored under another extension while this one was copied
+            await delete_objects([key])
+        return stored_file, not created
+    finally:
+        try:
+            await delete_objects([staged_key])
+        except Exception as e:
+            # Left for the sweep
+            print(f"Error deleting staged upload {staged_key}: {e}")
+
+
+async def sweep_orphaned_files() -> None:
+    """Delete stored files no book has referenced for a while, and uploads that never finished"""
+    unused_since = datetime.utcnow() - timedelta(hours=STORED_FILE_ORPHAN_TTL_HOURS)
+
+    removed = 0
+    while True:
+        async with AsyncSessionLocal() as session:
+            keys = await delete_orphaned_stored_files_async(session, unused_since, limit=ORPHAN_BATCH_SIZE)
+            if keys:
+                # Objects go first: the rows stay locked until they are gone
+                await delete_objects(keys)
+            await session.commit()
+        removed += len(keys)
+        if len(keys) < ORPHAN_BATCH_SIZE:
+            break
+
+    staged = await keys_modified_before(STAGING_PREFIX, unused_since)
+    if staged:
+        await delete_objects(staged)
+
+    if removed or staged:
+        print(f"Removed {removed} unused stored files and {len(staged)} abandoned uploads")
+
+
+job_worker.every(STORED_FILE_SWEEP_INTERVAL_SECONDS, sweep_orphaned_files)
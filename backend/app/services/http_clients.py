@@ -0,0 +1,192 @@
+import threading
+import time
+from typing import Dict, Optional
+
+import httpx
+
+from app.config.environment import (
+    HTTP_CLIENT_CONNECT_TIMEOUT_SECONDS,
+    HTTP_CLIENT_HTTP2,
+    HTTP_CLIENT_KEEPALIVE_EXPIRY_SECONDS,
+    HTTP_CLIENT_MAX_CONNECTIONS,
+    HTTP_CLIENT_MAX_KEEPALIVE,
+    HTTP_CLIENT_POOL_TIMEOUT_SECONDS,
+    HTTP_CLIENT_RETRIES,
+    HTTP_CLIENT_TIMEOUT_SECONDS,
+)
+
+
+# Upper bounds (seconds) of the outbound call latency histogram buckets
+LATENCY_BUCKETS = [0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0]
+
+
+class LatencyMetrics:
+    """Remote call counts and latency histograms per name (an upstream or an endpoint)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.endpoints: Dict[str, Dict] = {}
+        self.counters: Dict[str, int] = {}
+
+    def observe_call(self, endpoint: str, seconds: float, failed: bool = False) -> None:
+        """Record one HTTP request, including retries and logins"""
+        with self._lock:
+            stats = self.endpoints.get(endpoint)
+            if stats is None:
+                stats = self.endpoints[endpoint] = {
+                    "calls": 0,
+                    "failures": 0,
+                    "latency_sum": 0.0,
+                    "bucket_counts": [0] * (len(LATENCY_BUCKETS) + 1)
+                }
+            index = len(LATENCY_BUCKETS)
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    index = i
+                    break
+            stats["bucket_counts"][index] += 1
+            stats["calls"] += 1
+            stats["latency_sum"] += seconds
+            if failed:
+                stats["failures"] += 1
+
+    def increment(self, counter: str) -> None:
+        with self._lock:
+            self.counters[counter] = self.counters.get(counter, 0) + 1
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            endpoints = {}
+            for endpoint, stats in self.endpoints.items():
+                cumulative = 0
+                buckets = []
+                for bound, count in zip(LATENCY_BUCKETS + ["+Inf"], stats["bucket_counts"]):
+                    cumulative += count
+                    buckets.append({"le": bound, "count": cumulative})
+                endpoints[endpoint] = {
+                    "calls": stats["calls"],
+                    "failures": stats["failures"],
+                    "latency_seconds": {
+                        "sum": round(stats["latency_sum"], 6),
+                        "buckets": buckets
+                    }
+                }
+            return {"endpoints": endpoints, "counters": dict(self.counters)}
+
+
+class MeteredTransport(httpx.AsyncBaseTransport):
+    """Transport wrapper that records every request it sends under the upstream's name"""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, upstream: str, metrics: LatencyMetrics):
+        self._transport = transport
+        self.upstream = upstream
+        self.metrics = metrics
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        start = time.perf_counter()
+        try:
+            response = await self._transport.handle_async_request(request)
+        except Exception:
+            self.metrics.observe_call(self.upstream, time.perf_counter() - start, failed=True)
+            raise
+        # Time to the response headers; the body is read by the caller
+        self.metrics.observe_call(self.upstream, time.perf_counter() - start, failed=response.status_code >= 500)
+        return response
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+class HttpClientRegistry:
+    """
+    Application-lifetime httpx clients, one keep-alive pool per upstream service
+
+    Integrations register their upstream once at import time with its own limits and
+    timeouts, and get the same client on every call instead of opening a new one,
+    so connections (and their TLS sessions) are reused across requests. Clients
+    speak HTTP/2 where the server offers it, retry failed connection attempts, and
+    record call counts and latency per upstream in metrics.
+    """
+
+    def __init__(self):
+        self._settings: Dict[str, Dict] = {}
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self.metrics = LatencyMetrics()
+
+    def register(
+        self,
+        name: str,
+        base_url: str = "",
+        timeout: float = HTTP_CLIENT_TIMEOUT_SECONDS,
+        connect_timeout: float = HTTP_CLIENT_CONNECT_TIMEOUT_SECONDS,
+        pool_timeout: float = HTTP_CLIENT_POOL_TIMEOUT_SECONDS,
+        max_connections: int = HTTP_CLIENT_MAX_CONNECTIONS,
+        max_keepalive: int = HTTP_CLIENT_MAX_KEEPALIVE,
+        retries: int = HTTP_CLIENT_RETRIES,
+        http2: bool = HTTP_CLIENT_HTTP2,
+        headers: Optional[Dict[str, str]] = None
+    ) -> None:
+        """
+        Declare an upstream. retries only covers failed connection attempts,
+        which never reached the server, so it is safe for any method.
+        """
+        self._settings[name] = {
+            "base_url": base_url,
+            "timeout": httpx.Timeout(timeout, connect=connect_timeout, pool=pool_timeout),
+            "limits": httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=min(max_keepalive, max_connections),
+                keepalive_expiry=HTTP_CLIENT_KEEPALIVE_EXPIRY_SECONDS
+            ),
+            "retries": retries,
+            "http2": http2,
+            "headers": headers or {},
+        }
+
+    def get(self, name: str) -> httpx.AsyncClient:
+        """The pooled client of an upstream, created on first use if start() did not run"""
+        client = self._clients.get(name)
+        if client is None or client.is_closed:
+            client = self._clients[name] = self._create(name)
+        return client
+
+    async def start(self) -> None:
+        """Create every registered client; called from the application lifespan"""
+        for name in self._settings:
+            self.get(name)
+
+    async def aclose(self) -> None:
+        """Close every pool; a later get() opens a new one"""
+        clients, self._clients = self._clients, {}
+        for client in clients.values():
+            await client.aclose()
+
+    def snapshot(self) -> Dict:
+        upstreams = self.metrics.snapshot()["endpoints"]
+        return {
+            name: {
+                "base_url": settings["base_url"],
+                "open": name in self._clients and not self._clients[name].is_closed,
+                "max_connections": settings["limits"].max_connections,
+                "http2": settings["http2"],
+                **upstreams.get(name, {"calls": 0, "failures": 0}),
+            }
+            for name, settings in self._settings.items()
+        }
+
+    def _create(self, name: str) -> httpx.AsyncClient:
+        settings = self._settings[name]
+        transport = httpx.AsyncHTTPTransport(
+            http2=settings["http2"],
+            limits=settings["limits"],
+            retries=settings["retries"]
+        )
+        return httpx.AsyncClient(
+            base_url=settings["base_url"],
+            timeout=settings["timeout"],
+            headers=settings["headers"],
+            transport=MeteredTransport(transport, name, self.metrics)
+        )
+
+
+http_clients = HttpClientRegistry()
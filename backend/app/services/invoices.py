@@ -0,0 +1,132 @@
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import contains_eager
+
+from app.config.environment import INVOICE_CACHE_MAX_SIZE, INVOICE_CACHE_TTL_SECONDS, INVOICE_RENDER_WORKERS
+from app.models.book import Book
+from app.models.order import Order
+from app.models.order_item import OrderItem
+from app.models.payment import Payment
+from app.models.user import User
+from app.utils.cache import TTLCache
+from app.utils.pdf import text_to_pdf
+from app.utils.templates import render_template
+
+
+INVOICE_FORMATS = {
+    "html": "text/html; charset=utf-8",
+    "pdf": "application/pdf",
+}
+
+# Rendered invoices keyed by (order id, payment id, format); a completed payment never changes
+rendered_invoices = TTLCache(maxsize=INVOICE_CACHE_MAX_SIZE, ttl=INVOICE_CACHE_TTL_SECONDS)
+
+_executor: Optional[Executor] = None
+
+
+def invoice_template_data(order, payment, user, order_items) -> dict:
+    """
+    Build the context of templates/invoice.html; only plain JSON types,
+    so it can be stored in the payload of a queued email
+    """
+    # Calculate subtotal
+    subtotal = sum(float(item.price) * item.quantity for item in order_items)
+    
+    # Format payment method
+    payment_method = "Credit card"
+    card_info = None
+    if payment.card_brand and payment.card_last_four:
+        card_info = f"{payment.card_brand} ending in {payment.card_last_four}"
+    
+    # Determine status class for styling
+    status_class = "completed" if order.status.lower() == "completed" else "pending"
+    if order.status.lower() in ["failed", "rejected", "canceled"]:
+        status_class = "failed"
+    
+    # Format date
+    order_date = order.created_at.strftime("%B %d, %Y at %I:%M %p")
+    
+    return {
+        "order_id": str(order.id),
+        "order_number": str(order.id)[:8].upper(),
+        "order_date": order_date,
+        "order_status": order.status.upper(),
+        "status_class": status_class,
+        "customer_name": user.name,
+        "customer_email": user.email,
+        "transaction_id": payment.epayco_transaction_id,
+        "approval_code": payment.epayco_approval_code,
+        "items": [
+            {
+                "book_title": item.book.title,
+                "book_author": item.book.author,
+                "quantity": item.quantity,
+                "price": float(item.price)
+            } for item in order_items
+        ],
+        "subtotal": subtotal,
+        "total_amount": float(order.total_amount),
+        "payment_method": payment_method,
+        "card_info": card_info,
+        "current_year": datetime.now().year
+    }
+
+
+def render_invoice_html(context: dict) -> bytes:
+    return render_template("invoice.html", context).encode("utf-8")
+
+
+def render_invoice_pdf(context: dict) -> bytes:
+    return text_to_pdf(render_template("invoice.txt", context), title=f"Invoice #{context['order_number']}")
+
+
+_RENDERERS = {
+    "html": render_invoice_html,
+    "pdf": render_invoice_pdf,
+}
+
+
+def _get_executor() -> Optional[Executor]:
+    global _executor
+    if _executor is None and INVOICE_RENDER_WORKERS > 0:
+        _executor = ProcessPoolExecutor(max_workers=INVOICE_RENDER_WORKERS)
+    return _executor
+
+
+async def render_invoice(context: dict, fmt: str = "html") -> bytes:
+    """Render an invoice from invoice_template_data() in the render pool, off the event loop"""
+    renderer = _RENDERERS[fmt]
+    executor = _get_executor()
+    if executor is None:
+        return await asyncio.to_thread(renderer, context)
+    return await asyncio.get_running_loop().run_in_executor(executor, renderer, context)
+
+
+async def get_invoice(session: AsyncSession, order: Order, payment: Payment, user: User, fmt: str = "html") -> bytes:
+    """Return the rendered invoice of a paid order; items are only loaded on a cache miss"""
+    key = (str(order.id), str(payment.id), fmt)
+    content = rendered_invoices.get(key)
+    if content is None:
+        items_result = await session.execute(
+            select(OrderItem)
+            .join(Book, OrderItem.book_id == Book.id)
+            .options(contains_eager(OrderItem.book))
+            .where(OrderItem.order_id == order.id)
+        )
+        order_items = items_result.scalars().all()
+        content = await render_invoice(invoice_template_data(order, payment, user, order_items), fmt)
+        rendered_invoices.set(key, content)
+    return content
+
+
+def shutdown_render_pool() -> None:
+    """Stop the render processes"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
@@ -0,0 +1,161 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.config.environment import JOB_BATCH_SIZE, JOB_LOCK_TIMEOUT_SECONDS, JOB_POLL_INTERVAL_SECONDS
+from app.crud.jobs import claim_jobs_async, complete_job_async, retry_or_fail_job_async
+from app.db.session import AsyncSessionLocal
+from app.models.job import Job
+
+
+JobHandler = Callable[[Job], Awaitable[None]]
+
+
+class JobWorker:
+    """
+    Runs the jobs of the registered queues as a task on the application's event loop
+
+    Jobs live in the jobs table, so they survive restarts and several processes can
+    work the same queues: each claim uses SELECT ... FOR UPDATE SKIP LOCKED. A handler
+    that raises is retried with backoff until the job runs out of attempts, at which
+    point the queue's on_failure callback gets a chance to clean up. The private_fields
+    of a queue are removed from the stored payload once its job is done or given up.
+    """
+
+    def __init__(
+        self,
+        poll_interval: float = 2.0,
+        batch_size: int = 10,
+        lock_timeout: int = 300
+    ):
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.lock_timeout = lock_timeout
+        self._handlers: Dict[str, Tuple[JobHandler, Optional[JobHandler], float, Sequence[str]]] = {}
+        self._periodic: List[Tuple[float, Callable[[], Awaitable[None]]]] = []
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def register(
+        self,
+        queue: str,
+        handler: JobHandler,
+        on_failure: Optional[JobHandler] = None,
+        backoff: float = 5.0,
+        private_fields: Sequence[str] = ()
+    ) -> None:
+        """
+        Run handler for every job of queue; on_failure runs when a job is given up.
+        private_fields are payload keys only needed while the job may still run.
+        """
+        self._handlers[queue] = (handler, on_failure, backoff, tuple(private_fields))
+
+    def every(self, seconds: float, task: Callable[[], Awaitable[None]]) -> None:
+        """Run task periodically while the worker is running"""
+        self._periodic.append((seconds, task))
+
+    def notify(self) -> None:
+        """Wake the worker now instead of at the next poll; safe to call from any thread"""
+        if self._loop is None or self._wakeup is None:
+            return
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        if running_loop is self._loop:
+            self._wakeup.set()
+        else:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def start(self) -> None:
+        """Start polling; must be called from the running event loop"""
+        if self._tasks:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._tasks.append(asyncio.create_task(self._poll()))
+        for seconds, task in self._periodic:
+            self._tasks.append(asyncio.create_task(self._repeat(seconds, task)))
+
+    async def stop(self) -> None:
+        """Stop polling; jobs being run are left to be claimed again after the lock timeout"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._loop = None
+        self._wakeup = None
+
+    async def run_pending(self) -> int:
+        """Claim and run one batch of ready jobs per queue, returning how many ran"""
+        ran = 0
+        for queue, (handler, on_failure, backoff, private_fields) in self._handlers.items():
+            async with AsyncSessionLocal() as session:
+                jobs = await claim_jobs_async(session, queue, self.batch_size, self.lock_timeout)
+            if jobs:
+                await asyncio.gather(*(
+                    self._run(job, handler, on_failure, backoff, private_fields) for job in jobs
+                ))
+                ran += len(jobs)
+        return ran
+
+    async def _run(
+        self,
+        job: Job,
+        handler: JobHandler,
+        on_failure: Optional[JobHandler],
+        backoff: float,
+        private_fields: Sequence[str] = ()
+    ) -> None:
+        # What is kept of the payload once the job is finished
+        final_payload = None
+        if private_fields:
+            final_payload = {key: value for key, value in job.payload.items() if key not in private_fields}
+
+        try:
+            await handler(job)
+        except Exception as e:
+            print(f"Job {job.id} on queue {job.queue} failed (attempt {job.attempts}): {e!r}")
+            job.last_error = repr(e)
+            async with AsyncSessionLocal() as session:
+                given_up = await retry_or_fail_job_async(session, job, job.last_error, backoff, final_payload)
+            if given_up and on_failure is not None:
+                try:
+                    await on_failure(job)
+                except Exception as failure_error:
+                    print(f"Error handling failed job {job.id}: {failure_error!r}")
+            return
+
+        async with AsyncSessionLocal() as session:
+            await complete_job_async(session, job.id, final_payload)
+
+    async def _poll(self) -> None:
+        while True:
+            try:
+                ran = await self.run_pending()
+            except Exception as e:
+                print(f"Error polling jobs: {e!r}")
+                ran = 0
+            if ran:
+                # There may be more ready jobs; look again right away
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def _repeat(self, seconds: float, task: Callable[[], Awaitable[None]]) -> None:
+        while True:
+            await asyncio.sleep(seconds)
+            try:
+                await task()
+            except Exception as e:
+                print(f"Error in periodic task {getattr(task, '__name__', task)}: {e!r}")
+
+
+job_worker = JobWorker(
+    poll_interval=JOB_POLL_INTERVAL_SECONDS,
+    batch_size=JOB_BATCH_SIZE,
+    lock_timeout=JOB_LOCK_TIMEOUT_SECONDS
+)
@@ -0,0 +1,302 @@
+from datetime import datetime, timedelta
+from typing import Optional
+import uuid
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from app.config.environment import (
+    EPAYCO_CONFIRMATION_URL,
+    PAYMENT_RECONCILE_INTERVAL_SECONDS,
+    PAYMENT_RECONCILE_MIN_AGE_SECONDS,
+    PAYMENT_UNCONFIRMED_DEADLINE_SECONDS,
+)
+from app.crud.epayco_customers import delete_epayco_customer_async, save_epayco_customer_async
+from app.crud.payments import get_payment_by_id_async, update_payment_status_async
+from app.crud.purchase_stats import record_completed_order_async
+from app.db.session import AsyncSessionLocal
+from app.models.book import Book
+from app.models.job import Job
+from app.models.order import Order
+from app.models.order_item import OrderItem
+from app.models.payment import Payment
+from app.models.user import User
+from app.services.email_queue import enqueue_invoice_email_async
+from app.services.epayco import EPAYCO_STATUS_BY_CODE, epayco_client
+from app.services.job_worker import job_worker
+from app.utils.response_cache import response_cache
+
+
+PAYMENTS_QUEUE = "payments"
+
+# Card token and customer details of a charge job, removed from the jobs table once it is finished
+PAYMENT_JOB_PRIVATE_FIELDS = (
+    "token_card", "card_fingerprint", "identification", "phone", "city", "address", "client_ip"
+)
+
+# Statuses that ePayco may still change, revisited by reconcile_pending_payments
+PENDING_STATUSES = ("pending", "started")
+
+
+def check_payment_settings() -> None:
+    """Refuse to process queued charges that could never learn their final outcome"""
+    if not EPAYCO_CONFIRMATION_URL:
+        raise RuntimeError(
+            "EPAYCO_CONFIRMATION_URL must be set when the job worker processes payments: "
+            "charges that get no answer are only settled by the ePayco confirmation"
+        )
+
+
+async def settle_payment(
+    session: AsyncSession,
+    payment_id: uuid.UUID,
+    status: str,
+    epayco_data: Optional[dict] = None
+) -> Optional[Payment]:
+    """
+    Apply a gateway outcome to a payment and its order in one transaction.
+    A purchase is counted in the ranking stats and its invoice is sent only
+    the first time the order becomes completed.
+    """
+    payment = await get_payment_by_id_async(session, payment_id)
+    if not payment:
+        return None
+
+    order = await session.get(Order, payment.order_id)
+    newly_completed = status == "completed" and order.status != "completed"
+    order.status = status
+    if newly_completed:
+        await record_completed_order_async(session, order.id)
+
+    # Commits the order status and purchase stats together with the payment
+    payment = await update_payment_status_async(session, payment_id, status, epayco_data)
+
+    if newly_completed:
+        response_cache.invalidate("rankings")
+        await queue_invoice(session, order, payment)
+    return payment
+
+
+async def queue_invoice(session: AsyncSession, order: Order, payment: Payment) -> None:
+    """Queue the invoice email of a completed order; failures are logged and ignored"""
+    try:
+        items_result = await session.execute(
+            select(OrderItem)
+            .join(Book, OrderItem.book_id == Book.id)
+            .options(selectinload(OrderItem.book))
+            .where(OrderItem.order_id == order.id)
+        )
+        user = await session.get(User, order.user_id)
+        await enqueue_invoice_email_async(session, order, payment, user, items_result.scalars().all())
+        await session.commit()
+        job_worker.notify()
+    except Exception as e:
+        print(f"Error queueing invoice email: {e}")
+
+
+def _epayco_data(data: dict) -> dict:
+    """Map the data of a charge answer to the fields stored on the payment"""
+    def as_text(key):
+        return str(data[key]) if data.get(key) is not None else None
+
+    return {
+        "transaction_id": as_text("ref_payco"),
+        "response_code": data.get("cod_respuesta"),
+        "response_message": as_text("respuesta"),
+        "approval_code": as_text("cod_autorizacion"),
+        "receipt": as_text("recibo"),
+    }
+
+
+async def process_charge_job(job: Job) -> None:
+    """
+    Run the gateway steps of a queued payment: customer, then charge
+
+    The payment is marked "charging" and committed before the charge request, so a
+    job re-run after a crash never charges twice; such a payment is left pending
+    for the confirmation webhook instead. The same goes for a charge that timed out
+    or got no answer: only an explicit answer from the gateway fails the payment.
+    """
+    payload = job.payload
+    payment_id = uuid.UUID(payload["payment_id"])
+
+    async with AsyncSessionLocal() as session:
+        payment = await get_payment_by_id_async(session, payment_id)
+        if not payment or payment.status not in ("queued", "charging"):
+            return
+        if payment.status == "charging":
+            await settle_payment(session, payment_id, "pending", {
+                "response_message": "Charge outcome unknown, waiting for the ePayco confirmation"
+            })
+            return
+
+        order = await session.get(Order, payment.order_id)
+        user = await session.get(User, order.user_id)
+
+        customer_id = payload.get("customer_id")
+        use_default_card = False
+
+        if customer_id is None and payload.get("saved_customer_id"):
+            # New card for a known customer: attach it instead of creating another customer
+            added = await epayco_client.add_customer_token(payload["saved_customer_id"], payload["token_card"])
+            if added.get("status"):
+                epayco_client.metrics.increment("saved_customer_reused")
+                customer_id = payload["saved_customer_id"]
+
+        if customer_id is None:
+            # Split user name into first and last name
+            user_name_parts = user.name.split(' ', 1)
+            client_epayco = await epayco_client.create_client({
+                "token_card": payload["token_card"],
+                "name": user_name_parts[0],
+                "last_name": user_name_parts[1] if len(user_name_parts) > 1 else "",
+                "email": user.email,
+                "phone": payload["phone"],
+                "default": True,
+                "city": payload["city"],
+                "address": payload["address"],
+                "cell_phone": payload["phone"]
+            })
+            if not client_epayco.get("status"):
+                # Nothing was charged yet, so the job can safely be retried
+                raise RuntimeError("Failed to create ePayco client")
+
+            epayco_client.metrics.increment("customers_created")
+            customer_id = client_epayco["data"]["customerId"]
+            use_default_card = True
+
+        if customer_id != payload.get("customer_id"):
+            await save_epayco_customer_async(
+                session, user.id, customer_id, payload["token_card"], payload["card_fingerprint"]
+            )
+
+        payment.status = "charging"
+        payment.updated_at = datetime.utcnow()
+        await session.commit()
+
+        payment_epayco = await epayco_client.charge(
+            token_card=payload["token_card"],
+            customer_id=customer_id,
+            client={
+                "identification": payload["identification"],
+                "full_name": user.name,
+                "email": user.email,
+            },
+            amount=str(order.total_amount),
+            bill=order.id,
+            client_ip=payload["client_ip"],
+            use_default_card=use_default_card
+        )
+
+        if payment_epayco.get("status") and payment_epayco.get("success"):
+            data = payment_epayco["data"]
+            status = EPAYCO_STATUS_BY_CODE.get(data.get("cod_respuesta"), "pending")
+            await settle_payment(session, payment_id, status, _epayco_data(data))
+        elif not payment_epayco:
+            # No answer: the charge may have gone through, so keep the customer and wait
+            await settle_payment(session, payment_id, "pending", {
+                "response_message": "Charge outcome unknown, waiting for the ePayco confirmation"
+            })
+        else:
+            # The saved card token may be what failed; tokenize again on the next attempt
+            await delete_epayco_customer_async(session, user.id)
+            await settle_payment(session, payment_id, "failed", {
+                "response_message": str(payment_epayco.get("data", {}).get("respuesta", "Payment failed"))
+            })
+
+
+async def fail_charge_job(job: Job) -> None:
+    """Mark the payment of a charge job that ran out of attempts as failed"""
+    async with AsyncSessionLocal() as session:
+        payment = await get_payment_by_id_async(session, uuid.UUID(job.payload["payment_id"]))
+        if payment and payment.status == "queued":
+            await settle_payment(session, payment.id, "failed", {"response_message": job.last_error})
+
+
+async def reconcile_pending_payments(limit: int = 50) -> int:
+    """
+    Ask ePayco for the outcome of payments left pending, returning how many changed
+
+    Each payment is checked in its own transaction under FOR UPDATE SKIP LOCKED,
+    so concurrent pollers and the confirmation webhook never work the same row.
+    """
+    changed = 0
+    cutoff = datetime.utcnow() - timedelta(seconds=PAYMENT_RECONCILE_MIN_AGE_SECONDS)
+
+    for _ in range(limit):
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                select(Payment).where(
+                    Payment.status.in_(PENDING_STATUSES),
+                    Payment.epayco_transaction_id.is_not(None),
+                    Payment.updated_at < cutoff
+                ).order_by(Payment.updated_at).limit(1).with_for_update(skip_locked=True)
+            )
+            payment = result.scalars().first()
+            if not payment:
+                break
+
+            transaction = await epayco_client.get_transaction(payment.epayco_transaction_id)
+            data = transaction.get("data") or {}
+            status = EPAYCO_STATUS_BY_CODE.get(_as_int(data.get("x_cod_response")))
+
+            if status and status != payment.status:
+                await settle_payment(session, payment.id, status, {
+                    "response_code": _as_int(data.get("x_cod_response")),
+                    "response_message": data.get("x_response"),
+                    "approval_code": data.get("x_approval_code"),
+                })
+                changed += 1
+            else:
+                # Still pending: look at the others before checking this one again
+                payment.updated_at = datetime.utcnow()
+                await session.commit()
+
+    return changed
+
+
+async def expire_unconfirmed_payments(limit: int = 50) -> int:
+    """
+    Fail payments left pending or charging without an ePayco reference, returning how many
+
+    Without a reference they cannot be looked up, so once PAYMENT_UNCONFIRMED_DEADLINE_SECONDS
+    pass with no confirmation the order is released to be paid again. A confirmation that
+    still arrives later finds the payment by its invoice and settles it as usual.
+    """
+    expired = 0
+    cutoff = datetime.utcnow() - timedelta(seconds=PAYMENT_UNCONFIRMED_DEADLINE_SECONDS)
+
+    for _ in range(limit):
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                select(Payment).where(
+                    Payment.status.in_(("charging", *PENDING_STATUSES)),
+                    Payment.epayco_transaction_id.is_(None),
+                    Payment.updated_at < cutoff
+                ).order_by(Payment.updated_at).limit(1).with_for_update(skip_locked=True)
+            )
+            payment = result.scalars().first()
+            if not payment:
+                break
+
+            await settle_payment(session, payment.id, "failed", {
+                "response_message": "No confirmation from ePayco"
+            })
+            expired += 1
+
+    return expired
+
+
+def _as_int(value) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+job_worker.register(
+    PAYMENTS_QUEUE, process_charge_job, on_failure=fail_charge_job, private_fields=PAYMENT_JOB_PRIVATE_FIELDS
+)
+job_worker.every(PAYMENT_RECONCILE_INTERVAL_SECONDS, reconcile_pending_payments)
+job_worker.every(PAYMENT_RECONCILE_INTERVAL_SECONDS, expire_unconfirmed_payments)
@@ -0,0 +1,122 @@
+import threading
+import uuid
+from datetime import datetime
+from typing import Dict, Optional
+
+from sqlalchemy import DateTime, cast, column, or_, update, values
+from sqlalchemy.dialects.postgresql import UUID
+
+from app.config.environment import SESSION_ACTIVITY_FLUSH_SECONDS, SESSION_ACTIVITY_MAX_PENDING
+from app.db.session import SessionLocal
+from app.models.user_session import UserSession
+
+
+class SessionActivityTracker:
+    """
+    Collects UserSession.last_activity timestamps in memory and writes them in bulk
+
+    Authenticated requests only record the activity; a background thread flushes
+    the pending timestamps every ``flush_interval`` seconds with a single
+    ``UPDATE ... FROM (VALUES ...)`` statement, so ``last_activity`` in the
+    database is at most ``flush_interval`` seconds stale.
+    """
+
+    BATCH_SIZE = 1000
+
+    def __init__(self, flush_interval: float = 10.0, max_pending: int = 5000):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending: Dict[uuid.UUID, datetime] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def touch(self, session_id: uuid.UUID) -> None:
+        """Record activity for a session, to be written on the next flush"""
+        with self._lock:
+            self._pending[session_id] = datetime.utcnow()
+            pending_count = len(self._pending)
+
+        # Flush early instead of letting the buffer grow without bound
+        if pending_count >= self.max_pending:
+            self._wake.set()
+
+    def flush(self) -> int:
+        """Write all pending timestamps to the database, returning the row count"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+
+        if not pending:
+            return 0
+
+        rows = list(pending.items())
+        db = SessionLocal()
+        try:
+            for start in range(0, len(rows), self.BATCH_SIZE):
+                activity = values(
+                    column("id", UUID(as_uuid=True)),
+                    column("last_activity", DateTime),
+                    name="activity"
+                ).data(rows[start:start + self.BATCH_SIZE])
+
+                db.execute(
+                    update(UserSession)
+                    .where(UserSession.id == cast(activity.c.id, UUID(as_uuid=True)))
+                    .where(or_(
+                        UserSession.last_activity.is_(None),
+                        UserSession.last_activity < cast(activity.c.last_activity, DateTime)
+                    ))
+                    .values(last_activity=cast(activity.c.last_activity, DateTime))
+                    .execution_options(synchronize_session=False)
+                )
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"Error flushing session activity: {e}")
+            # Put the timestamps back unless a newer one was recorded meanwhile
+            with self._lock:
+                for session_id, last_activity in pending.items():
+                    if session_id not in self._pending:
+                        self._pending[session_id] = last_activity
+            return 0
+        finally:
+            db.close()
+
+        return len(rows)
+
+    def start(self) -> None:
+        """Start the background flusher thread"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run,
+            name="session-activity-flusher",
+            daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the flusher thread and write whatever is still pending"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_interval + 5)
+            self._thread = None
+        self.flush()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            self.flush()
+
+
+activity_tracker = SessionActivityTracker(
+    flush_interval=SESSION_ACTIVITY_FLUSH_SECONDS,
+    max_pending=SESSION_ACTIVITY_MAX_PENDING
+)
@@ -0,0 +1,139 @@
+import asyncio
+import time
+from email.message import EmailMessage
+from typing import List, Optional, Tuple
+
+import aiosmtplib
+
+from app.config.environment import (
+    MAIL_CONNECTION_MAX_IDLE_SECONDS,
+    MAIL_PASSWORD,
+    MAIL_POOL_SIZE,
+    MAIL_PORT,
+    MAIL_SERVER,
+    MAIL_SSL_TLS,
+    MAIL_STARTTLS,
+    MAIL_TIMEOUT_SECONDS,
+    MAIL_USERNAME,
+)
+
+
+class SmtpPool:
+    """
+    Long-lived SMTP connections shared by every message the process sends
+
+    A connection pays the TCP, STARTTLS and AUTH handshakes once and is then reused
+    for as many messages as arrive while it is open. Connections idle for longer than
+    max_idle are closed instead of reused, since servers drop them after a while.
+    """
+
+    def __init__(
+        self,
+        hostname: str,
+        port: int,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        start_tls: bool = True,
+        use_tls: bool = False,
+        timeout: float = 30,
+        size: int = 2,
+        max_idle: float = 60
+    ):
+        self.hostname = hostname
+        self.port = port
+        self.username = username or None
+        self.password = password or None
+        self.start_tls = start_tls
+        self.use_tls = use_tls
+        self.timeout = timeout
+        self.size = size
+        self.max_idle = max_idle
+        self._idle: List[Tuple[aiosmtplib.SMTP, float]] = []
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.connections_opened = 0
+        self.messages_sent = 0
+
+    async def send(self, message: EmailMessage) -> None:
+        """Send one message over a pooled connection; raises on SMTP errors"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.size)
+
+        async with self._semaphore:
+            smtp = await self._acquire()
+            try:
+                try:
+                    await smtp.send_message(message)
+                except aiosmtplib.SMTPServerDisconnected:
+                    # The server closed a pooled connection; retry once on a fresh one
+                    await self._close(smtp)
+                    smtp = await self._connect()
+                    await smtp.send_message(message)
+            except (aiosmtplib.SMTPRecipientsRefused, aiosmtplib.SMTPSenderRefused, aiosmtplib.SMTPDataError):
+                # Rejected message, but the session is still usable
+                self._release(smtp)
+                raise
+            except BaseException:
+                await self._close(smtp)
+                raise
+            self.messages_sent += 1
+            self._release(smtp)
+
+    async def aclose(self) -> None:
+        """Close every idle connection"""
+        idle, self._idle = self._idle, []
+        for smtp, _ in idle:
+            await self._close(smtp)
+
+    def snapshot(self) -> dict:
+        return {
+            "idle_connections": len(self._idle),
+            "connections_opened": self.connections_opened,
+            "messages_sent": self.messages_sent,
+        }
+
+    async def _acquire(self) -> aiosmtplib.SMTP:
+        now = time.monotonic()
+        while self._idle:
+            smtp, released_at = self._idle.pop()
+            if now - released_at < self.max_idle and smtp.is_connected:
+                return smtp
+            await self._close(smtp)
+        return await self._connect()
+
+    def _release(self, smtp: aiosmtplib.SMTP) -> None:
+        if smtp.is_connected:
+            self._idle.append((smtp, time.monotonic()))
+
+    async def _connect(self) -> aiosmtplib.SMTP:
+        smtp = aiosmtplib.SMTP(
+            hostname=self.hostname,
+            port=self.port,
+            username=self.username,
+            password=self.password,
+            use_tls=self.use_tls,
+            start_tls=self.start_tls,
+            timeout=self.timeout
+        )
+        await smtp.connect()
+        self.connections_opened += 1
+        return smtp
+
+    async def _close(self, smtp: aiosmtplib.SMTP) -> None:
+        try:
+            if smtp.is_connected:
+                await smtp.quit()
+        except Exception:
+            smtp.close()
+
+
+smtp_pool = SmtpPool(
+    hostname=MAIL_SERVER,
+    port=MAIL_PORT,
+    username=MAIL_USERNAME,
+    password=MAIL_PASSWORD,
+    start_tls=MAIL_STARTTLS,
+    use_tls=MAIL_SSL_TLS,
+    timeout=MAIL_TIMEOUT_SECONDS,
+    size=MAIL_POOL_SIZE,
+    max_idle=MAIL_CONNECTION_MAX_IDLE_SECONDS
+)
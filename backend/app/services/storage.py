@@ -0,0 +1,363 @@
+import asyncio
+import base64
+import hashlib
+import unicodedata
+from datetime import datetime, timezone
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Set
+from urllib.parse import quote, unquote, urlparse
+
+import boto3
+from botocore.config import Config
+from botocore.exceptions import BotoCoreError, ClientError
+
+from app.config.environment import (
+    AWS_REGION,
+    S3_BUCKET_NAME,
+    S3_DOWNLOAD_CHUNK_SIZE_KB,
+    S3_ENDPOINT_URL,
+    S3_LIBRARY_URL_EXPIRES_SECONDS,
+    S3_MULTIPART_CONCURRENCY,
+    S3_MULTIPART_PART_SIZE_MB,
+    S3_SIGNED_URL_CACHE_MAX_SIZE,
+    S3_SIGNED_URL_REFRESH_MARGIN_SECONDS,
+)
+from app.utils.cache import TTLCache
+
+
+MIN_PART_SIZE = 5 * 1024 * 1024  # S3 rejects smaller parts, except the last one
+
+_s3_client = None
+
+# Signed GET URLs keyed by (bucket, key, expires_in, filename); each entry is dropped
+# S3_SIGNED_URL_REFRESH_MARGIN_SECONDS before the URL itself expires
+signed_urls = TTLCache(maxsize=S3_SIGNED_URL_CACHE_MAX_SIZE, ttl=S3_LIBRARY_URL_EXPIRES_SECONDS)
+
+
+def get_s3_client():
+    """The process-wide S3 client; boto3 clients are thread-safe and keep a connection pool"""
+    global _s3_client
+    if _s3_client is None:
+        _s3_client = boto3.client(
+            "s3",
+            region_name=AWS_REGION,
+            endpoint_url=S3_ENDPOINT_URL or None,
+            config=Config(
+                max_pool_connections=max(10, S3_MULTIPART_CONCURRENCY * 4),
+                retries={"max_attempts": 3, "mode": "standard"},
+                # Presigned URLs must use SigV4, the only version every region accepts
+                signature_version="s3v4"
+            )
+        )
+    return _s3_client
+
+
+def _md5_base64(data: bytes) -> str:
+    return base64.b64encode(hashlib.md5(data, usedforsecurity=False).digest()).decode("ascii")
+
+
+def _put_with_md5(method, data: bytes, **params) -> dict:
+    """Call an S3 upload method with the Content-MD5 of its body; runs in a worker thread"""
+    return method(Body=data, ContentMD5=_md5_base64(data), **params)
+
+
+class StreamingUpload:
+    """
+    Writes a stream of chunks to one S3 object with constant memory
+
+    Data is cut into parts of part_size that go out as an S3 multipart upload, with up
+    to concurrency parts in flight while the next one is being read. An upload smaller
+    than one part is sent with a single PutObject instead. The SHA-256 of the whole
+    object is computed on the way through, and every part carries its MD5 so S3 rejects
+    anything corrupted in transit.
+    """
+
+    def __init__(
+        self,
+        key: str,
+        content_type: Optional[str] = None,
+        bucket: str = S3_BUCKET_NAME,
+        part_size: int = S3_MULTIPART_PART_SIZE_MB * 1024 * 1024,
+        concurrency: int = S3_MULTIPART_CONCURRENCY
+    ):
+        self.key = key
+        self.bucket = bucket
+        self.content_type = content_type or "application/octet-stream"
+        self.part_size = max(part_size, MIN_PART_SIZE)
+        self.concurrency = max(concurrency, 1)
+        self.size = 0
+        self._sha256 = hashlib.sha256()
+        self._buffer = bytearray()
+        self._upload_id: Optional[str] = None
+        self._parts: List[dict] = []
+        self._part_count = 0
+        self._in_flight: Set[asyncio.Task] = set()
+
+    async def write(self, data: bytes) -> None:
+        """Add data to the object, sending every part that fills up"""
+        self._sha256.update(data)
+        self.size += len(data)
+        self._buffer += data
+        while len(self._buffer) >= self.part_size:
+            part = bytes(self._buffer[:self.part_size])
+            del self._buffer[:self.part_size]
+            await self._send_part(part)
+
+    async def complete(self) -> dict:
+        """Send what is left and finish the object, returning its key, size and SHA-256"""
+        s3 = get_s3_client()
+        if self._upload_id is None:
+            await asyncio.to_thread(
+                _put_with_md5,
+                s3.put_object,
+                bytes(self._buffer),
+                Bucket=self.bucket,
+                Key=self.key,
+                ContentType=self.content_type
+            )
+        else:
+            if self._buffer:
+                await self._send_part(bytes(self._buffer))
+            await self._wait_for_parts(0)
+            await asyncio.to_thread(
+                s3.complete_multipart_upload,
+                Bucket=self.bucket,
+                Key=self.key,
+                UploadId=self._upload_id,
+                MultipartUpload={"Parts": sorted(self._parts, key=lambda part: part["PartNumber"])}
+            )
+        self._buffer = bytearray()
+        return {
+            "key": self.key,
+            "bucket": self.bucket,
+            "size": self.size,
+            "sha256": self._sha256.hexdigest(),
+        }
+
+    async def abort(self) -> None:
+        """Stop the upload and drop the parts S3 already has"""
+        for task in self._in_flight:
+            task.cancel()
+        await asyncio.gather(*self._in_flight, return_exceptions=True)
+        self._in_flight = set()
+        if self._upload_id is not None:
+            try:
+                await asyncio.to_thread(
+                    get_s3_client().abort_multipart_upload,
+                    Bucket=self.bucket,
+                    Key=self.key,
+                    UploadId=self._upload_id
+                )
+            except Exception as e:
+                print(f"Error aborting multipart upload of {self.key}: {e}")
+
+    async def _send_part(self, data: bytes) -> None:
+        s3 = get_s3_client()
+        if self._upload_id is None:
+            response = await asyncio.to_thread(
+                s3.create_multipart_upload,
+                Bucket=self.bucket,
+                Key=self.key,
+                ContentType=self.content_type
+            )
+            self._upload_id = response["UploadId"]
+
+        # Bound the memory in use: wait for a free slot before queueing another part
+        await self._wait_for_parts(self.concurrency - 1)
+        self._part_count += 1
+        self._in_flight.add(asyncio.create_task(self._upload_part(self._part_count, data)))
+
+    async def _upload_part(self, part_number: int, data: bytes) -> None:
+        response = await asyncio.to_thread(
+            _put_with_md5,
+            get_s3_client().upload_part,
+            data,
+            Bucket=self.bucket,
+            Key=self.key,
+            UploadId=self._upload_id,
+            PartNumber=part_number
+        )
+        self._parts.append({"PartNumber": part_number, "ETag": response["ETag"]})
+
+    async def _wait_for_parts(self, max_in_flight: int) -> None:
+        while len(self._in_flight) > max_in_flight:
+            done, self._in_flight = await asyncio.wait(self._in_flight, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                # Raises the error of a failed part
+                task.result()
+
+
+def key_from_file_url(file_url: Optional[str], bucket: str = S3_BUCKET_NAME) -> Optional[str]:
+    """
+    Get the object key behind a stored file URL, which may be a (possibly expired)
+    presigned URL in virtual-hosted or path style, or an s3:// path.
+    Returns None for URLs that are not in the bucket.
+    """
+    if not file_url:
+        return None
+    url = urlparse(file_url)
+    path = unquote(url.path).lstrip("/")
+    if url.scheme == "s3":
+        return (path or None) if url.netloc == bucket else None
+    if url.netloc.split(".")[0] == bucket and ".s3" in url.netloc:
+        return path or None
+    if path.startswith(f"{bucket}/"):
+        return path[len(bucket) + 1:] or None
+    return None
+
+
+def presigned_download_url(key: str, expires_in: int, filename: Optional[str] = None, bucket: str = S3_BUCKET_NAME) -> str:
+    """Sign a GET URL for an object; signing is local and makes no request to S3"""
+    params = {"Bucket": bucket, "Key": key}
+    if filename:
+        params["ResponseContentDisposition"] = content_disposition(filename)
+    return get_s3_client().generate_presigned_url("get_object", Params=params, ExpiresIn=expires_in)
+
+
+def signed_download_url(key: str, expires_in: int, filename: Optional[str] = None, bucket: str = S3_BUCKET_NAME) -> str:
+    """
+    A presigned GET URL for an object, reused while it stays valid for at least the
+    refresh margin, so repeated requests for the same file get the same URL
+    """
+    cache_key = (bucket, key, expires_in, filename)
+    url = signed_urls.get(cache_key)
+    if url is None:
+        url = presigned_download_url(key, expires_in, filename=filename, bucket=bucket)
+        margin = min(S3_SIGNED_URL_REFRESH_MARGIN_SECONDS, expires_in / 2)
+        signed_urls.set(cache_key, url, ttl=expires_in - margin)
+    return url
+
+
+def signed_download_urls(keys: Iterable[str], expires_in: int, bucket: str = S3_BUCKET_NAME) -> Dict[str, str]:
+    """Sign a batch of keys at once, e.g. every book of a listing; returns key -> URL"""
+    return {key: signed_download_url(key, expires_in, bucket=bucket) for key in dict.fromkeys(keys)}
+
+
+def signed_file_urls(
+    file_urls: Iterable[Optional[str]],
+    expires_in: int = S3_LIBRARY_URL_EXPIRES_SECONDS,
+    bucket: str = S3_BUCKET_NAME
+) -> Dict[str, str]:
+    """
+    Map stored file URLs (which may have expired) to freshly signed ones.
+    URLs that do not point into the bucket, or that cannot be signed, are mapped to themselves.
+    """
+    keys = {}
+    for file_url in file_urls:
+        if file_url and file_url not in keys:
+            keys[file_url] = key_from_file_url(file_url, bucket)
+    try:
+        urls = signed_download_urls([key for key in keys.values() if key], expires_in, bucket)
+    except BotoCoreError as e:
+        # No credentials to sign with (e.g. local development): keep the stored URLs
+        print(f"Error signing file URLs: {e}")
+        return {file_url: file_url for file_url in keys}
+    return {file_url: urls[key] if key else file_url for file_url, key in keys.items()}
+
+
+def safe_filename(filename: str, default: str = "download") -> str:
+    """
+    A file name fit for a header: control characters (CR/LF included) and path
+    separators become spaces, invisible ones such as bidi overrides are dropped,
+    and leading dots are removed
+    """
+    cleaned = "".join(
+        " " if char in "/\\" or unicodedata.category(char) == "Cc"
+        else "" if unicodedata.category(char).startswith("C")
+        else char
+        for char in filename
+    )
+    return " ".join(cleaned.split()).lstrip(". ") or default
+
+
+def content_disposition(filename: str, disposition: str = "attachment") -> str:
+    filename = safe_filename(filename)
+    ascii_name = filename.encode("ascii", errors="ignore").decode().replace('"', "").strip() or "download"
+    return f"{disposition}; filename=\"{ascii_name}\"; filename*=UTF-8''{quote(filename)}"
+
+
+async def head_object(key: str, bucket: str = S3_BUCKET_NAME) -> Optional[dict]:
+    """Size, ETag, type and modification date of an object, or None if it does not exist"""
+    try:
+        return await asyncio.to_thread(get_s3_client().head_object, Bucket=bucket, Key=key)
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+            return None
+        raise
+
+
+async def iter_object(
+    key: str,
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+    chunk_size: int = S3_DOWNLOAD_CHUNK_SIZE_KB * 1024,
+    bucket: str = S3_BUCKET_NAME
+) -> AsyncIterator[bytes]:
+    """Yield an object, or the inclusive byte range start-end of it, in chunks of chunk_size"""
+    params = {"Bucket": bucket, "Key": key}
+    if start is not None:
+        params["Range"] = f"bytes={start}-{end if end is not None else ''}"
+    response = await asyncio.to_thread(get_s3_client().get_object, **params)
+    body = response["Body"]
+    try:
+        while True:
+            chunk = await asyncio.to_thread(body.read, chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        body.close()
+
+
+async def put_object(
+    key: str,
+    data: bytes,
+    content_type: Optional[str] = None,
+    cache_control: Optional[str] = None,
+    bucket: str = S3_BUCKET_NAME
+) -> None:
+    """Write a small object in one request, with the MD5 of its content"""
+    params = {"Bucket": bucket, "Key": key}
+    if content_type:
+        params["ContentType"] = content_type
+    if cache_control:
+        params["CacheControl"] = cache_control
+    await asyncio.to_thread(_put_with_md5, get_s3_client().put_object, data, **params)
+
+
+async def copy_object(source_key: str, key: str, bucket: str = S3_BUCKET_NAME) -> None:
+    """Copy an object inside the bucket on the S3 side; large objects are copied in parts"""
+    await asyncio.to_thread(
+        get_s3_client().copy,
+        {"Bucket": bucket, "Key": source_key},
+        bucket,
+        key
+    )
+
+
+async def delete_objects(keys: Iterable[str], bucket: str = S3_BUCKET_NAME) -> None:
+    """Delete objects in batches of up to 1000, the most one request accepts"""
+    keys = list(keys)
+    s3 = get_s3_client()
+    for start in range(0, len(keys), 1000):
+        batch = keys[start:start + 1000]
+        response = await asyncio.to_thread(
+            s3.delete_objects,
+            Bucket=bucket,
+            Delete={"Objects": [{"Key": key} for key in batch], "Quiet": True}
+        )
+        if response.get("Errors"):
+            raise RuntimeError(f"Could not delete {len(response['Errors'])} objects: {response['Errors'][0]}")
+
+
+async def keys_modified_before(prefix: str, before: datetime, bucket: str = S3_BUCKET_NAME) -> List[str]:
+    """Keys under prefix whose objects were last written before the given UTC time"""
+    def list_keys() -> List[str]:
+        keys = []
+        paginator = get_s3_client().get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+            for item in page.get("Contents", []):
+                if item["LastModified"].astimezone(timezone.utc).replace(tzinfo=None) < before:
+                    keys.append(item["Key"])
+        return keys
+
+    return await asyncio.to_thread(list_keys)
@@ -0,0 +1,54 @@
+from email.utils import parsedate_to_datetime
+from typing import Optional, Tuple
+
+
+class RangeNotSatisfiable(Exception):
+    """The Range header asks for bytes outside the resource"""
+
+
+def parse_range_header(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single-range Range header into an inclusive (start, end) pair.
+    Returns None when the whole resource should be sent: no header, a unit other than
+    bytes, a malformed value or several ranges, which a server may ignore (RFC 9110 14.2).
+    """
+    if not header or not header.startswith("bytes="):
+        return None
+    spec = header[len("bytes="):].strip()
+    if "," in spec or "-" not in spec:
+        return None
+
+    first, last = (part.strip() for part in spec.split("-", 1))
+    try:
+        if first == "":
+            # Suffix range: the last N bytes
+            length = int(last)
+            if length <= 0 or size == 0:
+                # An empty resource has no last bytes to send (RFC 9110 14.1.3)
+                raise RangeNotSatisfiable(header)
+            return max(size - length, 0), size - 1
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        return None
+
+    if start >= size:
+        raise RangeNotSatisfiable(header)
+    if start > end:
+        return None
+    return start, min(end, size - 1)
+
+
+def if_range_matches(if_range: Optional[str], etag: Optional[str], last_modified) -> bool:
+    """Whether a Range request may be honoured given its If-Range validator (RFC 9110 13.1.5)"""
+    if not if_range:
+        return True
+    if if_range.startswith('"'):
+        # Strong comparison; a weak validator never matches
+        return etag is not None and if_range == etag and not etag.startswith("W/")
+    if if_range.startswith("W/"):
+        return False
+    try:
+        return last_modified is not None and parsedate_to_datetime(if_range) == last_modified.replace(microsecond=0)
+    except (TypeError, ValueError):
+        return False
@@ -0,0 +1,82 @@
+from typing import List, Optional
+
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+
+class MultipartFileReader:
+    """
+    Incremental multipart/form-data parser that hands over the bytes of one file field
+    as they arrive, so an upload never has to be held in memory or spooled to disk
+
+    Feed it the request body chunk by chunk; each call returns the file data found in
+    that chunk. filename and content_type are set once the part's headers are parsed.
+    """
+
+    def __init__(self, content_type_header: str, field_name: str = "file"):
+        content_type, params = parse_options_header(content_type_header)
+        if content_type != b"multipart/form-data" or not params.get(b"boundary"):
+            raise ValueError("Expected a multipart/form-data body with a boundary")
+
+        self.field_name = field_name
+        self.found = False
+        self.filename: Optional[str] = None
+        self.content_type: Optional[str] = None
+        self._headers = {}
+        self._header_field = b""
+        self._header_value = b""
+        self._reading_file = False
+        self._done = False
+        self._chunks: List[bytes] = []
+        self._parser = MultipartParser(params[b"boundary"], callbacks={
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+        })
+
+    def feed(self, data: bytes) -> List[bytes]:
+        """Parse the next chunk of the body, returning the file data it contained"""
+        self._parser.write(data)
+        chunks, self._chunks = self._chunks, []
+        return chunks
+
+    def close(self) -> None:
+        """Check that the body ended where a multipart body should"""
+        self._parser.finalize()
+
+    def _on_part_begin(self) -> None:
+        self._headers = {}
+
+    def _on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def _on_header_end(self) -> None:
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = b""
+        self._header_value = b""
+
+    def _on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        if self._done or options.get(b"name", b"").decode("latin-1") != self.field_name:
+            return
+        self._reading_file = True
+        self.found = True
+        filename = options.get(b"filename")
+        self.filename = filename.decode("utf-8", errors="replace") if filename else None
+        content_type = self._headers.get(b"content-type")
+        self.content_type = content_type.decode("latin-1") if content_type else None
+
+    def _on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._reading_file:
+            self._chunks.append(data[start:end])
+
+    def _on_part_end(self) -> None:
+        if self._reading_file:
+            self._reading_file = False
+            self._done = True
@@ -0,0 +1,26 @@
+import base64
+import json
+import uuid
+from datetime import datetime
+from typing import Tuple
+
+
+def encode_cursor(created_at: datetime, item_id: uuid.UUID) -> str:
+    """Encode a (created_at, id) keyset position as an opaque URL-safe string"""
+    raw = json.dumps([created_at.isoformat(), str(item_id)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, uuid.UUID]:
+    """
+    Decode a cursor produced by encode_cursor
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, item_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(created_at), uuid.UUID(item_id)
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
@@ -0,0 +1,71 @@
+import textwrap
+from typing import List
+
+
+PAGE_WIDTH = 612  # US Letter, in points
+PAGE_HEIGHT = 792
+MARGIN = 50
+FONT_SIZE = 10
+LEADING = 13
+CHARS_PER_LINE = int((PAGE_WIDTH - 2 * MARGIN) / (FONT_SIZE * 0.6))  # Courier glyphs are 0.6 em wide
+LINES_PER_PAGE = int((PAGE_HEIGHT - 2 * MARGIN) / LEADING)
+
+
+def _escape(line: str) -> bytes:
+    encoded = line.encode("cp1252", errors="replace")
+    return encoded.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+def _wrap(text: str) -> List[str]:
+    lines = []
+    for line in text.expandtabs(4).splitlines():
+        indent = len(line) - len(line.lstrip(" "))
+        lines.extend(textwrap.wrap(
+            line,
+            CHARS_PER_LINE,
+            subsequent_indent=" " * (indent + 2),
+            drop_whitespace=False,
+            replace_whitespace=False
+        ) or [""])
+    return lines
+
+
+def text_to_pdf(text: str, title: str = "") -> bytes:
+    """
+    Lay out plain text as a PDF in a monospaced font, wrapping long lines and
+    starting new pages as needed. Only the standard Courier font is used, so the
+    document needs no embedded fonts and no third-party library.
+    """
+    lines = _wrap(text)
+    pages = [lines[i:i + LINES_PER_PAGE] for i in range(0, len(lines), LINES_PER_PAGE)] or [[]]
+
+    # Objects 1-4 are the catalog, page tree, font and info; each page adds a page and a content stream
+    objects = [b"", b"", b"<< /Type /Font /Subtype /Type1 /BaseFont /Courier /Encoding /WinAnsiEncoding >>"]
+    objects.append(b"<< /Title (" + _escape(title) + b") /Producer (Virtual Library) >>")
+    page_refs = []
+    for page in pages:
+        stream = b"BT /F1 %d Tf %d TL %d %d Td\n" % (FONT_SIZE, LEADING, MARGIN, PAGE_HEIGHT - MARGIN - FONT_SIZE)
+        stream += b"".join(b"(" + _escape(line) + b") Tj T*\n" for line in page)
+        stream += b"ET"
+        page_number = len(objects) + 1
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>"
+            % (PAGE_WIDTH, PAGE_HEIGHT, page_number + 1)
+        )
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        page_refs.append(b"%d 0 R" % page_number)
+
+    objects[0] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    objects[1] = b"<< /Type /Pages /Kids [" + b" ".join(page_refs) + b"] /Count %d >>" % len(pages)
+
+    output = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+
+    xref_offset = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    output += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    output += b"trailer\n<< /Size %d /Root 1 0 R /Info 4 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref_offset)
+    return bytes(output)
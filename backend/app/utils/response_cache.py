@@ -0,0 +1,168 @@
+import hashlib
+import threading
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from fastapi import Request, Response, status
+from pydantic import TypeAdapter
+
+from app.config.environment import (
+    RESPONSE_CACHE_MAX_SIZE,
+    RESPONSE_CACHE_REDIS_URL,
+    RESPONSE_CACHE_TTL_SECONDS,
+)
+from app.utils.cache import TTLCache
+
+
+class InMemoryCacheBackend:
+    """Process-local backend: an LRU of cached bodies plus plain generation counters"""
+
+    def __init__(self, maxsize: int = 2000):
+        self._entries = TTLCache(maxsize=maxsize)
+        self._counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._entries.get(key)
+
+    def set(self, key: str, value: bytes, ttl: int) -> None:
+        self._entries.set(key, value, ttl=ttl)
+
+    def get_counter(self, key: str) -> int:
+        with self._lock:
+            return self._counters.get(key, 0)
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+
+class RedisCacheBackend:
+    """
+    Backend shared by every worker, on top of a redis-py compatible client
+
+    Any object implementing get/set(ex=)/incr works, so a local stand-in such
+    as fakeredis can be passed instead of a real server.
+    """
+
+    def __init__(self, client=None, url: Optional[str] = None, prefix: str = "respcache:"):
+        if client is None:
+            import redis  # Optional dependency, only needed for this backend
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(self.prefix + key)
+
+    def set(self, key: str, value: bytes, ttl: int) -> None:
+        self.client.set(self.prefix + key, value, ex=ttl)
+
+    def get_counter(self, key: str) -> int:
+        value = self.client.get(self.prefix + key)
+        return int(value) if value else 0
+
+    def incr(self, key: str) -> int:
+        return self.client.incr(self.prefix + key)
+
+
+class ResponseCache:
+    """
+    Caches serialized JSON responses and answers conditional requests with 304
+
+    Entries belong to one or more namespaces (e.g. "catalog", "user:<id>").
+    Every namespace has a generation number that is part of the cache key, so
+    invalidating a namespace is a single counter increment; the orphaned entries
+    simply age out of the backend.
+    """
+
+    def __init__(self, backend, ttl: int = 300):
+        self.backend = backend
+        self.ttl = ttl
+        self._adapters: Dict[Any, TypeAdapter] = {}
+
+    def invalidate(self, *namespaces: str) -> None:
+        """Make every entry in the given namespaces stale"""
+        for namespace in namespaces:
+            self.backend.incr(f"gen:{namespace}")
+
+    def respond(
+        self,
+        request: Request,
+        key: str,
+        schema: Any,
+        build: Callable[[], Any],
+        namespaces: Iterable[str] = ("catalog",),
+        private: bool = False
+    ) -> Response:
+        """
+        Return the cached response for key, building and caching it on a miss
+
+        Args:
+            request: Incoming request, checked for If-None-Match
+            key: Cache key of this response within its namespaces
+            schema: Response model type used to serialize the data
+            build: Called on a miss to load the data; may raise HTTPException
+            namespaces: Namespaces whose invalidation must drop this entry
+            private: Whether the response is specific to the current user
+        """
+        generations = ":".join(
+            f"{namespace}@{self.backend.get_counter(f'gen:{namespace}')}"
+            for namespace in namespaces
+        )
+        cache_key = f"{generations}|{key}"
+
+        packed = self.backend.get(cache_key)
+        if packed is None:
+            adapter = self._adapter(schema)
+            body = adapter.dump_json(adapter.validate_python(build(), from_attributes=True))
+            etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+            packed = etag.encode("ascii") + b"\n" + body
+            self.backend.set(cache_key, packed, self.ttl)
+        else:
+            etag_bytes, body = packed.split(b"\n", 1)
+            etag = etag_bytes.decode("ascii")
+
+        headers = {
+            "ETag": etag,
+            # Clients may store the response but must revalidate it every time
+            "Cache-Control": ("private" if private else "public") + ", no-cache",
+        }
+        if private:
+            headers["Vary"] = "Authorization"
+
+        if _etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    def _adapter(self, schema: Any) -> TypeAdapter:
+        adapter = self._adapters.get(schema)
+        if adapter is None:
+            adapter = self._adapters[schema] = TypeAdapter(schema)
+        return adapter
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Evaluate an If-None-Match header against the current ETag"""
+    if not if_none_match:
+        return False
+
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def _create_backend():
+    if RESPONSE_CACHE_REDIS_URL:
+        return RedisCacheBackend(url=RESPONSE_CACHE_REDIS_URL)
+    return InMemoryCacheBackend(maxsize=RESPONSE_CACHE_MAX_SIZE)
+
+
+response_cache = ResponseCache(_create_backend(), ttl=RESPONSE_CACHE_TTL_SECONDS)
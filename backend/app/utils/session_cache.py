@@ -0,0 +1,124 @@
+import hashlib
+import threading
+import uuid
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from app.config.environment import TOKEN_CACHE_MAX_SIZE, TOKEN_CACHE_TTL_SECONDS
+from app.models.user import User
+from app.models.user_session import UserSession
+from app.utils.cache import TTLCache
+
+
+class CachedAuth(NamedTuple):
+    """Result of a successful token validation, detached from any DB session"""
+    user_data: dict
+    session_id: uuid.UUID
+    expires_at: datetime
+
+
+# Keyed by the SHA-256 of the access token so raw tokens are never kept in memory
+token_cache = TTLCache(maxsize=TOKEN_CACHE_MAX_SIZE, ttl=TOKEN_CACHE_TTL_SECONDS)
+
+# Bumped whenever a user row changes, so a validation that read the user before the
+# change does not cache the old snapshot after the change has been invalidated
+_user_changes = 0
+_user_changes_lock = threading.Lock()
+
+
+def hash_token(token: str) -> str:
+    """Return the cache key for an access token"""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def user_changes() -> int:
+    """Read before loading the user to validate a token; pass it to cache_validated_token"""
+    with _user_changes_lock:
+        return _user_changes
+
+
+def cache_validated_token(token: str, user: User, user_session: UserSession, changes: int) -> None:
+    """
+    Remember that token belongs to user and is backed by a valid session,
+    unless a user changed since changes was read
+    """
+    user_data = {
+        attr.key: getattr(user, attr.key)
+        for attr in inspect(User).column_attrs
+    }
+    cached = CachedAuth(
+        user_data=user_data,
+        session_id=user_session.id,
+        expires_at=user_session.expires_at
+    )
+    with _user_changes_lock:
+        if _user_changes == changes:
+            token_cache.set(hash_token(token), cached)
+
+
+def get_cached_auth(token: str) -> Optional[CachedAuth]:
+    """Return the cached validation result for token, if it is still usable"""
+    key = hash_token(token)
+    cached = token_cache.get(key)
+    if cached is None:
+        return None
+
+    if datetime.utcnow() > cached.expires_at:
+        token_cache.delete(key)
+        return None
+
+    return cached
+
+
+def load_cached_user(session: Session, cached: CachedAuth) -> User:
+    """
+    Rebuild the cached user without querying the database
+
+    The snapshot is merged into the request session so the returned object
+    behaves like one loaded by a query (relationships can still lazy-load).
+    """
+    user = User(**cached.user_data)
+    make_transient_to_detached(user)
+    return session.merge(user, load=False)
+
+
+def invalidate_token(token: str) -> None:
+    """Drop a single token from the cache"""
+    token_cache.delete(hash_token(token))
+
+
+def invalidate_user_tokens(user_id: uuid.UUID) -> int:
+    """
+    Drop every cached token of a user, e.g. after a role change or deactivation.
+    Changes made through the ORM call this on commit; call it after raw SQL updates.
+    """
+    global _user_changes
+    with _user_changes_lock:
+        _user_changes += 1
+        return token_cache.delete_where(lambda key, cached: cached.user_data.get("id") == user_id)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_users(session: Session, flush_context) -> None:
+    changed = session.info.setdefault("changed_user_ids", set())
+    for obj in session.dirty:
+        if isinstance(obj, User) and session.is_modified(obj, include_collections=False):
+            changed.add(obj.id)
+    for obj in session.deleted:
+        if isinstance(obj, User):
+            changed.add(obj.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_users(session: Session) -> None:
+    for user_id in session.info.pop("changed_user_ids", ()):
+        invalidate_user_tokens(user_id)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _forget_changed_users(session: Session, previous_transaction) -> None:
+    if not session.in_transaction():
+        session.info.pop("changed_user_ids", None)
@@ -0,0 +1,38 @@
+import os
+import tempfile
+from pathlib import Path
+
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, select_autoescape
+
+from app.config.environment import TEMPLATE_BYTECODE_CACHE_DIR
+
+
+TEMPLATE_FOLDER = Path(__file__).parent.parent / "templates"
+
+_bytecode_dir = TEMPLATE_BYTECODE_CACHE_DIR or os.path.join(tempfile.gettempdir(), "library-jinja-cache")
+os.makedirs(_bytecode_dir, exist_ok=True)
+
+# Compiled templates are kept by the environment, so each file is parsed only once per process;
+# the bytecode cache lets new processes (workers, render pool) skip compiling as well
+template_env = Environment(
+    loader=FileSystemLoader(TEMPLATE_FOLDER),
+    autoescape=select_autoescape(["html", "xml"]),
+    bytecode_cache=FileSystemBytecodeCache(_bytecode_dir),
+    auto_reload=False,
+    cache_size=-1,
+    trim_blocks=True,
+    lstrip_blocks=True
+)
+
+
+def preload_templates() -> int:
+    """Compile every template up front, returning how many were loaded"""
+    names = template_env.list_templates()
+    for name in names:
+        template_env.get_template(name)
+    return len(names)
+
+
+def render_template(name: str, context: dict) -> str:
+    """Render one of the templates in app/templates"""
+    return template_env.get_template(name).render(**context)
@@ -0,0 +1,107 @@
+"""
+Transfer size of catalog cover images, full-size originals against resized variants
+
+Against a running backend, downloads one catalog page (GET /api/books/?limit=N)
+the way the frontend cards do, once with every original cover and once with the
+variant closest to the card width, and prints the bytes of each:
+
+    python -m scripts.bench_covers --api http://127.0.0.1:8000 --limit 20 --width 320
+
+Books whose variants have not been rendered yet are left out. Without a backend,
+pass image files instead to render their variants in-process with the configured
+widths and qualities, timing each render:
+
+    python -m scripts.bench_covers cover1.jpg cover2.png
+"""
+import argparse
+import os
+import sys
+import time
+from typing import List, Optional
+
+import httpx
+
+# Run from backend/ as python -m scripts.bench_covers, or as a plain script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+FORMATS = ("webp", "jpeg")
+
+
+def kib(size: int) -> str:
+    return f"{size / 1024:.1f} KiB"
+
+
+def closest_variant(variants: List[dict], fmt: str, width: int) -> Optional[dict]:
+    candidates = [variant for variant in variants if variant["format"] == fmt]
+    return min(candidates, key=lambda variant: abs(variant["width"] - width), default=None)
+
+
+def bench_api(base_url: str, limit: int, width: int) -> None:
+    with httpx.Client(base_url=base_url, timeout=30, follow_redirects=True) as client:
+        response = client.get("/api/books/", params={"limit": limit})
+        response.raise_for_status()
+        books = [book for book in response.json() if book.get("cover_url") and book.get("cover_variants")]
+        if not books:
+            print("No book on the page has rendered cover variants")
+            return
+
+        totals = {"original": 0, **{fmt: 0 for fmt in FORMATS}}
+        print(f"{'book':<32} {'original':>12} " + " ".join(f"{f'{fmt} {width}px':>12}" for fmt in FORMATS))
+        for book in books:
+            # Covers may live on another host; httpx ignores base_url for absolute URLs
+            sizes = {"original": len(client.get(book["cover_url"]).content)}
+            for fmt in FORMATS:
+                variant = closest_variant(book["cover_variants"], fmt, width)
+                sizes[fmt] = len(client.get(variant["url"]).content) if variant else 0
+            for name, size in sizes.items():
+                totals[name] += size
+            print(f"{book['title'][:32]:<32} {kib(sizes['original']):>12} "
+                  + " ".join(f"{kib(sizes[fmt]):>12}" for fmt in FORMATS))
+
+    print(f"{f'{len(books)} cards':<32} {kib(totals['original']):>12} "
+          + " ".join(f"{kib(totals[fmt]):>12}" for fmt in FORMATS))
+    for fmt in FORMATS:
+        if totals[fmt]:
+            print(f"{fmt}: {totals['original'] / totals[fmt]:.1f}x smaller than the originals")
+
+
+def bench_files(paths: List[str]) -> None:
+    from app.config.environment import COVER_JPEG_QUALITY, COVER_MAX_PIXELS, COVER_VARIANT_WIDTHS, COVER_WEBP_QUALITY
+    from app.services.cover_images import CoverImageError, render_cover_variants
+
+    for path in paths:
+        with open(path, "rb") as file:
+            data = file.read()
+        start = time.perf_counter()
+        try:
+            variants = render_cover_variants(
+                data, COVER_VARIANT_WIDTHS, COVER_WEBP_QUALITY, COVER_JPEG_QUALITY, COVER_MAX_PIXELS
+            )
+        except CoverImageError as e:
+            print(f"{path}: {e}")
+            continue
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"{path}: original {kib(len(data))}, rendered in {elapsed:.0f} ms")
+        for width, height, fmt, content in variants:
+            print(f"  {width}x{height} {fmt:<5} {kib(len(content)):>12}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("files", nargs="*", help="cover images to render in-process instead of calling --api")
+    parser.add_argument("--api", metavar="URL", help="base URL of a running backend")
+    parser.add_argument("--limit", type=int, default=20, help="books on the catalog page (default 20)")
+    parser.add_argument("--width", type=int, default=320, help="width a catalog card displays (default 320)")
+    args = parser.parse_args()
+
+    if args.api:
+        bench_api(args.api, args.limit, args.width)
+    elif args.files:
+        bench_files(args.files)
+    else:
+        parser.error("pass --api or some image files")
+
+
+if __name__ == "__main__":
+    main()
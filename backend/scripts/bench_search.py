@@ -0,0 +1,162 @@
+"""
+Latency benchmark of the full-text book search (app.crud.books.search_books)
+
+Seeds a synthetic catalog and times search_books in-process, the way
+GET /api/books/search calls it. Use a throwaway, migrated database: seeding
+adds rows to books, and --clear removes them again.
+
+    DATABASE_URL=postgresql://postgres@localhost/bench python -m scripts.bench_search --seed 100000
+    DATABASE_URL=postgresql://postgres@localhost/bench python -m scripts.bench_search --seed 1000000 --runs 500
+    DATABASE_URL=postgresql://postgres@localhost/bench python -m scripts.bench_search --queries "magic|survival"
+    DATABASE_URL=postgresql://postgres@localhost/bench python -m scripts.bench_search --clear
+
+--seed N adds synthetic books until the catalog holds N of them. Titles, authors
+and descriptions combine a few word lists, so the default queries mix selective
+searches with single common words that match a tenth of the catalog or more;
+the latter are dominated by ranking every match. Pass --queries to time one kind.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+from sqlalchemy import text
+
+# Run from backend/ as python -m scripts.bench_search, or as a plain script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.crud.books import search_books  # noqa: E402
+from app.db.session import SessionLocal, engine  # noqa: E402
+
+
+# Marks the rows added by --seed so --clear only removes those
+SEED_MARKER = " [search benchmark]"
+
+DEFAULT_QUERIES = [
+    "dragon",
+    "magic kingdom",
+    '"silent river"',
+    "robots -war",
+    "garcia",
+    "secrets of the ocean",
+    "lost city legacy",
+    "winter fire",
+]
+
+SEED_SQL = text("""
+INSERT INTO books (id, title, author, description, price, stock, created_at)
+SELECT gen_random_uuid(),
+  (array['The','A','My','Last','First','Dark','Silent','Lost','Hidden','Broken'])[1 + g % 10] || ' ' ||
+  (array['River','Mountain','Garden','Empire','Kingdom','Ocean','Forest','City','Machine','Dragon',
+         'Winter','Summer','Shadow','Light','Storm'])[1 + (g / 10) % 15] || ' ' ||
+  (array['Chronicles','Secrets','Legacy','Song','Tale','Journey','Promise','Code','Heart','Fire'])[1 + (g / 150) % 10]
+  || ' ' || g,
+  (array['Ana','Luis','Maria','John','Sofia','Carlos','Emma','Diego','Laura','Pedro'])[1 + g % 10] || ' ' ||
+  (array['Garcia','Smith','Lopez','Brown','Martinez','Jones','Perez','Miller','Gomez','Davis'])[1 + (g / 7) % 10],
+  'A story about ' ||
+  (array['love','war','magic','science','history','friendship','betrayal','adventure','mystery','survival'])[1 + g % 10] ||
+  ' and ' ||
+  (array['dragons','robots','kings','pirates','detectives','wizards','soldiers','artists','children','gods'])[1 + (g / 3) % 10] ||
+  ' in a world of ' || md5(g::text) || :marker,
+  (g % 90) + 9.99, 10, now() - make_interval(secs => g)
+FROM generate_series(:first, :last) g
+""")
+
+SEED_BATCH_SIZE = 100_000
+
+
+def count_books() -> int:
+    with engine.connect() as connection:
+        return connection.execute(text("SELECT count(*) FROM books")).scalar_one()
+
+
+def seed(total: int) -> None:
+    """Add synthetic books until the catalog holds total of them"""
+    with engine.connect() as connection:
+        existing = connection.execute(text("SELECT count(*) FROM books")).scalar_one()
+        seeded = connection.execute(
+            text("SELECT count(*) FROM books WHERE description LIKE :pattern"),
+            {"pattern": f"%{SEED_MARKER}"}
+        ).scalar_one()
+    missing = total - existing
+    if missing <= 0:
+        print(f"The catalog already has {existing} books")
+        return
+
+    start = time.perf_counter()
+    # Number new rows after the seeded ones, so titles stay unique across runs
+    first = seeded + 1
+    while missing > 0:
+        batch = min(missing, SEED_BATCH_SIZE)
+        with engine.begin() as connection:
+            connection.execute(SEED_SQL, {"first": first, "last": first + batch - 1, "marker": SEED_MARKER})
+        first += batch
+        missing -= batch
+        print(f"  {total - missing}/{total} books")
+    with engine.begin() as connection:
+        connection.execute(text("ANALYZE books"))
+    print(f"Seeded {total - existing} books in {time.perf_counter() - start:.0f}s")
+
+
+def clear() -> None:
+    with engine.begin() as connection:
+        result = connection.execute(
+            text("DELETE FROM books WHERE description LIKE :pattern"),
+            {"pattern": f"%{SEED_MARKER}"}
+        )
+        connection.execute(text("ANALYZE books"))
+    print(f"Removed {result.rowcount} seeded books")
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    return sorted_values[min(int(len(sorted_values) * fraction), len(sorted_values) - 1)]
+
+
+def bench(queries: list, runs: int, limit: int) -> None:
+    session = SessionLocal()
+    try:
+        # Warm up the connection and the index pages
+        totals = {query: search_books(session, query, limit=limit)[1] for query in queries}
+
+        latencies = {query: [] for query in queries}
+        for index in range(runs):
+            query = queries[index % len(queries)]
+            start = time.perf_counter()
+            search_books(session, query, limit=limit)
+            latencies[query].append((time.perf_counter() - start) * 1000)
+    finally:
+        session.close()
+
+    print(f"{count_books()} books, {runs} searches, {limit} results per page")
+    print(f"{'query':<28} {'matches':>9} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}")
+    for query in queries:
+        values = sorted(latencies[query])
+        if values:
+            print(f"{query:<28} {totals[query]:>9} {statistics.median(values):>8.1f} "
+                  f"{percentile(values, 0.95):>8.1f} {values[-1]:>8.1f}")
+    values = sorted(value for query_values in latencies.values() for value in query_values)
+    print(f"{'all':<28} {'':>9} {statistics.median(values):>8.1f} "
+          f"{percentile(values, 0.95):>8.1f} {values[-1]:>8.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seed", type=int, metavar="N", help="add synthetic books until there are N")
+    parser.add_argument("--clear", action="store_true", help="remove the seeded books and exit")
+    parser.add_argument("--runs", type=int, default=200, help="number of timed searches (default 200)")
+    parser.add_argument("--limit", type=int, default=20, help="results per page (default 20)")
+    parser.add_argument("--queries", help="queries separated by |, in web-search syntax")
+    args = parser.parse_args()
+
+    if args.clear:
+        clear()
+        return
+    if args.seed:
+        seed(args.seed)
+    queries = args.queries.split("|") if args.queries else DEFAULT_QUERIES
+    bench(queries, max(args.runs, 1), args.limit)
+
+
+if __name__ == "__main__":
+    main()
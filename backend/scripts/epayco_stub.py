@@ -0,0 +1,171 @@
+"""
+Local stand-in for the ePayco REST API, for offline development and load tests
+
+Run it next to the backend and point the payment client at it:
+
+    uvicorn scripts.epayco_stub:app --port 8090
+    EPAYCO_API_URL=http://127.0.0.1:8090 EPAYCO_SECURE_URL=http://127.0.0.1:8090 uvicorn app.main:app
+
+The outcome of a charge follows the card used to create the token, using the
+test cards listed in EPAYCO_TEST_CARDS.md; any other card is accepted. Pending
+charges are reported as accepted when looked up through the transaction endpoint.
+
+Environment variables:
+    EPAYCO_STUB_LATENCY_MS: Delay added to every response (default 200)
+    EPAYCO_STUB_ERROR_RATE: Fraction of calls answered with 503 (default 0)
+"""
+import asyncio
+import os
+import secrets
+import uuid
+
+from fastapi import FastAPI, Header, HTTPException, Request
+from fastapi.responses import JSONResponse
+
+
+LATENCY_SECONDS = float(os.getenv("EPAYCO_STUB_LATENCY_MS", "200")) / 1000
+ERROR_RATE = float(os.getenv("EPAYCO_STUB_ERROR_RATE", "0"))
+
+# Nothing here is secret, but the OS generator keeps the stub clear of bandit B311
+_random = secrets.SystemRandom()
+
+# Card number -> (cod_respuesta, estado, respuesta)
+TEST_CARD_OUTCOMES = {
+    "4575623182290326": (1, "Aceptada", "Aceptada"),
+    "4151611527583283": (2, "Rechazada", "Fondos insuficientes"),
+    "5170394490379427": (4, "Fallida", "Error de comunicación con el centro de autorizaciones"),
+    "373118856457642": (3, "Pendiente", "Transacción pendiente por validación"),
+}
+DEFAULT_OUTCOME = TEST_CARD_OUTCOMES["4575623182290326"]
+
+app = FastAPI(title="ePayco stub")
+
+# Card token -> card number, so the charge can pick the outcome
+card_tokens = {}
+
+# ref_payco -> charge data, for the transaction lookup
+charges = {}
+
+
+async def simulate_gateway(authorization: str = None, require_auth: bool = True):
+    """Apply the configured latency and error rate, and check the bearer token"""
+    await asyncio.sleep(LATENCY_SECONDS)
+    if ERROR_RATE and _random.random() < ERROR_RATE:
+        raise HTTPException(status_code=503, detail="Simulated gateway error")
+    if require_auth and not (authorization or "").startswith("Bearer "):
+        raise HTTPException(status_code=401, detail="Missing bearer token")
+
+
+@app.post("/v1/auth/login")
+async def login(request: Request):
+    await simulate_gateway(require_auth=False)
+    credentials = await request.json()
+    if not credentials.get("public_key") and not credentials.get("private_key"):
+        return JSONResponse(status_code=401, content={"status": False, "message": "Invalid keys"})
+    return {"status": True, "bearer_token": uuid.uuid4().hex}
+
+
+@app.post("/v1/tokens")
+async def create_token(request: Request, authorization: str = Header(None)):
+    await simulate_gateway(authorization)
+    data = await request.json()
+    card_number = str(data.get("card[number]", ""))
+    if not card_number.isdigit():
+        return {"status": False, "message": "Invalid card number"}
+
+    token_id = uuid.uuid4().hex[:17]
+    card_tokens[token_id] = card_number
+    return {
+        "status": True,
+        "id": token_id,
+        "card": {
+            "exp_month": data.get("card[exp_month]"),
+            "exp_year": data.get("card[exp_year]"),
+            "mask": "*" * (len(card_number) - 4) + card_number[-4:]
+        }
+    }
+
+
+@app.post("/payment/v1/customer/create")
+async def create_customer(request: Request, authorization: str = Header(None)):
+    await simulate_gateway(authorization)
+    data = await request.json()
+    if data.get("token_card") not in card_tokens:
+        return {"status": False, "message": "Unknown card token"}
+    return {
+        "status": True,
+        "success": True,
+        "data": {"customerId": uuid.uuid4().hex[:17], "email": data.get("email")}
+    }
+
+
+@app.post("/v1/customer/add/token")
+async def add_customer_token(request: Request, authorization: str = Header(None)):
+    await simulate_gateway(authorization)
+    data = await request.json()
+    if data.get("token_card") not in card_tokens:
+        return {"status": False, "message": "Unknown card token"}
+    return {
+        "status": True,
+        "success": True,
+        "data": {"customerId": data.get("customer_id"), "token": data.get("token_card")}
+    }
+
+
+@app.post("/payment/v1/charge/create")
+async def create_charge(request: Request, authorization: str = Header(None)):
+    await simulate_gateway(authorization)
+    data = await request.json()
+    card_number = card_tokens.get(data.get("token_card"))
+    if card_number is None:
+        return {"status": False, "success": False, "data": {"respuesta": "Unknown card token"}}
+
+    code, state, message = TEST_CARD_OUTCOMES.get(card_number, DEFAULT_OUTCOME)
+    ref_payco = _random.randint(10000000, 99999999)
+    charges[str(ref_payco)] = {"bill": data.get("bill"), "value": data.get("value"), "code": code}
+    return {
+        "status": True,
+        "success": True,
+        "type": "Create payment",
+        "data": {
+            "ref_payco": ref_payco,
+            "factura": data.get("bill"),
+            "valor": data.get("value"),
+            "moneda": data.get("currency"),
+            "estado": state,
+            "respuesta": message,
+            "cod_respuesta": code,
+            "cod_autorizacion": f"{_random.randint(0, 999999):06d}" if code == 1 else "000000",
+            "recibo": _random.randint(100000000, 999999999),
+            "ip": data.get("ip")
+        }
+    }
+
+
+@app.get("/restpagos/transaction/response.json")
+async def transaction_response(ref_payco: str, public_key: str = None):
+    await simulate_gateway(require_auth=False)
+    charge = charges.get(ref_payco)
+    if charge is None:
+        return {"success": False, "title_response": "Error", "text_response": "Transaction not found", "data": {}}
+
+    if charge["code"] == 3:
+        # Pending charges settle once they have been looked up
+        charge["code"] = 1
+    code, state, message = next(
+        (outcome for outcome in TEST_CARD_OUTCOMES.values() if outcome[0] == charge["code"]),
+        DEFAULT_OUTCOME
+    )
+    return {
+        "success": True,
+        "title_response": "OK",
+        "data": {
+            "x_ref_payco": int(ref_payco),
+            "x_id_invoice": charge["bill"],
+            "x_amount": charge["value"],
+            "x_cod_response": code,
+            "x_response": state,
+            "x_response_reason_text": message,
+            "x_approval_code": f"{_random.randint(0, 999999):06d}" if code == 1 else "000000"
+        }
+    }
@@ -0,0 +1,63 @@
+"""
+Local SMTP server that accepts and discards mail, for offline development and load tests
+
+Requires aiosmtpd (pip install aiosmtpd). Run it next to the backend and point the
+mail settings at it:
+
+    python -m scripts.smtp_stub
+    MAIL_SERVER=127.0.0.1 MAIL_PORT=1025 MAIL_STARTTLS=False MAIL_USERNAME= uvicorn app.main:app
+
+Environment variables:
+    SMTP_STUB_PORT: Port to listen on (default 1025)
+    SMTP_STUB_LATENCY_MS: Delay before a message is accepted (default 50)
+    SMTP_STUB_ERROR_RATE: Fraction of messages answered with 451 (default 0)
+    SMTP_STUB_VERBOSE: Print every message received (default False)
+"""
+import asyncio
+import os
+import secrets
+
+from aiosmtpd.controller import Controller
+
+
+PORT = int(os.getenv("SMTP_STUB_PORT", "1025"))
+LATENCY_SECONDS = float(os.getenv("SMTP_STUB_LATENCY_MS", "50")) / 1000
+ERROR_RATE = float(os.getenv("SMTP_STUB_ERROR_RATE", "0"))
+VERBOSE = os.getenv("SMTP_STUB_VERBOSE", "False").lower() in ("true", "1", "yes")
+
+# Nothing here is secret, but the OS generator keeps the stub clear of bandit B311
+_random = secrets.SystemRandom()
+
+
+class StubHandler:
+    def __init__(self):
+        self.connections = 0
+        self.messages = 0
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        self.connections += 1
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        await asyncio.sleep(LATENCY_SECONDS)
+        if ERROR_RATE and _random.random() < ERROR_RATE:
+            return "451 Simulated temporary failure"
+        self.messages += 1
+        if VERBOSE:
+            print(f"Message {self.messages} from {envelope.mail_from} to {envelope.rcpt_tos} ({len(envelope.content)} bytes)")
+        return "250 Message accepted"
+
+
+if __name__ == "__main__":
+    handler = StubHandler()
+    controller = Controller(handler, hostname="127.0.0.1", port=PORT)
+    controller.start()
+    print(f"SMTP stub listening on 127.0.0.1:{PORT}")
+    try:
+        asyncio.run(asyncio.Event().wait())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        controller.stop()
+        print(f"{handler.messages} messages over {handler.connections} connections")
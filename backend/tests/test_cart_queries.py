@@ -0,0 +1,57 @@
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+from app.crud.cart import get_all_cart_items
+from app.db.session import engine
+from app.models.cart_item import CartItem
+
+
+@contextmanager
+def count_statements():
+    """Count the SQL statements sent through the sync engine"""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+
+def fill_cart(db_session, make_user, make_books, size):
+    """Put size books in the cart of a new user, returning its ID and the book titles"""
+    user_id = make_user().id
+    books = make_books(size)
+    titles = {book.title for book in books}
+    db_session.add_all(CartItem(user_id=user_id, book_id=book.id, quantity=2) for book in books)
+    db_session.commit()
+    # Start from an empty identity map, as a request does
+    db_session.expunge_all()
+    return user_id, titles
+
+
+@pytest.mark.parametrize("size", [1, 50, 500])
+def test_cart_listing_runs_one_query_whatever_the_cart_size(db_session, make_user, make_books, size):
+    user_id, expected_titles = fill_cart(db_session, make_user, make_books, size)
+
+    with count_statements() as statements:
+        items = get_all_cart_items(db_session, user_id)
+        # Reading the books must not trigger lazy loads
+        titles = {item["book"].title for item in items}
+
+    assert len(statements) == 1
+    assert len(items) == size
+    assert titles == expected_titles
+    assert all(item["quantity"] == 2 for item in items)
+
+
+def test_empty_cart(db_session, make_user):
+    user_id = make_user().id
+    with count_statements() as statements:
+        assert get_all_cart_items(db_session, user_id) == []
+    assert len(statements) == 1
@@ -0,0 +1,165 @@
+import os
+from datetime import datetime, timezone
+from email.utils import format_datetime
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.dependencies.deps import get_current_user
+from app.api.routes import books
+from app.config.environment import S3_BUCKET_NAME
+from app.db.session import async_engine
+from app.models.book import Book
+from app.services.storage import content_disposition, safe_filename
+from app.utils.http_range import RangeNotSatisfiable, if_range_matches, parse_range_header
+
+
+KEY = "files/0123456789abcdef.pdf"
+CONTENT = os.urandom(10_000)
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, None),
+    ("bytes=0-99", (0, 99)),
+    ("bytes=9900-", (9900, 9999)),
+    ("bytes=9000-20000", (9000, 9999)),
+    ("bytes=-500", (9500, 9999)),
+    ("bytes=-20000", (0, 9999)),
+    # Ignored: the whole file is sent
+    ("items=0-99", None),
+    ("bytes=0-9,20-29", None),
+    ("bytes=abc-", None),
+    ("bytes=50-10", None),
+])
+def test_parse_range_header(header, expected):
+    assert parse_range_header(header, 10_000) == expected
+
+
+@pytest.mark.parametrize("header, size", [
+    ("bytes=10000-", 10_000),
+    ("bytes=-0", 10_000),
+    ("bytes=-10", 0),
+    ("bytes=0-", 0),
+])
+def test_unsatisfiable_ranges(header, size):
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range_header(header, size)
+
+
+def test_if_range_matches():
+    modified = datetime(2024, 5, 1, 12, 30, 15, 250000, tzinfo=timezone.utc)
+    http_date = format_datetime(modified, usegmt=True)
+
+    assert if_range_matches(None, '"abc"', modified)
+    assert if_range_matches('"abc"', '"abc"', modified)
+    assert not if_range_matches('"abd"', '"abc"', modified)
+    assert not if_range_matches('W/"abc"', 'W/"abc"', modified)
+    assert if_range_matches(http_date, '"abc"', modified)
+    assert not if_range_matches("Wed, 01 May 2024 12:30:16 GMT", '"abc"', modified)
+    assert not if_range_matches("yesterday", '"abc"', modified)
+
+
+@pytest.mark.parametrize("filename, expected", [
+    ("Don Quijote.pdf", "Don Quijote.pdf"),
+    ("../../etc/passwd", "etc passwd"),
+    ("Title\r\nSet-Cookie: a=b.pdf", "Title Set-Cookie: a=b.pdf"),
+    ("evil‮fdp.exe", "evilfdp.exe"),
+    ("...", "download"),
+])
+def test_safe_filename(filename, expected):
+    assert safe_filename(filename) == expected
+
+
+def test_content_disposition_quotes_unicode_names():
+    assert content_disposition('Cien años "de" soledad.pdf') == (
+        "attachment; filename=\"Cien aos de soledad.pdf\"; "
+        "filename*=UTF-8''Cien%20a%C3%B1os%20%22de%22%20soledad.pdf"
+    )
+
+
+@pytest.fixture
+def client(s3, make_user, make_books):
+    """The books router with an admin signed in, who may download any book"""
+    s3.put_object(Bucket=S3_BUCKET_NAME, Key=KEY, Body=CONTENT, ContentType="application/pdf")
+    admin = make_user("admin")
+
+    app = FastAPI()
+    app.include_router(books.router, prefix="/api/books")
+    app.dependency_overrides[get_current_user] = lambda: admin
+    with TestClient(app) as client:
+        yield client
+        client.portal.call(async_engine.dispose)
+
+
+@pytest.fixture
+def download_url(make_books):
+    book = make_books(1, file_url=f"s3://{S3_BUCKET_NAME}/{KEY}")[0]
+    return f"/api/books/{book.id}/download"
+
+
+def test_whole_file(client, download_url):
+    response = client.get(download_url)
+
+    assert response.status_code == 200
+    assert response.content == CONTENT
+    assert response.headers["content-length"] == str(len(CONTENT))
+    assert response.headers["accept-ranges"] == "bytes"
+    assert response.headers["content-type"] == "application/pdf"
+    assert "etag" in response.headers
+
+
+def test_single_range(client, download_url):
+    response = client.get(download_url, headers={"Range": "bytes=100-199"})
+
+    assert response.status_code == 206
+    assert response.content == CONTENT[100:200]
+    assert response.headers["content-range"] == f"bytes 100-199/{len(CONTENT)}"
+    assert response.headers["content-length"] == "100"
+
+
+def test_suffix_range(client, download_url):
+    response = client.get(download_url, headers={"Range": "bytes=-256"})
+
+    assert response.status_code == 206
+    assert response.content == CONTENT[-256:]
+    assert response.headers["content-range"] == f"bytes {len(CONTENT) - 256}-{len(CONTENT) - 1}/{len(CONTENT)}"
+
+
+def test_unsatisfiable_range(client, download_url):
+    response = client.get(download_url, headers={"Range": f"bytes={len(CONTENT)}-"})
+
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(CONTENT)}"
+
+
+def test_if_range_match_sends_the_range(client, download_url):
+    etag = client.get(download_url).headers["etag"]
+
+    response = client.get(download_url, headers={"Range": "bytes=0-9", "If-Range": etag})
+
+    assert response.status_code == 206
+    assert response.content == CONTENT[:10]
+
+
+def test_if_range_mismatch_sends_the_whole_file(client, download_url):
+    response = client.get(download_url, headers={"Range": "bytes=0-9", "If-Range": '"an-older-version"'})
+
+    assert response.status_code == 200
+    assert response.content == CONTENT
+    assert "content-range" not in response.headers
+
+
+def test_content_disposition_is_sanitized(client, db_session, download_url):
+    book_id = download_url.split("/")[3]
+    db_session.get(Book, book_id).title = 'Evil\r\nSet-Cookie: session=1; "/../x'
+    db_session.commit()
+
+    response = client.get(download_url)
+
+    assert response.status_code == 200
+    disposition = response.headers["content-disposition"]
+    assert disposition == (
+        'attachment; filename="Evil Set-Cookie: session=1;  .. x.pdf"; '
+        "filename*=UTF-8''Evil%20Set-Cookie%3A%20session%3D1%3B%20%22%20..%20x.pdf"
+    )
@@ -0,0 +1,65 @@
+import uuid
+from datetime import datetime, timedelta
+
+from app.models.user import User
+from app.models.user_session import UserSession
+from app.utils.session_cache import cache_validated_token, get_cached_auth, user_changes
+
+
+def user_session_for(user: User) -> UserSession:
+    return UserSession(id=uuid.uuid4(), user_id=user.id, expires_at=datetime.utcnow() + timedelta(hours=1))
+
+
+def cache_token(user: User) -> str:
+    token = f"token-{uuid.uuid4().hex}"
+    cache_validated_token(token, user, user_session_for(user), user_changes())
+    return token
+
+
+def test_role_change_drops_the_cached_tokens(db_session, make_user):
+    user = make_user("admin")
+    other = make_user("customer")
+    token = cache_token(user)
+    other_token = cache_token(other)
+    assert get_cached_auth(token).user_data["role"] == "admin"
+
+    user.role = "customer"
+    db_session.commit()
+
+    assert get_cached_auth(token) is None
+    assert get_cached_auth(other_token) is not None
+
+
+def test_rolled_back_change_keeps_the_cached_tokens(db_session, make_user):
+    user = make_user("admin")
+    token = cache_token(user)
+
+    user.role = "customer"
+    db_session.flush()
+    db_session.rollback()
+
+    assert get_cached_auth(token).user_data["role"] == "admin"
+
+
+def test_unchanged_user_keeps_the_cached_tokens(db_session, make_user):
+    user = make_user()
+    token = cache_token(user)
+
+    db_session.add(user)
+    db_session.commit()
+
+    assert get_cached_auth(token) is not None
+
+
+def test_validation_racing_a_change_is_not_cached(db_session, make_user):
+    user = make_user("admin")
+    # A request reads the user, then the role changes before it caches the token
+    changes = user_changes()
+    stale = User(id=user.id, email=user.email, role="admin")
+    user.role = "customer"
+    db_session.commit()
+
+    token = f"token-{uuid.uuid4().hex}"
+    cache_validated_token(token, stale, user_session_for(user), changes)
+
+    assert get_cached_auth(token) is None
@@ -0,0 +1,170 @@
+import hashlib
+import os
+
+import pytest
+
+from app.config.environment import S3_BUCKET_NAME
+from app.db.session import AsyncSessionLocal
+from app.models.stored_file import StoredFile
+from app.services.file_store import CONTENT_PREFIX, STAGING_PREFIX, save_upload, staging_key
+from app.services.storage import MIN_PART_SIZE, StreamingUpload
+
+
+def chunks(data: bytes, size: int):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+async def stream(upload: StreamingUpload, data: bytes, chunk_size: int = 64 * 1024) -> dict:
+    for chunk in chunks(data, chunk_size):
+        await upload.write(chunk)
+    return await upload.complete()
+
+
+def object_body(s3, key: str) -> bytes:
+    return s3.get_object(Bucket=S3_BUCKET_NAME, Key=key)["Body"].read()
+
+
+def open_uploads(s3) -> list:
+    return s3.list_multipart_uploads(Bucket=S3_BUCKET_NAME).get("Uploads", [])
+
+
+def keys_under(s3, prefix: str) -> list:
+    response = s3.list_objects_v2(Bucket=S3_BUCKET_NAME, Prefix=prefix)
+    return [item["Key"] for item in response.get("Contents", [])]
+
+
+@pytest.fixture
+def stored_files():
+    """Content hashes whose stored_files rows are deleted after the test"""
+    from app.db.session import SessionLocal
+
+    hashes = []
+    yield hashes
+    if hashes:
+        with SessionLocal() as session:
+            session.query(StoredFile).filter(StoredFile.sha256.in_(hashes)).delete(synchronize_session=False)
+            session.commit()
+
+
+def test_large_upload_is_streamed_in_parts(s3, run):
+    # Two full parts and a short last one, written in chunks that do not line up with them
+    data = os.urandom(2 * MIN_PART_SIZE + 12345)
+    upload = StreamingUpload("tests/large.bin", content_type="application/pdf", part_size=MIN_PART_SIZE)
+
+    stored = run(stream(upload, data, chunk_size=100_000))
+
+    assert stored == {
+        "key": "tests/large.bin",
+        "bucket": S3_BUCKET_NAME,
+        "size": len(data),
+        "sha256": hashlib.sha256(data).hexdigest(),
+    }
+    head = s3.head_object(Bucket=S3_BUCKET_NAME, Key="tests/large.bin")
+    # Multipart ETags end in the number of parts
+    assert head["ETag"].strip('"').endswith("-3")
+    assert head["ContentType"] == "application/pdf"
+    assert object_body(s3, "tests/large.bin") == data
+    assert open_uploads(s3) == []
+
+
+def test_small_upload_is_sent_in_one_request(s3, run):
+    data = b"%PDF-1.4 small book"
+    upload = StreamingUpload("tests/small.pdf", part_size=MIN_PART_SIZE)
+
+    stored = run(stream(upload, data, chunk_size=4))
+
+    assert stored["size"] == len(data)
+    assert stored["sha256"] == hashlib.sha256(data).hexdigest()
+    head = s3.head_object(Bucket=S3_BUCKET_NAME, Key="tests/small.pdf")
+    assert "-" not in head["ETag"]
+    assert head["ContentType"] == "application/octet-stream"
+    assert object_body(s3, "tests/small.pdf") == data
+
+
+def test_empty_upload(s3, run):
+    stored = run(StreamingUpload("tests/empty.bin").complete())
+
+    assert stored["size"] == 0
+    assert stored["sha256"] == hashlib.sha256(b"").hexdigest()
+    assert object_body(s3, "tests/empty.bin") == b""
+
+
+def test_failed_part_aborts_the_upload(s3, run, monkeypatch):
+    upload_part = s3.upload_part
+
+    def failing_upload_part(**params):
+        if params["PartNumber"] == 2:
+            raise ConnectionError("connection reset")
+        return upload_part(**params)
+
+    monkeypatch.setattr(s3, "upload_part", failing_upload_part)
+    data = os.urandom(3 * MIN_PART_SIZE)
+    upload = StreamingUpload("tests/broken.bin", part_size=MIN_PART_SIZE, concurrency=1)
+
+    async def write_then_abort():
+        try:
+            await stream(upload, data, chunk_size=MIN_PART_SIZE // 2)
+        except ConnectionError:
+            await upload.abort()
+            raise
+
+    with pytest.raises(ConnectionError):
+        run(write_then_abort())
+
+    assert open_uploads(s3) == []
+    assert keys_under(s3, "tests/") == []
+
+
+def test_abort_drops_the_parts_already_sent(s3, run):
+    upload = StreamingUpload("tests/cancelled.bin", part_size=MIN_PART_SIZE)
+
+    async def write_then_abort():
+        await upload.write(os.urandom(MIN_PART_SIZE + 1))
+        await upload.abort()
+
+    run(write_then_abort())
+
+    assert open_uploads(s3) == []
+    assert keys_under(s3, "tests/") == []
+
+
+def test_same_content_is_stored_once(s3, run, stored_files):
+    data = os.urandom(1024)
+    sha256 = hashlib.sha256(data).hexdigest()
+    stored_files.append(sha256)
+
+    async def upload(filename: str):
+        stored = await stream(StreamingUpload(staging_key(filename), content_type="application/pdf"), data)
+        async with AsyncSessionLocal() as session:
+            return await save_upload(
+                session, stored["key"], stored["sha256"], stored["size"], filename, "application/pdf"
+            )
+
+    first, first_deduplicated = run(upload("book.pdf"))
+    second, second_deduplicated = run(upload("copy of book.pdf"))
+
+    assert not first_deduplicated
+    assert second_deduplicated
+    assert second.id == first.id
+    assert first.key == f"{CONTENT_PREFIX}{sha256}.pdf"
+    assert first.size == len(data)
+    assert keys_under(s3, CONTENT_PREFIX) == [first.key]
+    assert object_body(s3, first.key) == data
+    # Both staged uploads are gone
+    assert keys_under(s3, STAGING_PREFIX) == []
+
+
+def test_different_content_is_stored_separately(s3, run, stored_files):
+    async def upload(data: bytes):
+        stored_files.append(hashlib.sha256(data).hexdigest())
+        stored = await stream(StreamingUpload(staging_key("book.epub")), data)
+        async with AsyncSessionLocal() as session:
+            return await save_upload(session, stored["key"], stored["sha256"], stored["size"], "book.epub", None)
+
+    first, _ = run(upload(b"first edition"))
+    second, deduplicated = run(upload(b"second edition"))
+
+    assert not deduplicated
+    assert second.id != first.id
+    assert sorted(keys_under(s3, CONTENT_PREFIX)) == sorted([first.key, second.key])
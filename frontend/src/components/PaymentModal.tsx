@@ -74,7 +74,15 @@ export default function PaymentModal({
       toast.dismiss(loadingToast);
 
       // Show enhanced notifications based on payment status
-      if (response.status === "completed") {
+      if (response.status === "processing") {
+        // Accepted and queued: the order page polls until the charge settles
+        toast.success(
+          "✅ Payment received. We'll confirm it in a few seconds.",
+          {
+            duration: 5000,
+          }
+        );
+      } else if (response.status === "completed") {
         toast.success("🎉 Payment completed successfully!", {
           duration: 4000,
         });
@@ -122,14 +130,24 @@ export default function PaymentModal({
       }
 
       // Close modal after successful payment processing
-      if (response.status === "completed" || response.status === "pending") {
+      if (
+        response.status === "processing" ||
+        response.status === "completed" ||
+        response.status === "pending"
+      ) {
         onClose();
       }
     } catch (error: any) {
       toast.dismiss(loadingToast);
 
       // Handle different types of errors with enhanced messages
-      if (error.message.includes("Invalid credit info")) {
+      if (error.message.includes("Order is already")) {
+        // 409: an earlier payment of this order is still being processed or went through
+        toast.error("⏳ This order already has a payment in progress.", {
+          duration: 6000,
+        });
+        onClose();
+      } else if (error.message.includes("Invalid credit info")) {
         toast.error("💳 Invalid card information. Please verify your data.", {
           duration: 6000,
         });
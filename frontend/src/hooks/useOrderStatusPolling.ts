@@ -0,0 +1,39 @@
+import { useEffect, useRef } from "react";
+
+// Order statuses while a payment is queued or waiting for ePayco's answer
+export const PAYMENT_IN_PROGRESS_STATUSES = ["processing", "pending", "started"];
+
+export const isPaymentInProgress = (status?: string) =>
+  !!status && PAYMENT_IN_PROGRESS_STATUSES.includes(status);
+
+/**
+ * Reload an order every intervalMs while its payment is in progress, and call
+ * onSettled once with the final status (completed, failed, rejected...).
+ */
+export const useOrderStatusPolling = (
+  status: string | undefined,
+  reload: () => Promise<void>,
+  onSettled: (status: string) => void,
+  intervalMs = 3000
+) => {
+  const previousStatus = useRef(status);
+
+  useEffect(() => {
+    if (
+      isPaymentInProgress(previousStatus.current) &&
+      status &&
+      !isPaymentInProgress(status)
+    ) {
+      onSettled(status);
+    }
+    previousStatus.current = status;
+  }, [status, onSettled]);
+
+  useEffect(() => {
+    if (!isPaymentInProgress(status)) {
+      return;
+    }
+    const timer = setInterval(reload, intervalMs);
+    return () => clearInterval(timer);
+  }, [status, reload, intervalMs]);
+};
@@ -1,9 +1,13 @@
 import { createFileRoute, useNavigate } from "@tanstack/react-router";
-import { useEffect, useState } from "react";
+import { useCallback, useEffect, useState } from "react";
 import { useAuth } from "../../hooks/useAuth";
 import toast from "react-hot-toast";
 import { API_ENDPOINT } from "../../config";
 import PaymentModal from "../../components/PaymentModal";
+import {
+  isPaymentInProgress,
+  useOrderStatusPolling,
+} from "../../hooks/useOrderStatusPolling";
 
 interface OrderItem {
   book_id: string;
@@ -42,6 +46,7 @@ function OrderDetails() {
     switch (status) {
       case "completed":
         return "bg-green-100 text-green-800";
+      case "processing":
       case "pending":
         return "bg-yellow-100 text-yellow-800";
       case "rejected":
@@ -67,6 +72,44 @@ function OrderDetails() {
     }
   };
 
+  const loadOrder = useCallback(async () => {
+    const response = await fetch(`${API_ENDPOINT}/orders/${id}`, {
+      headers: {
+        Authorization: `Bearer ${authToken}`,
+      },
+    });
+
+    if (!response.ok) {
+      throw new Error("No se pudo cargar la orden");
+    }
+
+    const data = await response.json();
+    setOrder(data);
+  }, [id, authToken]);
+
+  // While the payment is being processed, reload the order until it settles
+  const refreshOrder = useCallback(async () => {
+    try {
+      await loadOrder();
+    } catch (error) {
+      console.error("Error refreshing the order:", error);
+    }
+  }, [loadOrder]);
+
+  const handlePaymentSettled = useCallback((status: string) => {
+    if (status === "completed") {
+      toast.success("🎉 Payment completed successfully!", {
+        duration: 4000,
+      });
+    } else {
+      toast.error(`❌ Payment ${status}. Please try again.`, {
+        duration: 6000,
+      });
+    }
+  }, []);
+
+  useOrderStatusPolling(order?.status, refreshOrder, handlePaymentSettled);
+
   useEffect(() => {
     if (!isAuthenticated) {
       toast.error("Please log in to view your order details");
@@ -76,18 +119,7 @@ function OrderDetails() {
 
     const fetchOrder = async () => {
       try {
-        const response = await fetch(`${API_ENDPOINT}/orders/${id}`, {
-          headers: {
-            Authorization: `Bearer ${authToken}`,
-          },
-        });
-
-        if (!response.ok) {
-          throw new Error("No se pudo cargar la orden");
-        }
-
-        const data = await response.json();
-        setOrder(data);
+        await loadOrder();
       } catch (error) {
         console.error("Error al cargar la orden:", error);
         toast.error("No se pudo cargar los detalles de la orden");
@@ -97,7 +129,7 @@ function OrderDetails() {
     };
 
     fetchOrder();
-  }, [id, isAuthenticated, authToken, navigate]);
+  }, [isAuthenticated, loadOrder, navigate]);
 
   const handlePay = async (paymentData: any) => {
     setIsPaying(true);
@@ -132,6 +164,10 @@ function OrderDetails() {
 
       if (!response.ok) {
         const errorData = await response.json();
+        if (response.status === 409) {
+          // Already being paid: show the current status, which starts polling
+          await refreshOrder();
+        }
         throw new Error(errorData.detail || "Failed to process payment");
       }
 
@@ -176,6 +212,10 @@ function OrderDetails() {
     );
   }
 
+  // The backend refuses a second payment while one is in progress
+  const canPay =
+    order.status !== "completed" && !isPaymentInProgress(order.status);
+
   return (
     <div className="container mx-auto px-4 py-8">
       <h1 className="text-3xl font-bold mb-6">Order Details</h1>
@@ -274,6 +314,8 @@ function OrderDetails() {
                     >
                       {(() => {
                         switch (order.status) {
+                          case "processing":
+                            return "Processing";
                           case "pending":
                             return "Pending";
                           case "rejected":
@@ -320,7 +362,17 @@ function OrderDetails() {
                 </div>
               </div>
 
-              {order.status !== "completed" && (
+              {isPaymentInProgress(order.status) && (
+                <div className="border-t pt-4 mt-4 flex items-center gap-3">
+                  <div className="animate-spin rounded-full h-5 w-5 border-t-2 border-b-2 border-blue-500 flex-shrink-0"></div>
+                  <p className="text-sm text-gray-600">
+                    Your payment is being confirmed. This page will update
+                    automatically.
+                  </p>
+                </div>
+              )}
+
+              {canPay && (
                 <div className="border-t pt-4 mt-4">
                   <button
                     onClick={() => setIsPaymentModalOpen(true)}
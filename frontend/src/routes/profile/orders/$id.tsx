@@ -2,9 +2,13 @@ import PaymentModal from "@/components/PaymentModal";
 import { Badge } from "@/components/ui/badge";
 import { Button } from "@/components/ui/button";
 import useAuth from "@/hooks/useAuth";
+import {
+  isPaymentInProgress,
+  useOrderStatusPolling,
+} from "@/hooks/useOrderStatusPolling";
 import { apiClient } from "@/utils/apiClient";
 import { createFileRoute, useNavigate } from "@tanstack/react-router";
-import { useEffect, useState } from "react";
+import { useCallback, useEffect, useState } from "react";
 import { FaAngleRight } from "react-icons/fa";
 import { toast } from "sonner";
 
@@ -45,6 +49,7 @@ function OrderDetails() {
     switch (status) {
       case "completed":
         return "bg-green-100 text-green-800";
+      case "processing":
       case "pending":
         return "bg-yellow-100 text-yellow-800";
       case "rejected":
@@ -70,6 +75,36 @@ function OrderDetails() {
     }
   };
 
+  const loadOrder = useCallback(async () => {
+    const response = await apiClient.get(`/orders/${id}`);
+
+    if (!response.ok) {
+      throw new Error("No se pudo cargar la orden");
+    }
+
+    const data = await response.json();
+    setOrder(data);
+  }, [id, authToken]);
+
+  // While the payment is being processed, reload the order until it settles
+  const refreshOrder = useCallback(async () => {
+    try {
+      await loadOrder();
+    } catch (error) {
+      console.error("Error refreshing the order:", error);
+    }
+  }, [loadOrder]);
+
+  const handlePaymentSettled = useCallback((status: string) => {
+    if (status === "completed") {
+      toast.success("🎉 Payment completed successfully!");
+    } else {
+      toast.error(`❌ Payment ${status}. Please try again.`);
+    }
+  }, []);
+
+  useOrderStatusPolling(order?.status, refreshOrder, handlePaymentSettled);
+
   useEffect(() => {
     if (!isAuthenticated) {
       toast.error("Please log in to view your order details");
@@ -79,14 +114,7 @@ function OrderDetails() {
 
     const fetchOrder = async () => {
       try {
-        const response = await apiClient.get(`/orders/${id}`);
-
-        if (!response.ok) {
-          throw new Error("No se pudo cargar la orden");
-        }
-
-        const data = await response.json();
-        setOrder(data);
+        await loadOrder();
       } catch (error) {
         console.error("Error al cargar la orden:", error);
         toast.error("No se pudo cargar los detalles de la orden");
@@ -96,7 +124,7 @@ function OrderDetails() {
     };
 
     fetchOrder();
-  }, [id, isAuthenticated, authToken, navigate]);
+  }, [isAuthenticated, loadOrder, navigate]);
 
   const handlePay = async (paymentData: any) => {
     setIsPaying(true);
@@ -120,6 +148,10 @@ function OrderDetails() {
 
       if (!response.ok) {
         const errorData = await response.json();
+        if (response.status === 409) {
+          // Already being paid: show the current status, which starts polling
+          await refreshOrder();
+        }
         throw new Error(errorData.detail || "Failed to process payment");
       }
 
@@ -164,6 +196,10 @@ function OrderDetails() {
     );
   }
 
+  // The backend refuses a second payment while one is in progress
+  const canPay =
+    order.status !== "completed" && !isPaymentInProgress(order.status);
+
   return (
     <div className="w-full h-full p-4 flex flex-col gap-4">
       <span className="flex flex-row items-center justify-start gap-2">
@@ -275,6 +311,8 @@ function OrderDetails() {
                     >
                       {(() => {
                         switch (order.status) {
+                          case "processing":
+                            return "Processing";
                           case "pending":
                             return "Pending";
                           case "rejected":
@@ -326,7 +364,17 @@ function OrderDetails() {
                 </div>
               </div>
 
-              {order.status !== "completed" && (
+              {isPaymentInProgress(order.status) && (
+                <div className="border-t pt-4 mt-4 flex items-center gap-3">
+                  <div className="animate-spin rounded-full h-5 w-5 border-t-2 border-b-2 border-blue-500 flex-shrink-0"></div>
+                  <p className="text-sm text-gray-700 dark:text-gray-300">
+                    Your payment is being confirmed. This page will update
+                    automatically.
+                  </p>
+                </div>
+              )}
+
+              {canPay && (
                 <div className="border-t pt-4 mt-4">
                   {/* <button
                     onClick={() => setIsPaymentModalOpen(true)}